@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import *
+from .review import review_pireps
 
 class FlightLegInline(admin.TabularInline):
     model = FlightLeg
@@ -21,6 +22,7 @@ class AwardAdmin(admin.ModelAdmin):
 class UserAwardAdmin(admin.ModelAdmin):
     list_display = ('user', 'award', 'progress', 'start_date', 'end_date')
     list_filter = ('award', 'progress')
+    list_select_related = ('user', 'award')
 ''' 
 @admin.register(PilotAward)
 class PilotAwardAdmin(admin.ModelAdmin):
@@ -31,6 +33,28 @@ class PilotAwardAdmin(admin.ModelAdmin):
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('recipient', 'message', 'image', 'created_at')
+    list_select_related = ('recipient',)
 
 admin.site.register(CustomUser)
-admin.site.register(PirepsFlight)
+
+@admin.register(PirepsFlight)
+class PirepsFlightAdmin(admin.ModelAdmin):
+    list_display = ('flight_number', 'pilot', 'departure_airport', 'arrival_airport', 'status', 'registration_date')
+    list_filter = ('status',)
+    list_select_related = ('pilot',)
+    actions = ['approve_selected', 'reject_selected']
+
+    @admin.action(description="Aprovar PIREPs selecionados")
+    def approve_selected(self, request, queryset):
+        updated = review_pireps(list(queryset.values_list('pk', flat=True)), 'Approved')
+        self.message_user(request, f"{updated} PIREP(s) aprovados.")
+
+    @admin.action(description="Rejeitar PIREPs selecionados")
+    def reject_selected(self, request, queryset):
+        updated = review_pireps(list(queryset.values_list('pk', flat=True)), 'Rejected')
+        self.message_user(request, f"{updated} PIREP(s) rejeitados.")
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
@@ -1,19 +1,33 @@
 from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.functions import Upper
 
 User = get_user_model()
 
 
-class EmailAuthBackend:
-    def authenticate(self, request, email=None, password=None):
-        try:
-            user = User.objects.get(email=email)
-            if user.check_password(password):
-                return user
-        except User.DoesNotExist:
+class EmailAuthBackend(ModelBackend):
+    """
+    Login por email, sem diferenciar maiúsculas (índice ``user_email_upper_idx``).
+
+    Único backend configurado: serve tanto a API quanto o admin, que envia o email
+    como ``username``. Cada tentativa calcula o hash da senha exatamente uma vez.
+    """
+
+    def authenticate(self, request, email=None, password=None, username=None, **kwargs):
+        email = email or username
+        if not email or password is None:
             return None
 
-    def get_user(self, user_id):
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
+        candidates = list(
+            User.objects.annotate(email_upper=Upper('email')).filter(email_upper=email.upper())[:2]
+        )
+        # Emails que diferem só na caixa: vale apenas o idêntico ao digitado
+        user = next((u for u in candidates if u.email == email), candidates[0] if len(candidates) == 1 else None)
+        if user is None:
+            # Mesmo custo de uma senha errada, para não revelar quais emails existem
+            User().set_password(password)
             return None
+
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,152 @@
+"""
+Autenticação por token do knox com cache em memória do processo.
+
+Os tokens já validados ficam num LRU limitado (``AUTH_CACHE_SIZE`` entradas),
+indexado pelo digest do token, por até ``AUTH_CACHE_TTL`` segundos (nunca além da
+expiração do token). Nesse intervalo a requisição não consulta ``knox_authtoken``.
+
+Logout, logoutall, expiração e alterações do usuário removem as entradas deste
+processo e trocam a geração do usuário no cache do Django (``revoke_user``). Cada
+acerto no LRU confere essa geração, então os outros workers também deixam de aceitar
+o token na requisição seguinte. Isso vale entre processos só com um cache
+compartilhado (``CACHE_BACKEND=db`` ou ``file``); com o locmem padrão cada processo
+só vê as próprias revogações.
+
+O stream SSE de notificações não pode mandar cabeçalhos, então usa um ticket
+(``issue_stream_ticket``): assinado, válido por ``NOTIFICATION_STREAM_TICKET_TTL``
+segundos e aceito uma única vez. O token knox nunca aparece na URL.
+"""
+import binascii
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache as django_cache
+from django.utils import timezone
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+from knox.settings import knox_settings
+
+
+def generation_key(user_id):
+    return f'auth:generation:{user_id}'
+
+
+def user_generation(user_id):
+    return django_cache.get(generation_key(user_id))
+
+
+def revoke_user(user_id):
+    """
+    Invalida os tokens do usuário em cache em todos os processos. A marca só precisa
+    durar ``AUTH_CACHE_TTL``: entradas anteriores a ela já terão expirado depois disso.
+    """
+    token_cache.discard_user(user_id)
+    django_cache.set(generation_key(user_id), uuid.uuid4().hex, timeout=settings.AUTH_CACHE_TTL)
+
+
+STREAM_TICKET_SALT = 'api.notification-stream'
+
+
+def issue_stream_ticket(user_id):
+    """Ticket de uso único para abrir o stream de notificações (``?ticket=``)."""
+    generation = user_generation(user_id) or ''
+    return signing.dumps([user_id, uuid.uuid4().hex, generation], salt=STREAM_TICKET_SALT)
+
+
+def redeem_stream_ticket(ticket):
+    """
+    Id do usuário do ticket, ou None se for inválido, vencido, já usado ou de antes de
+    um logout. O uso fica marcado no cache do Django pelo tempo de vida do ticket.
+    """
+    ttl = settings.NOTIFICATION_STREAM_TICKET_TTL
+    try:
+        user_id, nonce, generation = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=ttl)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if generation != (user_generation(user_id) or ''):
+        return None
+    if not django_cache.add(f'auth:stream-ticket:{nonce}', 1, timeout=ttl):
+        return None
+    return user_id
+
+
+class TokenCache:
+    """LRU de digest -> (usuário, token, válido até, geração do usuário) seguro entre threads."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, digest):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                return None
+            if entry[2] <= time.monotonic():
+                del self.entries[digest]
+                return None
+            self.entries.move_to_end(digest)
+            return entry
+
+    def set(self, digest, user, auth_token, generation):
+        ttl = settings.AUTH_CACHE_TTL
+        if auth_token.expiry is not None:
+            ttl = min(ttl, (auth_token.expiry - timezone.now()).total_seconds())
+        if ttl <= 0:
+            return
+        with self.lock:
+            self.entries[digest] = (user, auth_token, time.monotonic() + ttl, generation)
+            self.entries.move_to_end(digest)
+            while len(self.entries) > settings.AUTH_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def discard(self, digest):
+        with self.lock:
+            self.entries.pop(digest, None)
+
+    def discard_user(self, user_id):
+        with self.lock:
+            for digest in [d for d, (user, *_) in self.entries.items() if user.pk == user_id]:
+                del self.entries[digest]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``knox.auth.TokenAuthentication`` que evita a consulta ao banco para tokens já validados."""
+
+    def authenticate_credentials(self, token):
+        try:
+            digest = hash_token(token.decode('utf-8'))
+        except (TypeError, ValueError, binascii.Error):
+            return super().authenticate_credentials(token)
+
+        entry = token_cache.get(digest)
+        if entry is not None:
+            user, auth_token, _, generation = entry
+            # Revogado em outro processo (logout, usuário alterado): valida de novo no banco
+            valid = generation == user_generation(user.pk)
+            if valid and (auth_token.expiry is None or auth_token.expiry > timezone.now()):
+                # Cópias: a view pode alterar request.user sem afetar as próximas requisições
+                user = copy.copy(user)
+                auth_token = copy.copy(auth_token)
+                auth_token.user = user
+                if knox_settings.AUTO_REFRESH and auth_token.expiry:
+                    self.renew_token(auth_token)
+                return user, auth_token
+            token_cache.discard(digest)
+
+        # Caminho normal do knox (remove tokens expirados e dispara token_expired)
+        user, auth_token = super().authenticate_credentials(token)
+        token_cache.set(digest, user, auth_token, user_generation(user.pk))
+        return user, auth_token
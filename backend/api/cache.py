@@ -0,0 +1,88 @@
+"""
+Cache das consultas agregadas (rankings, estatísticas gerais) sobre o cache do Django.
+
+Cada namespace tem uma versão, incrementada pelos signals quando um PIREP muda de
+situação de aprovação. A entrada guardada registra a versão e o prazo de validade:
+entradas vencidas ou de versão antiga continuam sendo servidas enquanto um único
+processo, o que conseguir o lock, recalcula o valor (stale-while-revalidate).
+
+O lock e as entradas ficam no backend de cache configurado. Com ``locmem`` (o padrão)
+cada worker tem o seu: há um recálculo por processo, não um no total, e um ``bump``
+só invalida o processo que o fez. Para um único recálculo e invalidação entre todos
+os workers, use um cache compartilhado (``CACHE_BACKEND=db`` ou ``file``).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+STATS_NAMESPACE = 'pilot-stats'
+
+
+def _cache():
+    return caches[getattr(settings, 'STATS_CACHE_ALIAS', 'default')]
+
+
+def _version_key(namespace):
+    return f'api:{namespace}:version'
+
+
+def get_version(namespace):
+    cache = _cache()
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), 1, timeout=None)
+        version = cache.get(_version_key(namespace), 1)
+    return version
+
+
+def bump(namespace):
+    """Invalida todas as entradas do namespace (elas passam a ser tratadas como vencidas)."""
+    cache = _cache()
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.add(_version_key(namespace), 2, timeout=None)
+
+
+def cached(namespace, name, compute, ttl=None):
+    """
+    Retorna ``compute()`` guardado em cache por ``ttl`` segundos.
+
+    Depois de vencida (ou de um ``bump``), a entrada antiga ainda é servida por até
+    ``STATS_CACHE_STALE_TTL`` segundos enquanto um único processo recalcula.
+    """
+    cache = _cache()
+    ttl = settings.STATS_CACHE_TTL if ttl is None else ttl
+    key = f'api:{namespace}:{name}'
+    lock_key = f'{key}:lock'
+    lock_timeout = settings.STATS_CACHE_LOCK_TIMEOUT
+    version = get_version(namespace)
+
+    entry = cache.get(key)
+    if entry and entry['version'] == version and entry['fresh_until'] > time.time():
+        return entry['value']
+
+    locked = cache.add(lock_key, 1, timeout=lock_timeout)
+    if not locked:
+        if entry:
+            return entry['value']  # Outro processo já está recalculando
+        # Sem nada para servir: espera o recálculo em andamento por até lock_timeout
+        deadline = time.time() + lock_timeout
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry and entry['version'] == version:
+                return entry['value']
+
+    try:
+        value = compute()
+        cache.set(
+            key,
+            {'version': version, 'fresh_until': time.time() + ttl, 'value': value},
+            timeout=ttl + settings.STATS_CACHE_STALE_TTL,
+        )
+        return value
+    finally:
+        if locked:
+            cache.delete(lock_key)
@@ -0,0 +1,51 @@
+"""
+Pub/sub em memória para o stream de notificações (``notifications/stream/``).
+
+Os signals publicam, depois do commit, apenas "o usuário X tem novidades"; cada
+conexão aberta desse usuário acorda e consulta o banco a partir do último id que já
+enviou. Em deploys com vários workers a publicação só chega às conexões do mesmo
+processo, por isso o stream também consulta o banco a cada
+``NOTIFICATION_STREAM_POLL_INTERVAL`` segundos.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+_subscribers = defaultdict(set)  # user_id -> {(loop, asyncio.Event)}
+_lock = threading.Lock()
+
+
+def subscribe(user_id):
+    """Registra uma conexão (chamado dentro do event loop) e retorna o seu Event."""
+    token = (asyncio.get_running_loop(), asyncio.Event())
+    with _lock:
+        _subscribers[user_id].add(token)
+    return token
+
+
+def unsubscribe(user_id, token):
+    with _lock:
+        subscribers = _subscribers.get(user_id)
+        if subscribers is not None:
+            subscribers.discard(token)
+            if not subscribers:
+                del _subscribers[user_id]
+
+
+def publish(user_ids):
+    """Acorda as conexões dos usuários (pode ser chamado de qualquer thread)."""
+    with _lock:
+        tokens = [token for user_id in user_ids for token in _subscribers.get(user_id, ())]
+    for loop, event in tokens:
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass  # Loop já encerrado; a conexão será removida ao terminar
+
+
+def publish_on_commit(user_ids):
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: publish(user_ids))
@@ -0,0 +1,110 @@
+"""
+Exportação do diário de bordo (PIREPs) em CSV ou NDJSON, em stream.
+
+As linhas saem de ``values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE)`` e cada
+bloco é codificado e enviado antes do próximo ser lido: a memória fica constante com
+100 ou 1 milhão de voos. A ordenação (data, id) vem dos índices de PirepsFlight, então
+o primeiro byte sai sem esperar um sort da tabela inteira.
+"""
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.duration import duration_string
+
+from .models import PirepsFlight
+
+# (coluna, lookup do values_list)
+COLUMNS = [
+    ('id', 'id'),
+    ('pilot_id', 'pilot_id'),
+    ('pilot_email', 'pilot__email'),
+    ('flight_icao', 'flight_icao'),
+    ('flight_number', 'flight_number'),
+    ('departure_airport', 'departure_airport'),
+    ('arrival_airport', 'arrival_airport'),
+    ('aircraft', 'aircraft'),
+    ('flight_duration', 'flight_duration'),
+    ('network', 'network'),
+    ('registration_date', 'registration_date'),
+    ('status', 'status'),
+    ('observation', 'observation'),
+]
+HEADER = [column for column, _ in COLUMNS]
+STATUSES = {value for value, _ in PirepsFlight.STATUS_CHOICES}
+
+
+def flights(pilot_id=None, start=None, end=None, statuses=None):
+    queryset = PirepsFlight.objects.all()
+    if pilot_id is not None:
+        queryset = queryset.filter(pilot_id=pilot_id)
+    if start:
+        queryset = queryset.filter(registration_date__gte=start)
+    if end:
+        queryset = queryset.filter(registration_date__lte=end)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset.order_by('registration_date', 'id')
+
+
+def plain(value):
+    # Mesmos formatos do PirepsFlightSerializer: duração "HH:MM:SS", datas ISO 8601
+    if value is None:
+        return ''
+    if hasattr(value, 'total_seconds'):
+        return duration_string(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def batches(queryset):
+    """Listas de até ``EXPORT_CHUNK_SIZE`` linhas, lidas do cursor sob demanda."""
+    size = settings.EXPORT_CHUNK_SIZE
+    batch = []
+    for row in queryset.values_list(*(lookup for _, lookup in COLUMNS)).iterator(chunk_size=size):
+        batch.append([plain(value) for value in row])
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(queryset):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    yield buffer.getvalue()
+    for batch in batches(queryset):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(queryset):
+    for batch in batches(queryset):
+        yield ''.join(json.dumps(dict(zip(HEADER, row)), ensure_ascii=False) + '\n' for row in batch)
+
+
+FORMATS = {
+    'csv': (csv_chunks, 'text/csv; charset=utf-8'),
+    'ndjson': (ndjson_chunks, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+async def async_chunks(chunks):
+    """
+    Versão assíncrona para o ASGI, que consumiria um iterador síncrono inteiro antes
+    de enviar. Cada bloco é lido em sync_to_async (sempre na mesma thread, com o mesmo
+    cursor aberto).
+    """
+    read = sync_to_async(next)
+    try:
+        while (chunk := await read(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()  # Cliente desconectado: fecha o cursor na thread dele
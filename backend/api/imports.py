@@ -0,0 +1,184 @@
+"""
+Importação do diário de bordo (``logbook/import/``) em CSV ou JSON.
+
+As colunas são as da exportação (``api.export``), então um arquivo exportado volta
+como está; ``id``, ``pilot_id`` e ``pilot_email`` são ignorados. A validação é feita
+coluna a coluna sobre o lote inteiro, sem um serializer por linha, e os duplicados são
+procurados numa única consulta. Os PIREPs entram com ``bulk_create`` em blocos de
+``LOGBOOK_IMPORT_CHUNK_SIZE``, sem os signals de ``post_save``: estatísticas e
+progresso dos awards do piloto são recalculados uma vez para o lote.
+"""
+import csv
+import io
+import json
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import cache, stats
+from .export import STATUSES
+from .models import PirepsFlight
+from .progress import recompute_for_pireps
+
+AIRCRAFT = {code for code, _ in PirepsFlight.aircraft_choices}
+DEFAULT_AIRCRAFT = PirepsFlight._meta.get_field('aircraft').default
+DURATION_RE = re.compile(r'^(\d{1,2}):([0-5]\d)(?::([0-5]\d))?$')
+MAX_DURATION = timedelta(hours=24)
+
+
+class ImportFileError(ValueError):
+    """Arquivo que não pode ser lido (formato, tamanho); os erros por linha vão na resposta."""
+
+
+def read_rows(upload=None, data=None):
+    """Linhas (dicts) de um arquivo ``.csv``/``.json`` enviado ou de uma lista JSON no corpo."""
+    if upload is not None:
+        try:
+            text = upload.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ImportFileError("O arquivo precisa estar em UTF-8.")
+        if upload.name.lower().endswith('.json') or 'json' in (upload.content_type or ''):
+            try:
+                data = json.loads(text)
+            except ValueError as error:
+                raise ImportFileError(f"JSON inválido: {error}")
+        else:
+            data = list(csv.DictReader(io.StringIO(text)))
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise ImportFileError("Envie um arquivo CSV/JSON em 'file' ou uma lista de voos em JSON.")
+    if not data:
+        raise ImportFileError("Nenhum voo para importar.")
+    if len(data) > settings.LOGBOOK_IMPORT_MAX_ROWS:
+        raise ImportFileError(f"No máximo {settings.LOGBOOK_IMPORT_MAX_ROWS} voos por importação.")
+    return data
+
+
+def column(rows, name):
+    return ['' if row.get(name) is None else str(row[name]).strip() for row in rows]
+
+
+def text(values, name, max_length, errors, required=False, upper=False):
+    parsed = []
+    for i, value in enumerate(values):
+        if not value:
+            if required:
+                errors[i][name].append("Campo obrigatório.")
+            parsed.append(None)
+        elif len(value) > max_length:
+            errors[i][name].append(f"No máximo {max_length} caracteres.")
+            parsed.append(None)
+        else:
+            parsed.append(value.upper() if upper else value)
+    return parsed
+
+
+def durations(values, errors):
+    parsed = []
+    for i, value in enumerate(values):
+        match = DURATION_RE.match(value)
+        duration = None
+        if match:
+            hours, minutes, seconds = (int(part or 0) for part in match.groups())
+            duration = timedelta(hours=hours, minutes=minutes, seconds=seconds)
+        if value and (duration is None or duration > MAX_DURATION):
+            errors[i]['flight_duration'].append("Use HH:MM ou HH:MM:SS, até 24 horas.")
+        parsed.append(duration)
+    return parsed
+
+
+def dates(values, errors):
+    now = timezone.now()
+    parsed = []
+    for i, value in enumerate(values):
+        moment = parse_datetime(value) if value else None
+        if moment is None and value:
+            day = parse_date(value)
+            moment = datetime.combine(day, datetime.min.time()) if day else None
+        if moment is not None and timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        if moment is None:
+            errors[i]['registration_date'].append(
+                "Campo obrigatório." if not value else "Data inválida, use AAAA-MM-DD ou ISO 8601."
+            )
+        elif moment > now:
+            errors[i]['registration_date'].append("Data no futuro.")
+            moment = None
+        parsed.append(moment)
+    return parsed
+
+
+def choices(values, name, allowed, default, errors, upper=False):
+    parsed = []
+    for i, value in enumerate(values):
+        value = value.upper() if upper else value
+        if value and value not in allowed:
+            errors[i][name].append(f"Valor inválido: {value}.")
+        parsed.append(value or default)
+    return parsed
+
+
+def validate(rows, pilot_id, keep_status=False):
+    """
+    PIREPs (não salvos) e erros ``[{'row': n, 'errors': {campo: [...]}}]``, com ``n``
+    contando as linhas de dados a partir de 1. Sem ``keep_status`` todos entram em análise.
+    """
+    errors = defaultdict(lambda: defaultdict(list))
+    values = {
+        'flight_icao': text(column(rows, 'flight_icao'), 'flight_icao', 10, errors, upper=True),
+        'flight_number': text(column(rows, 'flight_number'), 'flight_number', 10, errors, required=True),
+        'departure_airport': text(column(rows, 'departure_airport'), 'departure_airport', 50, errors,
+                                  required=True, upper=True),
+        'arrival_airport': text(column(rows, 'arrival_airport'), 'arrival_airport', 50, errors,
+                                required=True, upper=True),
+        'aircraft': choices(column(rows, 'aircraft'), 'aircraft', AIRCRAFT, DEFAULT_AIRCRAFT, errors, upper=True),
+        'flight_duration': durations(column(rows, 'flight_duration'), errors),
+        'network': text(column(rows, 'network'), 'network', 200, errors),
+        'registration_date': dates(column(rows, 'registration_date'), errors),
+        'status': (
+            choices(column(rows, 'status'), 'status', STATUSES, 'In Review', errors)
+            if keep_status else ['In Review'] * len(rows)
+        ),
+        'observation': text(column(rows, 'observation'), 'observation', 500, errors),
+    }
+    pireps = [PirepsFlight(pilot_id=pilot_id, **dict(zip(values, row))) for row in zip(*values.values())]
+
+    # O mesmo voo (data, número e rota) já no diário ou repetido no arquivo: reimportar não duplica
+    def key(pirep):
+        return pirep.registration_date, pirep.flight_number, pirep.departure_airport, pirep.arrival_airport
+
+    moments = [moment for moment in values['registration_date'] if moment]
+    existing = set()
+    if moments:
+        existing = set(
+            PirepsFlight.objects.filter(pilot_id=pilot_id, registration_date__range=(min(moments), max(moments)))
+            .values_list('registration_date', 'flight_number', 'departure_airport', 'arrival_airport')
+        )
+    seen = {}
+    for i, pirep in enumerate(pireps):
+        if i in errors:
+            continue
+        if key(pirep) in existing:
+            errors[i]['non_field_errors'].append("Voo já registrado no diário de bordo.")
+        elif key(pirep) in seen:
+            errors[i]['non_field_errors'].append(f"Voo repetido no arquivo (linha {seen[key(pirep)] + 1}).")
+        else:
+            seen[key(pirep)] = i
+
+    return pireps, [{'row': i + 1, 'errors': dict(errors[i])} for i in sorted(errors)]
+
+
+def import_pireps(pireps):
+    """Grava os PIREPs validados e atualiza estatísticas e awards uma vez por piloto."""
+    with transaction.atomic():
+        created = PirepsFlight.objects.bulk_create(pireps, batch_size=settings.LOGBOOK_IMPORT_CHUNK_SIZE)
+        approved = [pirep for pirep in created if pirep.status == 'Approved']
+        if approved:
+            stats.rebuild({pirep.pilot_id for pirep in approved})
+            recompute_for_pireps(approved)
+            transaction.on_commit(lambda: cache.bump(cache.STATS_NAMESPACE))
+    return created
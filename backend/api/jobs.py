@@ -0,0 +1,44 @@
+"""
+Executor local de tarefas em segundo plano.
+
+Tarefas pesadas (ex.: notificar todos os pilotos) rodam numa thread do próprio
+processo, depois do commit da transação, para não segurar a requisição. Com
+``JOBS_RUN_SYNC = True`` (testes, scripts) a tarefa roda imediatamente.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'JOBS_MAX_WORKERS', 2),
+            thread_name_prefix='api-jobs',
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Falha na tarefa em segundo plano %s", func.__name__)
+    finally:
+        close_old_connections()
+
+
+def enqueue(func, *args, **kwargs):
+    """Agenda ``func(*args, **kwargs)`` para depois do commit da transação atual."""
+    if getattr(settings, 'JOBS_RUN_SYNC', False):
+        transaction.on_commit(lambda: func(*args, **kwargs))
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run, func, args, kwargs))
@@ -0,0 +1,124 @@
+"""
+Rankings por período (semana, mês, ano e geral) guardados como snapshots.
+
+``refresh`` agrega ``PilotDailyStats`` (ou ``PilotStats``, no geral) por piloto e
+grava a posição de cada um em ``LeaderboardEntry``; consultar o top N ou a posição
+de um piloto é uma leitura por índice. Os snapshots são recalculados por
+``manage.py refresh_leaderboards`` e, quando uma leitura encontra um snapshot com
+mais de ``LEADERBOARD_REFRESH_INTERVAL`` segundos, numa tarefa em segundo plano.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import jobs
+from .models import Leaderboard, LeaderboardEntry, PilotDailyStats, PilotStats
+
+BOARDS = [board for board, _ in Leaderboard.BOARD_CHOICES]
+METRICS = {'duration': 'duration_rank', 'flights': 'flights_rank'}
+
+
+def period_start(board, today=None):
+    """Primeiro dia do período corrente (semana começando na segunda), ou None no geral."""
+    today = today or timezone.localdate()
+    if board == 'weekly':
+        return today - timedelta(days=today.weekday())
+    if board == 'monthly':
+        return today.replace(day=1)
+    if board == 'yearly':
+        return today.replace(month=1, day=1)
+    return None
+
+
+def totals(board, start):
+    """(pilot_id, voos, duração) de cada piloto com voos aprovados no período."""
+    if board == 'all-time':
+        return list(PilotStats.objects.values_list('pilot_id', 'total_flights', 'total_duration'))
+    return list(
+        PilotDailyStats.objects.filter(day__gte=start)
+        .values('pilot_id')
+        .annotate(flights=Sum('flights'), duration=Sum('duration'))
+        .values_list('pilot_id', 'flights', 'duration')
+    )
+
+
+def rank(rows, value):
+    """Posições com empate (1, 1, 3) de ``rows`` ordenadas por ``value`` decrescente."""
+    ranks = {}
+    previous = None
+    for position, row in enumerate(sorted(rows, key=value, reverse=True), start=1):
+        if value(row) != previous:
+            current, previous = position, value(row)
+        ranks[row[0]] = current
+    return ranks
+
+
+def refresh(board):
+    start = period_start(board)
+    rows = [row for row in totals(board, start) if row[1] > 0]
+    flights_ranks = rank(rows, lambda row: row[1])
+    duration_ranks = rank(rows, lambda row: row[2])
+
+    with transaction.atomic():
+        leaderboard, _ = Leaderboard.objects.update_or_create(
+            board=board,
+            defaults={'period_start': start, 'refreshed_at': timezone.now(), 'pilot_count': len(rows)},
+        )
+        LeaderboardEntry.objects.filter(leaderboard=leaderboard).delete()
+        LeaderboardEntry.objects.bulk_create(
+            [
+                LeaderboardEntry(
+                    leaderboard=leaderboard,
+                    pilot_id=pilot_id,
+                    flights=flights,
+                    duration=duration,
+                    flights_rank=flights_ranks[pilot_id],
+                    duration_rank=duration_ranks[pilot_id],
+                )
+                for pilot_id, flights, duration in rows
+            ],
+            batch_size=500,
+        )
+    return leaderboard
+
+
+def refresh_all(boards=None):
+    return [refresh(board) for board in boards or BOARDS]
+
+
+def _refresh_in_background(board):
+    try:
+        refresh(board)
+    finally:
+        django_cache.delete(f'api:leaderboard:{board}:refreshing')
+
+
+def get_leaderboard(board):
+    """
+    Snapshot de ``board``. Sem snapshot, ou com o período já virado, recalcula na hora;
+    vencido pelo intervalo, devolve o atual e agenda um único recálculo.
+    """
+    leaderboard = Leaderboard.objects.filter(board=board).first()
+    if leaderboard is None or leaderboard.period_start != period_start(board):
+        return refresh(board)
+    age = timezone.now() - leaderboard.refreshed_at
+    if age > timedelta(seconds=settings.LEADERBOARD_REFRESH_INTERVAL):
+        if django_cache.add(f'api:leaderboard:{board}:refreshing', 1, timeout=settings.LEADERBOARD_REFRESH_INTERVAL):
+            jobs.enqueue(_refresh_in_background, board)
+    return leaderboard
+
+
+def top(leaderboard, metric, limit):
+    return list(
+        LeaderboardEntry.objects.filter(leaderboard=leaderboard)
+        .select_related('pilot')
+        .order_by(METRICS[metric], 'pilot_id')[:limit]
+    )
+
+
+def entry_for(leaderboard, pilot_id):
+    return LeaderboardEntry.objects.filter(leaderboard=leaderboard, pilot_id=pilot_id).select_related('pilot').first()
@@ -0,0 +1,256 @@
+"""
+Proxy do tráfego ao vivo da API pública do Infinite Flight.
+
+Cada feed (voos, ATC, status do mundo) de cada sessão é consultado uma única vez
+por intervalo, por um cliente HTTP assíncrono com pool de conexões rodando numa
+thread em segundo plano. O último snapshot fica em memória com um número de
+versão; os clientes recebem o snapshot completo ou só o que mudou desde a versão
+que já têm. Feeds sem clientes por ``LIVE_IDLE_TIMEOUT`` segundos deixam de ser
+consultados.
+
+O snapshot vive na memória de cada processo e recomeça quando o feed fica ocioso,
+então a versão entregue leva uma época aleatória do snapshot (``"<época>.<n>"``): uma
+versão de outro worker ou de um snapshot anterior recebe o snapshot completo, nunca
+um delta ou um 304 errado.
+"""
+import asyncio
+import logging
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# feed -> (caminho na API do Infinite Flight, campo que identifica cada item)
+FEEDS = {
+    'flights': ('sessions/{session_id}/flights', 'flightId'),
+    'atc': ('sessions/{session_id}/atc', 'frequencyId'),
+    'world': ('world/status/{session_id}', 'airportIcao'),
+}
+
+# Detalhes de um voo repassados sob demanda
+FLIGHT_DETAILS = ('route', 'flightplan')
+
+
+class Snapshot:
+    """Último resultado de um feed e o histórico recente de mudanças entre versões."""
+
+    def __init__(self, id_field, history_size):
+        self.id_field = id_field
+        self.epoch = secrets.token_hex(4)
+        self.version = 0
+        self.items = {}
+        self.changes = deque(maxlen=history_size)  # (versão, ids alterados, ids removidos)
+        self.updated_at = None
+
+    def update(self, result):
+        items = {}
+        for position, item in enumerate(result):
+            key = item.get(self.id_field) if isinstance(item, dict) else None
+            items[key if key is not None else f'#{position}'] = item
+
+        changed = {key for key, item in items.items() if self.items.get(key) != item}
+        removed = set(self.items) - set(items)
+        self.updated_at = time.time()
+        if not changed and not removed and self.version:
+            return False
+
+        self.version += 1
+        self.items = items
+        self.changes.append((self.version, changed, removed))
+        return True
+
+    @property
+    def tag(self):
+        """Versão entregue aos clientes, qualificada pela época do snapshot."""
+        return f'{self.epoch}.{self.version}'
+
+    def parse(self, tag):
+        """Número da versão em ``tag``, ou None se for de outra época ou inválida."""
+        epoch, _, version = (tag or '').partition('.')
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        return int(version)
+
+    def since(self, tag):
+        """
+        Retorna (completo, itens, removidos) para um cliente que está na versão ``tag``.
+
+        Se a versão for de outra época ou antiga demais para o histórico, devolve o
+        snapshot completo.
+        """
+        version = self.parse(tag)
+        if version == self.version:
+            return False, [], []
+        oldest = self.changes[0][0] if self.changes else None
+        if version is None or oldest is None or not (oldest - 1 <= version < self.version):
+            return True, list(self.items.values()), []
+
+        changed, removed = set(), set()
+        for change_version, change_ids, removed_ids in self.changes:
+            if change_version > version:
+                changed |= change_ids
+                removed |= removed_ids
+        changed &= set(self.items)
+        removed -= set(self.items)
+        return False, [self.items[key] for key in changed], sorted(map(str, removed))
+
+
+class LiveTrafficService:
+    def __init__(self):
+        self.snapshots = {}
+        self.last_requested = {}
+        self.loading = {}  # feed sem snapshot -> Future da primeira consulta em andamento
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return settings.INFINITE_FLIGHT_API_URL.rstrip('/') + '/'
+
+    def make_client(self):
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            params={'apikey': settings.INFINITE_FLIGHT_API_KEY},
+            timeout=settings.LIVE_HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+        )
+
+    def get_changes(self, feed, session_id, since=None):
+        """
+        Retorna (versão, completo, itens, removidos) do feed, ou None se a API não respondeu.
+        """
+        key = (feed, str(session_id))
+        with self.lock:
+            self.last_requested[key] = time.time()
+            loading = None if key in self.snapshots else self.loading.get(key)
+            first = key not in self.snapshots and loading is None
+            if first:
+                loading = self.loading[key] = Future()
+        if first:
+            # Primeiro cliente do feed: busca na hora e passa a consultar em segundo plano;
+            # quem chegar durante a consulta espera por ela em vez de repeti-la
+            try:
+                self.refresh(feed, session_id)
+            finally:
+                with self.lock:
+                    del self.loading[key]
+                loading.set_result(None)
+        elif loading is not None:
+            loading.result()
+        if settings.LIVE_BACKGROUND_POLLING:
+            self.ensure_started()
+
+        with self.lock:
+            snapshot = self.snapshots.get(key)
+            if snapshot is None:
+                return None
+            return (snapshot.tag, *snapshot.since(since))
+
+    def refresh(self, feed, session_id):
+        """Consulta o feed uma vez, de forma síncrona (primeiro acesso, testes); cria o snapshot."""
+        key = (feed, str(session_id))
+
+        async def run():
+            async with self.make_client() as client:
+                return await self.fetch(client, key)
+
+        result = asyncio.run(run())
+        if result is None:
+            return
+        with self.lock:
+            if key in self.last_requested:
+                snapshot = self.snapshots.setdefault(key, Snapshot(FEEDS[feed][1], settings.LIVE_HISTORY_SIZE))
+                snapshot.update(result)
+
+    async def fetch(self, client, key):
+        """Itens do feed, ou None se a API não respondeu."""
+        feed, session_id = key
+        try:
+            response = await client.get(FEEDS[feed][0].format(session_id=session_id))
+            response.raise_for_status()
+            return response.json().get('result') or []
+        except (httpx.HTTPError, ValueError) as error:
+            logger.warning("Falha ao consultar %s da sessão %s: %s", feed, session_id, error)
+            return None
+
+    async def poll(self, client, key):
+        """Atualiza um snapshot existente; o feed pode ter ficado ocioso durante a consulta."""
+        result = await self.fetch(client, key)
+        if result is None:
+            return
+        with self.lock:
+            snapshot = self.snapshots.get(key) if key in self.last_requested else None
+            if snapshot is not None:
+                snapshot.update(result)
+
+    def ensure_started(self):
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self.run_forever, name='live-traffic', daemon=True)
+            self.thread.start()
+
+    def run_forever(self):
+        asyncio.run(self.poll_loop())
+
+    async def poll_loop(self):
+        async with self.make_client() as client:
+            while True:
+                started = time.time()
+                with self.lock:
+                    idle = [
+                        key for key, requested_at in self.last_requested.items()
+                        if started - requested_at >= settings.LIVE_IDLE_TIMEOUT
+                    ]
+                    for key in idle:
+                        self.snapshots.pop(key, None)
+                        del self.last_requested[key]
+                    active = list(self.last_requested)
+                try:
+                    await asyncio.gather(*(self.poll(client, key) for key in active))
+                except Exception:
+                    logger.exception("Erro inesperado ao atualizar o tráfego ao vivo")
+                await asyncio.sleep(max(0, settings.LIVE_POLL_INTERVAL - (time.time() - started)))
+
+
+service = LiveTrafficService()
+
+
+def enabled():
+    """O proxy só funciona com ``INFINITE_FLIGHT_API_KEY`` configurada no ambiente."""
+    return bool(settings.INFINITE_FLIGHT_API_KEY)
+
+
+def make_sync_client():
+    return httpx.Client(
+        base_url=service.base_url,
+        params={'apikey': settings.INFINITE_FLIGHT_API_KEY},
+        timeout=settings.LIVE_HTTP_TIMEOUT,
+    )
+
+
+def fetch_flight_detail(session_id, flight_id, detail):
+    """Rota ou plano de voo de um voo (sem snapshot; os resultados são cacheados pela view)."""
+    with make_sync_client() as client:
+        response = client.get(f'sessions/{session_id}/flights/{flight_id}/{detail}')
+        response.raise_for_status()
+        return response.json()
+
+
+# Parâmetro da view -> campo da busca em user/stats
+USER_LOOKUPS = {'userId': 'userIds', 'discourseName': 'discourseNames'}
+
+
+def fetch_user_stats(lookup, value):
+    """Estatísticas de um usuário do Infinite Flight (por id ou nome no fórum), ou None."""
+    with make_sync_client() as client:
+        response = client.post('user/stats', json={USER_LOOKUPS[lookup]: [value]})
+        response.raise_for_status()
+        result = response.json().get('result') or []
+        return result[0] if result else None
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from knox.auth import TokenAuthentication
+from knox.models import AuthToken
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import CachedTokenAuthentication, token_cache
+from api.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compara a autenticação do knox com a autenticação com cache de tokens (dados descartados ao final)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--tokens', type=int, default=50, help="Usuários/tokens distintos alternando")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['requests'], options['tokens'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, n_requests, n_tokens):
+        factory = APIRequestFactory()
+        requests = []
+        for i in range(n_tokens):
+            user = User.objects.create_user(email=f'bench-auth-{i}@example.com', password=None)
+            _, token = AuthToken.objects.create(user)
+            requests.append(factory.get('/', HTTP_AUTHORIZATION=f'Token {token}'))
+
+        token_cache.clear()
+        self.stdout.write(f"{n_requests} requisições, {n_tokens} tokens")
+        knox = self.measure("knox TokenAuthentication", TokenAuthentication(), requests, n_requests)
+        cached = self.measure("CachedTokenAuthentication", CachedTokenAuthentication(), requests, n_requests)
+        self.stdout.write(f"{knox / cached:.1f}x mais rápido")
+
+    def measure(self, label, auth, requests, n_requests):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for i in range(n_requests):
+                auth.authenticate(requests[i % len(requests)])
+            elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{label:<28} {elapsed * 1000:10.1f} ms  {len(queries) / n_requests:5.2f} consultas/requisição"
+        )
+        return elapsed
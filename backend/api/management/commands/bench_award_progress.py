@@ -0,0 +1,90 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.choice import CHOICE_AIRCRAFT
+from api.models import Award, FlightLeg, PirepsFlight, User, UserAward
+from api.progress import apply_approved_pirep, recompute_user_award
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_scan(user_award, user_flights):
+    """Varredura pernas x voos usada antes do motor de progresso (sem os prints)."""
+    allowed_icaos = [icao.company_icao.upper() for icao in user_award.award.allowed_icao.all()]
+    allowed_aircrafts = [aircraft.aircraft for aircraft in user_award.award.allowed_aircrafts.all()]
+    user_flights = list(user_flights)
+    completed = 0
+    for leg in user_award.award.flight_legs.all():
+        for flight in user_flights:
+            if leg.from_airport == flight.departure_airport and leg.to_airport == flight.arrival_airport:
+                icao_ok = not allowed_icaos or flight.flight_icao.upper() in allowed_icaos
+                aircraft_ok = not allowed_aircrafts or flight.aircraft in allowed_aircrafts
+                if icao_ok and aircraft_ok:
+                    completed += 1
+                    break
+    return completed
+
+
+class Command(BaseCommand):
+    help = "Compara o recálculo antigo de progresso de Awards com o motor incremental (dados descartados ao final)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--legs', type=int, default=200)
+        parser.add_argument('--flights', type=int, default=3000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['legs'], options['flights'], random.Random(options['seed']))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def timed(self, label, func):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label:<32} {elapsed * 1000:10.1f} ms")
+        return elapsed
+
+    def run(self, n_legs, n_flights, rng):
+        airports = [f"K{chr(65 + i // 26)}{chr(65 + i % 26)}A" for i in range(120)]
+        aircrafts = [code for code, _ in CHOICE_AIRCRAFT]
+
+        pilot = User.objects.create_user(email='bench-progress@example.com', password=None)
+        award = Award.objects.create(name='Benchmark World Tour', description='benchmark')
+        route = rng.sample(airports, len(airports))
+        FlightLeg.objects.bulk_create([
+            FlightLeg(award=award, leg_number=i + 1,
+                      from_airport=route[i % len(route)], to_airport=route[(i + 1) % len(route)])
+            for i in range(n_legs)
+        ])
+        PirepsFlight.objects.bulk_create([
+            PirepsFlight(pilot=pilot, flight_icao='BEN', flight_number=str(i), status='Approved',
+                         departure_airport=rng.choice(airports), arrival_airport=rng.choice(airports),
+                         aircraft=rng.choice(aircrafts))
+            for i in range(n_flights)
+        ])
+        user_award = UserAward.objects.create(user=pilot, award=award)
+        leg = award.flight_legs.first()
+        new_pirep = PirepsFlight.objects.create(
+            pilot=pilot, flight_icao='BEN', flight_number='NEW', status='In Review',
+            departure_airport=leg.from_airport, arrival_airport=leg.to_airport, aircraft=aircrafts[0],
+        )
+
+        self.stdout.write(f"{n_legs} pernas, {n_flights} voos aprovados")
+        flights = PirepsFlight.objects.filter(pilot=pilot, status='Approved')
+        legacy = self.timed("varredura pernas x voos", lambda: legacy_scan(user_award, flights))
+        rebuild = self.timed("recálculo com índice", lambda: recompute_user_award(user_award))
+
+        PirepsFlight.objects.filter(pk=new_pirep.pk).update(status='Approved')
+        new_pirep.status = 'Approved'
+        incremental = self.timed("aprovação incremental", lambda: apply_approved_pirep(new_pirep))
+
+        self.stdout.write(f"índice: {legacy / rebuild:.1f}x mais rápido; incremental: {legacy / incremental:.1f}x")
@@ -0,0 +1,75 @@
+import time
+
+from django.contrib.auth.backends import ModelBackend
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from knox.models import AuthToken
+from rest_framework.test import APIRequestFactory
+
+from api.models import User
+from api.views import LoginViewset
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_authenticate(email, password):
+    """Cadeia de backends anterior: EmailAuthBackend (busca exata) e ModelBackend como fallback."""
+    try:
+        user = User.objects.get(email=email)
+        if user.check_password(password):
+            return user
+    except User.DoesNotExist:
+        pass
+    return ModelBackend().authenticate(None, username=email, password=password)
+
+
+def legacy_login(email, password):
+    """Fluxo anterior do LoginViewset: validate() e a view autenticavam cada um."""
+    user = legacy_authenticate(email, password)
+    if user is None:
+        return None
+    user = legacy_authenticate(email, password)
+    AuthToken.objects.create(user)
+    return user
+
+
+class Command(BaseCommand):
+    help = "Mede logins/segundo num único worker, antes e depois do login em uma passada (dados descartados ao final)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['logins'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, n_logins):
+        email, password = 'bench-login@example.com', 'bench-password'
+        User.objects.create_user(email=email, password=password)
+        view = LoginViewset.as_view({'post': 'create'})
+        factory = APIRequestFactory()
+
+        def login(password):
+            return view(factory.post('/login/', {'email': email, 'password': password}, format='json'))
+
+        self.stdout.write(f"{n_logins} tentativas por cenário")
+        for label, legacy, current in (
+            ("senha correta", lambda: legacy_login(email, password), lambda: login(password)),
+            ("senha errada", lambda: legacy_login(email, 'wrong'), lambda: login('wrong')),
+        ):
+            before = self.rate(legacy, n_logins)
+            after = self.rate(current, n_logins)
+            self.stdout.write(f"{label:<14} antes {before:7.1f}/s  depois {after:7.1f}/s  ({after / before:.1f}x)")
+
+    @staticmethod
+    def rate(func, n):
+        start = time.perf_counter()
+        for _ in range(n):
+            func()
+        return n / (time.perf_counter() - start)
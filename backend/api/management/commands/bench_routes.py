@@ -0,0 +1,238 @@
+import json
+import re
+import statistics
+import subprocess
+import time
+
+from django.core.cache import cache as django_cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, resolve
+from django.utils import timezone
+from knox.models import AuthToken
+
+from api import urls as api_urls
+from api.models import (
+    AllowedAircraft, AllowedIcao, Airport, Award, FlightLeg, Notification, PirepsFlight, User, UserAward,
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+# Rotas GET medidas; {placeholders} vêm de sample_ids
+ROUTES = [
+    '/users/',
+    '/users/me/',
+    '/users/{pilot}/',
+    '/profile/update/',
+    '/api/validate-token/',
+    '/pirepsflight/',
+    '/pirepsflight/?page_size=50',
+    '/pirepsflight/{pirep}/',
+    '/myflights/',
+    '/myflights/?page_size=50',
+    '/myflights/{pirep}/',
+    '/dashboard/',
+    '/dashboard/rankings/',
+    '/flight-stats/',
+    '/user-metrics/{pilot}/',
+    '/user-approved-flights/{pilot}/',
+    '/user-approved-flights/{pilot}/?page_size=50',
+    '/awards/',
+    '/awards/{award}/',
+    '/flight-legs/',
+    '/flight-legs/?award={award}',
+    '/flight-legs/{leg}/',
+    '/allowed-aircrafts/',
+    '/allowed-aircrafts/{allowed_aircraft}/',
+    '/allowed-icaos/',
+    '/allowed-icaos/{allowed_icao}/',
+    '/user-awards/',
+    '/user-awards/{user_award}/',
+    '/notifications/',
+    '/notifications/unread-count/',
+    '/notifications/{notification}/',
+    '/airports/?search=SB',
+    '/airports/batch/?icao=SBGR,SBRJ,KJFK',
+    '/airports/{airport}/',
+    '/leaderboards/',
+    '/leaderboards/monthly/',
+    '/leaderboards/all-time/?metric=flights&limit=100',
+    '/leaderboards/all-time/me/',
+    '/logbook/export/csv/',
+    '/logbook/export/ndjson/?status=Approved',
+]
+
+# Rotas não medidas aqui e o motivo
+SKIPPED = {
+    'register-list': "POST que cria usuário",
+    'login-list': "POST; medido por bench_login",
+    'pirepsflight-bulk-review': "POST de escrita",
+    'logbook-import': "POST de escrita",
+    'notification-mark-as-read': "POST de escrita",
+    'notification-stream': "stream SSE de longa duração",
+    'notification-stream-ticket': "POST de escrita",
+    'live-traffic': "proxy da API externa do Infinite Flight",
+    'live-flight-detail': "proxy da API externa do Infinite Flight",
+    'live-user-stats': "proxy da API externa do Infinite Flight",
+    'api-root': "índice do router",
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede latência (p50/p95) e número de consultas de cada rota GET de api/urls.py pelo test client "
+        "e grava o resultado em JSON para comparar commits (--compare). Rode antes seed_load, ou use --seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--route', action='append', dest='routes', help="Só rotas que contêm o texto (repetível).")
+        parser.add_argument('--cold', action='store_true', help="Limpa o cache do Django antes de cada requisição.")
+        parser.add_argument('--seed', action='store_true',
+                            help="Gera os dados com seed_load numa transação descartada ao final.")
+        parser.add_argument('--pilots', type=int, default=200)
+        parser.add_argument('--pireps', type=int, default=20000)
+        parser.add_argument('--awards', type=int, default=10)
+        parser.add_argument('--output', default='bench_routes.json')
+        parser.add_argument('--compare', help="Resultado anterior para comparar.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+                if options['seed']:
+                    call_command('seed_load', pilots=options['pilots'], pireps=options['pireps'],
+                                 awards=options['awards'], stdout=self.stdout)
+                result = self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+        with open(options['output'], 'w') as file:
+            json.dump(result, file, indent=2)
+        self.stdout.write(f"Resultado gravado em {options['output']}")
+        if options['compare']:
+            with open(options['compare']) as file:
+                self.report_comparison(json.load(file), result)
+
+    def sample_ids(self):
+        """O piloto com mais PIREPs (também usado como usuário logado) e um exemplo de cada objeto."""
+        pilot = User.objects.annotate(n=Count('pirepsflight')).order_by('-n').first()
+        user_award = UserAward.objects.filter(user=pilot).first() or UserAward.objects.first()
+        ids = {
+            'pilot': pilot,
+            'pirep': PirepsFlight.objects.filter(pilot=pilot).order_by('-id').first(),
+            'award': user_award.award if user_award else Award.objects.first(),
+            'user_award': user_award,
+            'leg': FlightLeg.objects.first(),
+            'allowed_aircraft': AllowedAircraft.objects.first(),
+            'allowed_icao': AllowedIcao.objects.first(),
+            'notification': Notification.objects.filter(recipient=pilot, is_read=False).first(),
+            'airport': Airport.objects.values_list('icao', flat=True).first(),
+        }
+        return {name: getattr(value, 'pk', value) for name, value in ids.items()}, pilot
+
+    def run(self, options):
+        ids, pilot = self.sample_ids()
+        if pilot is None:
+            raise CommandError("Banco sem pilotos: rode seed_load antes ou use --seed.")
+        _, token = AuthToken.objects.create(pilot)
+        # Erros viram status 500 no resultado em vez de interromper a medição
+        client = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f'Token {token}')
+
+        results = {}
+        skipped = {}
+        for template in ROUTES:
+            if options['routes'] and not any(part in template for part in options['routes']):
+                continue
+            missing = [name for name, value in ids.items() if f'{{{name}}}' in template and value is None]
+            if missing:
+                skipped[template] = f"sem dados para {', '.join(missing)}"
+                self.stdout.write(f"{template:<48} ignorada ({skipped[template]})")
+                continue
+            url = template.format(**ids)
+            latencies, queries = [], []
+            for i in range(options['warmup'] + options['iterations']):
+                if options['cold']:
+                    django_cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    # Respostas em stream só terminam quando o corpo é lido
+                    body = b''.join(response.streaming_content) if response.streaming else response.content
+                    elapsed = time.perf_counter() - start
+                if i >= options['warmup']:
+                    latencies.append(elapsed * 1000)
+                    queries.append(len(captured))
+            results[template] = {
+                'url': url,
+                'route': resolve(url.split('?')[0]).url_name,
+                'status': response.status_code,
+                'p50_ms': round(statistics.median(latencies), 2),
+                'p95_ms': round(percentile(latencies, 0.95), 2),
+                'queries': max(queries),
+                'bytes': len(body),
+            }
+            self.stdout.write(
+                f"{template:<48} {response.status_code}  p50 {results[template]['p50_ms']:8.2f} ms  "
+                f"p95 {results[template]['p95_ms']:8.2f} ms  {max(queries):>4} consultas"
+            )
+
+        self.warn_uncovered()
+        return {
+            'revision': git_revision(),
+            'created_at': timezone.now().isoformat(),
+            'iterations': options['iterations'],
+            'cold_cache': options['cold'],
+            'dataset': {
+                'pilots': User.objects.count(),
+                'pireps': PirepsFlight.objects.count(),
+                'awards': Award.objects.count(),
+                'flight_legs': FlightLeg.objects.count(),
+                'notifications': Notification.objects.count(),
+            },
+            'routes': results,
+            'skipped': skipped,
+        }
+
+    def warn_uncovered(self):
+        """Avisa sobre rotas novas em api/urls.py que não estão em ROUTES nem em SKIPPED."""
+        names = {name for name in get_resolver(api_urls).reverse_dict if isinstance(name, str)}
+        covered = {resolve(re.sub(r'{\w+}', '0', template).split('?')[0]).url_name for template in ROUTES}
+        uncovered = sorted(names - covered - set(SKIPPED))
+        if uncovered:
+            self.stdout.write(self.style.WARNING(f"Rotas sem medição: {', '.join(uncovered)}"))
+
+    def report_comparison(self, before, after):
+        self.stdout.write(f"\n{before.get('revision')} -> {after.get('revision')}")
+        for template, now in after['routes'].items():
+            old = before['routes'].get(template)
+            if not old:
+                self.stdout.write(f"{template:<48} (nova)")
+                continue
+            change = (now['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+            self.stdout.write(
+                f"{template:<48} p50 {old['p50_ms']:8.2f} -> {now['p50_ms']:8.2f} ms ({change:+6.1f}%)  "
+                f"consultas {old['queries']:>4} -> {now['queries']:>4}"
+            )
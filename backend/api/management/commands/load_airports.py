@@ -0,0 +1,104 @@
+import csv
+import json
+import tempfile
+from pathlib import Path
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Airport
+
+FIELDS = ('iata', 'name', 'city', 'state', 'country', 'elevation', 'lat', 'lon', 'tz')
+
+
+def read_rows(path):
+    """Lê o airports.json do mwgg (objeto indexado por ICAO ou lista) ou um CSV com as mesmas colunas."""
+    if path.suffix.lower() == '.csv':
+        with path.open(newline='', encoding='utf-8') as handle:
+            yield from csv.DictReader(handle)
+        return
+
+    with path.open(encoding='utf-8') as handle:
+        data = json.load(handle)
+    yield from (data.values() if isinstance(data, dict) else data)
+
+
+def to_airport(row):
+    elevation = row.get('elevation')
+    return Airport(
+        icao=row['icao'].strip().upper(),
+        iata=(row.get('iata') or '').strip().upper(),
+        name=row.get('name') or '',
+        city=row.get('city') or '',
+        state=row.get('state') or '',
+        country=(row.get('country') or '').upper(),
+        elevation=int(float(elevation)) if elevation not in (None, '') else None,
+        lat=float(row['lat']),
+        lon=float(row['lon']),
+        tz=row.get('tz') or '',
+    )
+
+
+def download(url, directory):
+    """Baixa ``url`` para ``directory`` mantendo a extensão (.json/.csv) que decide o formato."""
+    path = Path(directory) / (Path(httpx.URL(url).path).name or 'airports.json')
+    try:
+        with httpx.stream('GET', url, follow_redirects=True, timeout=60) as response:
+            response.raise_for_status()
+            with path.open('wb') as handle:
+                for chunk in response.iter_bytes():
+                    handle.write(chunk)
+    except httpx.HTTPError as error:
+        raise CommandError(f"Falha ao baixar {url}: {error}")
+    return path
+
+
+class Command(BaseCommand):
+    help = (
+        "Carrega/atualiza a tabela de aeroportos a partir de um arquivo ou URL JSON (formato "
+        "mwgg/Airports) ou CSV; sem argumento, baixa AIRPORTS_SOURCE_URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="Arquivo ou URL de um airports.json ou .csv")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        source = options['path'] or settings.AIRPORTS_SOURCE_URL
+        if source.startswith(('http://', 'https://')):
+            with tempfile.TemporaryDirectory() as directory:
+                self.load(download(source, directory), options['batch_size'])
+            return
+
+        path = Path(source)
+        if not path.exists():
+            raise CommandError(f"Arquivo não encontrado: {path}")
+        self.load(path, options['batch_size'])
+
+    def load(self, path, batch_size):
+        batch, total, skipped = [], 0, 0
+        for row in read_rows(path):
+            try:
+                batch.append(to_airport(row))
+            except (KeyError, TypeError, ValueError):
+                skipped += 1
+                continue
+            if len(batch) >= batch_size:
+                total += self.upsert(batch)
+                batch = []
+        if batch:
+            total += self.upsert(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} aeroportos carregados, {skipped} linhas ignoradas."))
+
+    def upsert(self, batch):
+        # O mesmo ICAO pode aparecer duas vezes no lote; o último vence
+        unique = list({airport.icao: airport for airport in batch}.values())
+        Airport.objects.bulk_create(
+            unique,
+            update_conflicts=True,
+            unique_fields=['icao'],
+            update_fields=list(FIELDS),
+        )
+        return len(unique)
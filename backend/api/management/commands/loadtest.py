@@ -0,0 +1,138 @@
+import asyncio
+import json
+import time
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import PilotStats
+
+# Endpoints de leitura do dashboard (views assíncronas)
+DEFAULT_PATHS = (
+    '/users/me/',
+    '/flight-stats/',
+    '/dashboard/rankings/',
+    '/user-metrics/{pilot}/',
+    '/user-approved-flights/{pilot}/',
+)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera carga nos endpoints de leitura de um servidor já em execução e mede vazão e latência. "
+        "Rode uma vez contra o gunicorn WSGI e outra contra o ASGI (uvicorn) e compare com --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--token', help="Token knox; sem ele /users/me/ fica de fora.")
+        parser.add_argument('--pilot', type=int, help="Piloto das métricas/voos (padrão: o com mais voos).")
+        parser.add_argument('--path', action='append', dest='paths', help="Endpoint a testar (repetível).")
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--duration', type=float, default=15.0, help="Segundos de carga.")
+        parser.add_argument('--label', default='run')
+        parser.add_argument('--save', help="Grava o resultado em JSON.")
+        parser.add_argument('--compare', help="Resultado anterior (JSON de --save) para comparar.")
+
+    def handle(self, *args, **options):
+        pilot = options['pilot']
+        if pilot is None:
+            pilot = PilotStats.objects.order_by('-total_flights').values_list('pilot_id', flat=True).first()
+        templates = options['paths'] or DEFAULT_PATHS
+        if pilot is None and any('{pilot}' in path for path in templates):
+            raise CommandError("Nenhum piloto com voos aprovados; informe --pilot.")
+        paths = [path.format(pilot=pilot) for path in templates if options['token'] or path != '/users/me/']
+
+        result = asyncio.run(self.run(options['base_url'], paths, options['token'],
+                                      options['concurrency'], options['duration']))
+        result['label'] = options['label']
+        self.report(result)
+
+        if options['compare']:
+            with open(options['compare']) as file:
+                self.report_comparison(json.load(file), result)
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(result, file, indent=2)
+
+    async def run(self, base_url, paths, token, concurrency, duration):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        latencies = {path: [] for path in paths}
+        errors = {path: 0 for path in paths}
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+            # Aquecimento: abre as conexões e preenche os caches do servidor
+            await asyncio.gather(*(client.get(path) for path in paths))
+            deadline = time.perf_counter() + duration
+
+            async def worker(offset):
+                index = offset
+                while time.perf_counter() < deadline:
+                    path = paths[index % len(paths)]
+                    index += 1
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(path)
+                        ok = response.status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                    if ok:
+                        latencies[path].append(time.perf_counter() - start)
+                    else:
+                        errors[path] += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(i) for i in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+        all_latencies = [value for values in latencies.values() for value in values]
+        return {
+            'base_url': base_url,
+            'concurrency': concurrency,
+            'elapsed': elapsed,
+            'requests': len(all_latencies),
+            'errors': sum(errors.values()),
+            'throughput': len(all_latencies) / elapsed,
+            'p50_ms': percentile(all_latencies, 0.50) * 1000,
+            'p95_ms': percentile(all_latencies, 0.95) * 1000,
+            'p99_ms': percentile(all_latencies, 0.99) * 1000,
+            'paths': {
+                path: {
+                    'requests': len(values),
+                    'errors': errors[path],
+                    'p50_ms': percentile(values, 0.50) * 1000,
+                    'p95_ms': percentile(values, 0.95) * 1000,
+                }
+                for path, values in latencies.items()
+            },
+        }
+
+    def report(self, result):
+        self.stdout.write(
+            f"[{result['label']}] {result['base_url']}  concorrência {result['concurrency']}  "
+            f"{result['elapsed']:.1f}s"
+        )
+        for path, stats in result['paths'].items():
+            self.stdout.write(
+                f"  {path:<34} {stats['requests']:>7} req  {stats['errors']:>4} erros  "
+                f"p50 {stats['p50_ms']:7.1f} ms  p95 {stats['p95_ms']:7.1f} ms"
+            )
+        self.stdout.write(
+            f"  total: {result['throughput']:.1f} req/s  p50 {result['p50_ms']:.1f} ms  "
+            f"p95 {result['p95_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms  erros {result['errors']}"
+        )
+
+    def report_comparison(self, before, after):
+        ratio = after['throughput'] / before['throughput'] if before['throughput'] else float('inf')
+        self.stdout.write(
+            f"{before['label']} -> {after['label']}: {before['throughput']:.1f} -> {after['throughput']:.1f} req/s "
+            f"({ratio:.2f}x), p95 {before['p95_ms']:.1f} -> {after['p95_ms']:.1f} ms"
+        )
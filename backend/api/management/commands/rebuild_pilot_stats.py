@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api import stats
+from api.models import PilotStats
+
+
+class Command(BaseCommand):
+    help = "Recria PilotStats e PilotDailyStats a partir dos PIREPs aprovados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pilot', type=int, action='append', dest='pilots',
+                            help="Recria só este piloto (pode repetir).")
+
+    def handle(self, *args, **options):
+        stats.rebuild(options['pilots'])
+        self.stdout.write(self.style.SUCCESS(f"{PilotStats.objects.count()} pilotos com estatísticas."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api import leaderboards
+
+
+class Command(BaseCommand):
+    help = "Recalcula os snapshots dos rankings por período (rode periodicamente, ex.: a cada 5 minutos no cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--board', action='append', dest='boards', choices=leaderboards.BOARDS,
+                            help="Recalcula só este ranking (pode repetir).")
+
+    def handle(self, *args, **options):
+        for leaderboard in leaderboards.refresh_all(options['boards']):
+            self.stdout.write(f"{leaderboard.board}: {leaderboard.pilot_count} pilotos")
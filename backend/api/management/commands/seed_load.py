@@ -0,0 +1,185 @@
+import math
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api import cache, leaderboards, stats
+from api.choice import CHOICE_AIRCRAFT
+from api.models import (
+    AllowedAircraft, AllowedIcao, Award, FlightLeg, Notification, PirepsFlight, User,
+)
+from api.notifications import pirep_status_message, refresh_unread_counts
+from api.progress import recompute_for_pireps
+
+SEED_EMAIL_DOMAIN = 'seed.invalid'
+SEED_AWARD_PREFIX = '[seed] '
+SEED_PASSWORD = 'seed-password'
+
+# Aeroportos mais movimentados primeiro: a popularidade segue uma lei de Zipf
+AIRPORTS = [
+    'KATL', 'KDFW', 'KDEN', 'KORD', 'KLAX', 'EGLL', 'OMDB', 'LFPG', 'EHAM', 'EDDF',
+    'RJTT', 'KJFK', 'LTFM', 'VIDP', 'LEMD', 'WSSS', 'SBGR', 'KSFO', 'KLAS', 'KMIA',
+    'YSSY', 'CYYZ', 'LIRF', 'LEBL', 'EDDM', 'ZBAA', 'VHHH', 'RKSI', 'OTHH', 'KSEA',
+    'SBRJ', 'SBKP', 'SBBR', 'SBSP', 'SBCF', 'SBPA', 'SBSV', 'SBRF', 'SBFZ', 'SBCT',
+    'MMMX', 'SCEL', 'SAEZ', 'SKBO', 'SPJC', 'LPPT', 'EIDW', 'LSZH', 'LOWW', 'EKCH',
+    'ENGM', 'ESSA', 'EFHK', 'EPWA', 'LKPR', 'LGAV', 'FAOR', 'HECA', 'GMMN', 'NZAA',
+]
+AIRLINES = {'TAM': 8, 'GLO': 8, 'AZU': 6, 'AAL': 5, 'DAL': 5, 'UAL': 4, 'BAW': 3, 'AFR': 3, 'DLH': 3, 'UAE': 2, 'QTR': 2}
+NARROWBODIES = {'A319', 'A320', 'A321', 'A20N', 'A21N', 'B737', 'B738', 'B739', 'B38M', 'E175', 'E190', 'E195'}
+STATUSES = {'Approved': 80, 'In Review': 12, 'Rejected': 8}
+NETWORKS = {'Expert': 6, 'Training': 3, 'Casual': 1}
+
+
+def weighted(rng, weights, k):
+    return rng.choices(list(weights), weights=list(weights.values()), k=k)
+
+
+class Command(BaseCommand):
+    help = (
+        f"Gera dados sintéticos para testes de carga: pilotos (@{SEED_EMAIL_DOMAIN}, senha '{SEED_PASSWORD}'), "
+        "PIREPs com distribuições realistas, Awards com pernas e notificações. Use --clear para remover."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pilots', type=int, default=200)
+        parser.add_argument('--pireps', type=int, default=20000)
+        parser.add_argument('--awards', type=int, default=10)
+        parser.add_argument('--legs', type=int, default=12, help="Pernas por Award.")
+        parser.add_argument('--notifications', type=int, default=10, help="Notificações por piloto.")
+        parser.add_argument('--days', type=int, default=730, help="Período coberto pelos PIREPs.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help="Só remove os dados gerados anteriormente.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with transaction.atomic():
+            removed = self.clear()
+            if options['clear']:
+                self.stdout.write(f"{removed} pilotos e Awards gerados removidos.")
+            else:
+                self.seed(options, random.Random(options['seed']))
+        cache.bump(cache.STATS_NAMESPACE)
+        leaderboards.refresh_all()
+        self.stdout.write(self.style.SUCCESS(f"Concluído em {time.perf_counter() - start:.1f}s"))
+
+    def clear(self):
+        pilots = User.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}')
+        pilot_ids = list(pilots.values_list('pk', flat=True))
+        # Os signals de post_delete recalculam estatísticas/Awards e contadores a cada linha;
+        # rejeitados e lidos (com update, sem signals) eles não têm o que desfazer
+        PirepsFlight.objects.filter(pilot_id__in=pilot_ids).update(status='Rejected')
+        Notification.objects.filter(recipient_id__in=pilot_ids).update(is_read=True)
+        removed = pilots.delete()[1].get(User._meta.label, 0)
+        removed += Award.objects.filter(name__startswith=SEED_AWARD_PREFIX).delete()[1].get(Award._meta.label, 0)
+        return removed
+
+    def seed(self, options, rng):
+        now = timezone.now()
+        password = make_password(SEED_PASSWORD)  # Um único hash para todos os pilotos
+        users = User.objects.bulk_create(
+            [
+                User(email=f'load{i}@{SEED_EMAIL_DOMAIN}', password=password, first_name=f'Load{i}',
+                     last_name='Pilot', country=rng.choice(['BR', 'US', 'PT', 'GB', 'DE']),
+                     date_joined=now - timedelta(days=rng.uniform(0, options['days'])))
+                for i in range(options['pilots'])
+            ],
+            batch_size=1000,
+        )
+        # Poucos pilotos voam muito: atividade de cada piloto também segue Zipf
+        activity = [1 / (rank + 1) for rank in range(len(users))]
+        airport_weights = [1 / math.sqrt(rank + 1) for rank in range(len(AIRPORTS))]
+        aircraft_weights = {code: 8 if code in NARROWBODIES else 1 for code, _ in CHOICE_AIRCRAFT}
+
+        n = options['pireps']
+        pilots = rng.choices(users, weights=activity, k=n)
+        departures = rng.choices(AIRPORTS, weights=airport_weights, k=n)
+        arrivals = rng.choices(AIRPORTS, weights=airport_weights, k=n)
+        pireps = PirepsFlight.objects.bulk_create(
+            [
+                PirepsFlight(
+                    pilot=pilot,
+                    flight_icao=icao,
+                    flight_number=str(rng.randint(1, 9999)),
+                    departure_airport=departure,
+                    # Sem voos de um aeroporto para ele mesmo
+                    arrival_airport=arrival if arrival != departure else AIRPORTS[(AIRPORTS.index(arrival) + 1) % len(AIRPORTS)],
+                    aircraft=aircraft,
+                    flight_duration=timedelta(minutes=round(min(900, max(25, rng.lognormvariate(math.log(110), 0.6))))),
+                    registration_date=now - timedelta(seconds=rng.uniform(0, options['days'] * 86400)),
+                    network=network,
+                    status=status,
+                )
+                for pilot, departure, arrival, icao, aircraft, network, status in zip(
+                    pilots, departures, arrivals,
+                    weighted(rng, AIRLINES, n), weighted(rng, aircraft_weights, n),
+                    weighted(rng, NETWORKS, n), weighted(rng, STATUSES, n),
+                )
+            ],
+            batch_size=1000,
+        )
+
+        self.seed_awards(options, rng, airport_weights, aircraft_weights)
+        self.seed_notifications(options, rng, pireps)
+
+        approved = [pirep for pirep in pireps if pirep.status == 'Approved']
+        stats.rebuild([user.pk for user in users])
+        user_awards = recompute_for_pireps(approved)
+        self.stdout.write(
+            f"{len(users)} pilotos, {len(pireps)} PIREPs ({len(approved)} aprovados), "
+            f"{options['awards']} Awards x {options['legs']} pernas, {user_awards} progressos de Award"
+        )
+
+    def seed_awards(self, options, rng, airport_weights, aircraft_weights):
+        awards = Award.objects.bulk_create([
+            Award(name=f"{SEED_AWARD_PREFIX}World Tour {i + 1}", description="Award gerado por seed_load")
+            for i in range(options['awards'])
+        ])
+        legs, icaos, aircrafts = [], [], []
+        for award in awards:
+            # Rota encadeada: a chegada de uma perna é a partida da próxima
+            route = [rng.choices(AIRPORTS, weights=airport_weights)[0]]
+            while len(route) <= options['legs']:
+                airport = rng.choices(AIRPORTS, weights=airport_weights)[0]
+                if airport != route[-1]:
+                    route.append(airport)
+            legs.extend(
+                FlightLeg(award=award, leg_number=i + 1, from_airport=route[i], to_airport=route[i + 1])
+                for i in range(options['legs'])
+            )
+            # Um terço dos Awards restringe companhia e/ou aeronave
+            if rng.random() < 1 / 3:
+                icaos.extend(AllowedIcao(award=award, company_icao=icao) for icao in rng.sample(list(AIRLINES), 3))
+            if rng.random() < 1 / 3:
+                aircrafts.extend(
+                    AllowedAircraft(award=award, aircraft=code)
+                    for code in rng.sample(sorted(NARROWBODIES & set(aircraft_weights)), 4)
+                )
+        FlightLeg.objects.bulk_create(legs, batch_size=1000)
+        AllowedIcao.objects.bulk_create(icaos)
+        AllowedAircraft.objects.bulk_create(aircrafts)
+
+    def seed_notifications(self, options, rng, pireps):
+        # As notificações de status dos PIREPs revisados mais recentes de cada piloto
+        reviewed = sorted(
+            (pirep for pirep in pireps if pirep.status != 'In Review'),
+            key=lambda pirep: pirep.registration_date, reverse=True,
+        )
+        per_pilot = {}
+        for pirep in reviewed:
+            per_pilot.setdefault(pirep.pilot_id, [])
+            if len(per_pilot[pirep.pilot_id]) < options['notifications']:
+                per_pilot[pirep.pilot_id].append(pirep)
+        Notification.objects.bulk_create(
+            [
+                Notification(recipient_id=pirep.pilot_id, message=pirep_status_message(pirep),
+                             dedupe_key=f'pirep:{pirep.pk}:{pirep.status}', is_read=rng.random() < 0.4)
+                for recent in per_pilot.values() for pirep in recent
+            ],
+            batch_size=1000,
+        )
+        refresh_unread_counts(per_pilot)
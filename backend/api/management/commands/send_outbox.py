@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.outbox import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = "Envia os emails pendentes do EmailOutbox em lotes, reaproveitando a conexão SMTP."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help="Continua rodando e verificando a fila.")
+        parser.add_argument('--interval', type=float, default=5, help="Segundos entre verificações com --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            sent, failed = deliver_outbox(options['batch_size'])
+            if sent or failed or not options['loop']:
+                self.stdout.write(f"{sent} enviados, {failed} com falha.")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
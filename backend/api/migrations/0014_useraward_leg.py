@@ -0,0 +1,59 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_completed_legs(apps, schema_editor):
+    """Preenche as pernas concluídas dos UserAwards existentes a partir dos voos aprovados."""
+    UserAward = apps.get_model('api', 'UserAward')
+    UserAwardLeg = apps.get_model('api', 'UserAwardLeg')
+    PirepsFlight = apps.get_model('api', 'PirepsFlight')
+
+    for user_award in UserAward.objects.select_related('award').iterator():
+        award = user_award.award
+        icaos = {icao.company_icao.upper() for icao in award.allowed_icao.all()}
+        aircrafts = {aircraft.aircraft for aircraft in award.allowed_aircrafts.all()}
+
+        flights = {}
+        for flight in PirepsFlight.objects.filter(pilot_id=user_award.user_id, status='Approved'):
+            if icaos and (flight.flight_icao or '').upper() not in icaos:
+                continue
+            if aircrafts and flight.aircraft not in aircrafts:
+                continue
+            route = (flight.departure_airport.upper(), flight.arrival_airport.upper())
+            flights.setdefault(route, flight.pk)
+
+        UserAwardLeg.objects.bulk_create(
+            [
+                UserAwardLeg(user_award=user_award, flight_leg=leg, pirep_id=flights[(leg.from_airport, leg.to_airport)])
+                for leg in award.flight_legs.all()
+                if (leg.from_airport, leg.to_airport) in flights
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_notification_is_read'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAwardLeg',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('flight_leg', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.flightleg')),
+                ('pirep', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='api.pirepsflight')),
+                ('user_award', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completed_legs', to='api.useraward')),
+            ],
+            options={
+                'unique_together': {('user_award', 'flight_leg')},
+            },
+        ),
+        migrations.RunPython(backfill_completed_legs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:28
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_useraward_leg'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PilotStats',
+            fields=[
+                ('pilot', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_flights', models.PositiveIntegerField(default=0)),
+                ('total_duration', models.DurationField(default=datetime.timedelta)),
+                ('last_approved_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-total_duration'], name='pilotstats_duration_idx'), models.Index(fields=['-total_flights'], name='pilotstats_flights_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PilotDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('flights', models.PositiveIntegerField(default=0)),
+                ('duration', models.DurationField(default=datetime.timedelta)),
+                ('pilot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('pilot', 'day')},
+            },
+        ),
+    ]
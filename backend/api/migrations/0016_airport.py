@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:30
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_pilot_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Airport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('icao', models.CharField(max_length=8, unique=True)),
+                ('iata', models.CharField(blank=True, db_index=True, max_length=4)),
+                ('name', models.CharField(max_length=200)),
+                ('city', models.CharField(blank=True, max_length=200)),
+                ('state', models.CharField(blank=True, max_length=200)),
+                ('country', models.CharField(blank=True, max_length=2)),
+                ('elevation', models.IntegerField(blank=True, null=True)),
+                ('lat', models.FloatField()),
+                ('lon', models.FloatField()),
+                ('tz', models.CharField(blank=True, max_length=64)),
+            ],
+            options={
+                'indexes': [models.Index(django.db.models.functions.text.Upper('name'), name='airport_name_upper_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_airport'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flightleg',
+            index=models.Index(fields=['from_airport', 'to_airport'], name='flightleg_route_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['recipient', '-created_at'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pirepsflight',
+            index=models.Index(fields=['pilot', 'status', 'registration_date'], name='pirep_pilot_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pirepsflight',
+            index=models.Index(fields=['status', 'registration_date'], name='pirep_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pirepsflight',
+            index=models.Index(fields=['departure_airport', 'arrival_airport', 'pilot'], name='pirep_route_pilot_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notification_unread_idx',
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['date_joined', 'id'], name='user_date_joined_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['recipient', '-created_at', '-id'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pirepsflight',
+            index=models.Index(fields=['pilot', 'registration_date', 'id'], name='pirep_pilot_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pirepsflight',
+            index=models.Index(fields=['registration_date', 'id'], name='pirep_date_idx'),
+        ),
+    ]
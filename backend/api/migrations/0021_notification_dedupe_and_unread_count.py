@@ -0,0 +1,57 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:46
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_dedupe_keys_and_counts(apps, schema_editor):
+    """
+    Chaves das notificações de World Tour já enviadas (a mensagem identifica o award) e
+    contadores de não lidas. As notificações de PIREP antigas ficam sem chave, assim como
+    as de awards com nome repetido: pela mensagem não dá para saber de qual deles é.
+    """
+    Award = apps.get_model('api', 'Award')
+    Notification = apps.get_model('api', 'Notification')
+    CustomUser = apps.get_model('api', 'CustomUser')
+
+    repeated = Award.objects.values('name').annotate(total=Count('id')).filter(total__gt=1).values('name')
+    for award in Award.objects.exclude(name__in=repeated).only('id', 'name'):
+        message = f"🏆 Um novo World Tour foi criado: '{award.name}'!"
+        # Só a primeira de cada piloto recebe a chave (duplicatas antigas ficam sem)
+        first_ids = (
+            Notification.objects.filter(message=message)
+            .values('recipient_id').annotate(first=models.Min('id')).values_list('first', flat=True)
+        )
+        Notification.objects.filter(pk__in=list(first_ids)).update(dedupe_key=f'award:{award.pk}')
+
+    unread = (
+        Notification.objects.filter(recipient=OuterRef('pk'), is_read=False)
+        .order_by().values('recipient').annotate(total=Count('id')).values('total')
+    )
+    CustomUser.objects.update(unread_notifications=Coalesce(Subquery(unread), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='dedupe_key',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(backfill_dedupe_keys_and_counts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('recipient', 'dedupe_key'), name='notification_dedupe_uniq'),
+        ),
+    ]
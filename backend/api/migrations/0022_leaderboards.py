@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_notification_dedupe_and_unread_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Leaderboard',
+            fields=[
+                ('board', models.CharField(choices=[('weekly', 'Semana'), ('monthly', 'Mês'), ('yearly', 'Ano'), ('all-time', 'Geral')], max_length=10, primary_key=True, serialize=False)),
+                ('period_start', models.DateField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField()),
+                ('pilot_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flights', models.PositiveIntegerField()),
+                ('duration', models.DurationField()),
+                ('flights_rank', models.PositiveIntegerField()),
+                ('duration_rank', models.PositiveIntegerField()),
+                ('leaderboard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='api.leaderboard')),
+                ('pilot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['leaderboard', 'duration_rank', 'pilot'], name='leaderboard_duration_idx'), models.Index(fields=['leaderboard', 'flights_rank', 'pilot'], name='leaderboard_flights_idx')],
+                'constraints': [models.UniqueConstraint(fields=('leaderboard', 'pilot'), name='leaderboard_entry_pilot_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_leaderboards'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userawardleg',
+            name='pirep',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.pirepsflight'),
+        ),
+    ]
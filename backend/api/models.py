@@ -1,17 +1,19 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth import get_user_model
 from api.choice import CHOICE_AIRCRAFT
 from django.utils import timezone
+from datetime import timedelta
 
-from django.core.mail import EmailMultiAlternatives
 from django.dispatch import receiver
 from django.template.loader import render_to_string
 from django.urls import reverse
 
 from django_rest_passwordreset.signals import reset_password_token_created
 from django.utils.html import strip_tags
+from model_utils import FieldTracker
 
 
 class CustomUserManager(BaseUserManager):
@@ -38,9 +40,17 @@ class CustomUser(AbstractUser):
     usernameIFC = models.CharField(max_length=200, blank=True, null=True)
     country = models.CharField(max_length=200, blank=True)
     username = models.CharField(max_length=200, null=True, blank=True)
+    # Notificações não lidas, mantido pelos signals e por api.notifications.refresh_unread_counts
+    unread_notifications = models.PositiveIntegerField(default=0)
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['date_joined', 'id'], name='user_date_joined_idx'),
+            models.Index(Upper('email'), name='user_email_upper_idx'),
+        ]
+
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
@@ -68,6 +78,11 @@ class FlightLeg(models.Model):
     to_airport = models.CharField(max_length=4)
     leg_number = models.PositiveIntegerField(editable=False)  # Número da perna
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['from_airport', 'to_airport'], name='flightleg_route_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         self.from_airport = self.from_airport.upper()
         self.to_airport = self.to_airport.upper()
@@ -109,58 +124,12 @@ class UserAward(models.Model):
         return f"{self.user.email} - {self.award.name}"
 
     def check_award_completion(self, user_flights):
-        completed_flights = 0
-        total_flights = self.award.flight_legs.count()
-
-        # Coletar ICAOs permitidos e aeronaves permitidas
-        allowed_icaos = [icao.company_icao.upper() for icao in self.award.allowed_icao.all()]
-        allowed_aircrafts = [aircraft.aircraft for aircraft in self.award.allowed_aircrafts.all()]
-
-        print(f"ICAOs permitidos: {allowed_icaos}")
-        print(f"Aeronaves permitidas: {allowed_aircrafts}")
-
-        for required_flight in self.award.flight_legs.all():
-            for user_flight in user_flights:
-                print(f"Verificando voo do usuário: {user_flight.flight_icao} ({user_flight.departure_airport} -> {user_flight.arrival_airport})")
-
-                # Verificar se os aeroportos batem
-                if required_flight.from_airport == user_flight.departure_airport and required_flight.to_airport == user_flight.arrival_airport:
-                    print(f"Voo entre aeroportos corretos: {required_flight.from_airport} -> {required_flight.to_airport}")
-                    
-                    # Verificar se precisa checar ICAO (caso haja ICAOs definidos)
-                    icao_check = not allowed_icaos or user_flight.flight_icao.upper() in allowed_icaos
-                    if not allowed_icaos:
-                        print("Nenhum ICAO exigido para este prêmio, ignorando verificação de ICAO.")
-                    elif icao_check:
-                        print(f"ICAO {user_flight.flight_icao} corresponde a um ICAO permitido.")
-
-                    # Verificar se precisa checar aeronaves (caso haja aeronaves definidas)
-                    aircraft_check = not allowed_aircrafts or user_flight.aircraft in allowed_aircrafts
-                    if not allowed_aircrafts:
-                        print("Nenhuma aeronave exigida para este prêmio, ignorando verificação de aeronaves.")
-                    elif aircraft_check:
-                        print(f"Aeronave {user_flight.aircraft} corresponde a uma aeronave permitida.")
-
-                    # Checar se todos os critérios (quando aplicáveis) estão corretos
-                    if icao_check and aircraft_check:
-                        print(f"Voo {user_flight.flight_icao} corresponde a todos os critérios.")
-                        completed_flights += 1
-                        break  # Para de verificar outros voos, pois este já completou o trecho
-                    else:
-                        print(f"Voo {user_flight.flight_icao} não corresponde a todos os critérios.")
-        
-        # Calcular progresso
-        if total_flights > 0:
-            progress = (completed_flights / total_flights) * 100
-        else:
-            progress = 0
+        """
+        Recalcula o progresso a partir dos voos informados (já filtrados como aprovados).
+        """
+        from .progress import build_flight_index, recompute_user_award
 
-        print(f"Progresso final: {progress}%")
-        
-        self.progress = progress
-        if progress == 100 and not self.end_date:
-            self.end_date = timezone.now()
-        self.save()
+        recompute_user_award(self, build_flight_index(user_flights))
 
 
     def start_award(self):
@@ -178,6 +147,19 @@ class UserAward(models.Model):
         def __str__(self):
             return self.name
         
+class UserAwardLeg(models.Model):
+    """Perna de um Award já concluída pelo piloto, com o PIREP que a completou."""
+    user_award = models.ForeignKey(UserAward, related_name='completed_legs', on_delete=models.CASCADE)
+    flight_leg = models.ForeignKey(FlightLeg, on_delete=models.CASCADE)
+    pirep = models.ForeignKey('PirepsFlight', null=True, blank=True, on_delete=models.SET_NULL)  # Recalculado no delete
+    completed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('user_award', 'flight_leg')
+
+    def __str__(self):
+        return f"{self.user_award_id} - {self.flight_leg}"
+
 class PirepsFlight (models.Model):
     STATUS_CHOICES = [
         ('In Review', 'In Review'),
@@ -198,6 +180,22 @@ class PirepsFlight (models.Model):
     observation = models.TextField(max_length=500, null=True, blank=True)  # Permite valores nulos e campos em branco
     # Outros campos relevantes sobre o voo
 
+    # Valores gravados no banco, para os signals saberem o que de fato mudou no save
+    tracker = FieldTracker(fields=[
+        'status', 'flight_duration', 'registration_date',
+        'departure_airport', 'arrival_airport', 'flight_icao', 'aircraft',
+    ])
+
+    class Meta:
+        # Índices compostos completos: o SQLite não usa índices parciais em consultas parametrizadas
+        indexes = [
+            models.Index(fields=['pilot', 'status', 'registration_date'], name='pirep_pilot_status_date_idx'),
+            models.Index(fields=['pilot', 'registration_date', 'id'], name='pirep_pilot_date_idx'),
+            models.Index(fields=['registration_date', 'id'], name='pirep_date_idx'),
+            models.Index(fields=['status', 'registration_date'], name='pirep_status_date_idx'),
+            models.Index(fields=['departure_airport', 'arrival_airport', 'pilot'], name='pirep_route_pilot_idx'),
+        ]
+
     def __str__(self):
         return f"{self.flight_number} - {self.pilot.first_name}"
     
@@ -207,10 +205,139 @@ class Notification(models.Model):
     image = models.URLField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)  # Novo campo
+    # Identifica o evento notificado (ex.: "pirep:12:Approved"); o mesmo evento não é notificado duas vezes
+    dedupe_key = models.CharField(max_length=100, null=True, blank=True)
+
+    tracker = FieldTracker(fields=['is_read'])
+
+    class Meta:
+        indexes = [
+            # Parcial: o filtro is_read=False vira "NOT is_read" no SQL, sem parâmetro, e casa com o índice
+            models.Index(fields=['recipient', '-created_at', '-id'], condition=models.Q(is_read=False), name='notification_unread_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['recipient', 'dedupe_key'], name='notification_dedupe_uniq'),
+        ]
 
     def __str__(self):
         return f"Notification for {self.recipient.username}: {self.message}"
     
+class PilotStats(models.Model):
+    """Totais de voos aprovados por piloto, mantidos a cada mudança de status dos PIREPs."""
+    pilot = models.OneToOneField(User, primary_key=True, related_name='stats', on_delete=models.CASCADE)
+    total_flights = models.PositiveIntegerField(default=0)
+    total_duration = models.DurationField(default=timedelta)
+    last_approved_at = models.DateTimeField(null=True, blank=True)  # Data do voo aprovado mais recente
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-total_duration'], name='pilotstats_duration_idx'),
+            models.Index(fields=['-total_flights'], name='pilotstats_flights_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.pilot_id}: {self.total_flights} voos"
+
+class PilotDailyStats(models.Model):
+    """Voos aprovados por piloto e dia, base das janelas móveis (últimos N dias)."""
+    pilot = models.ForeignKey(User, related_name='daily_stats', on_delete=models.CASCADE)
+    day = models.DateField()
+    flights = models.PositiveIntegerField(default=0)
+    duration = models.DurationField(default=timedelta)
+
+    class Meta:
+        unique_together = ('pilot', 'day')
+
+    def __str__(self):
+        return f"{self.pilot_id} {self.day}: {self.flights} voos"
+
+class Leaderboard(models.Model):
+    """Snapshot de um ranking por período, recalculado por ``api.leaderboards.refresh``."""
+    BOARD_CHOICES = [
+        ('weekly', 'Semana'),
+        ('monthly', 'Mês'),
+        ('yearly', 'Ano'),
+        ('all-time', 'Geral'),
+    ]
+    board = models.CharField(max_length=10, primary_key=True, choices=BOARD_CHOICES)
+    period_start = models.DateField(null=True, blank=True)  # Vazio no ranking geral
+    refreshed_at = models.DateTimeField()
+    pilot_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.board} ({self.period_start or 'geral'})"
+
+class LeaderboardEntry(models.Model):
+    """Posição de um piloto num ``Leaderboard``; empates dividem a posição (1, 1, 3)."""
+    leaderboard = models.ForeignKey(Leaderboard, related_name='entries', on_delete=models.CASCADE)
+    pilot = models.ForeignKey(User, related_name='leaderboard_entries', on_delete=models.CASCADE)
+    flights = models.PositiveIntegerField()
+    duration = models.DurationField()
+    flights_rank = models.PositiveIntegerField()
+    duration_rank = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['leaderboard', 'pilot'], name='leaderboard_entry_pilot_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['leaderboard', 'duration_rank', 'pilot'], name='leaderboard_duration_idx'),
+            models.Index(fields=['leaderboard', 'flights_rank', 'pilot'], name='leaderboard_flights_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.leaderboard_id} {self.pilot_id}: #{self.duration_rank} / #{self.flights_rank}"
+
+class Airport(models.Model):
+    """Aeroporto (mesmos campos do airports.json do mwgg/Airports), carregado por manage.py load_airports."""
+    icao = models.CharField(max_length=8, unique=True)
+    iata = models.CharField(max_length=4, blank=True, db_index=True)
+    name = models.CharField(max_length=200)
+    city = models.CharField(max_length=200, blank=True)
+    state = models.CharField(max_length=200, blank=True)
+    country = models.CharField(max_length=2, blank=True)
+    elevation = models.IntegerField(null=True, blank=True)
+    lat = models.FloatField()
+    lon = models.FloatField()
+    tz = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(Upper('name'), name='airport_name_upper_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.icao} - {self.name}"
+
+class EmailOutbox(models.Model):
+    """Email aguardando envio pelo worker (``python manage.py send_outbox``)."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
 @receiver(reset_password_token_created)
 def password_reset_token_created(sender, instance, reset_password_token, *args, **kwargs):
     site_link = "http://localhost:5173/"
@@ -224,11 +351,12 @@ def password_reset_token_created(sender, instance, reset_password_token, *args,
     html_message = render_to_string("backend/email_template.html", context)
     plain_message = strip_tags(html_message)
 
-    msg = EmailMultiAlternatives(
+    # Só enfileira: o envio fica com o worker do outbox (api.outbox)
+    from .outbox import enqueue_email
+    enqueue_email(
         subject=f"Password Reset Request for {reset_password_token.user.email}",
         body=plain_message,
+        html_body=html_message,
         from_email="admin@myproject.com",
         to=[reset_password_token.user.email],
     )
-    msg.attach_alternative(html_message, "text/html")
-    msg.send()
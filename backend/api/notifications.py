@@ -0,0 +1,80 @@
+"""
+Envio de notificações.
+
+Cada notificação gerada pelo sistema tem uma ``dedupe_key`` que identifica o evento;
+a restrição única (recipient, dedupe_key) deixa o banco descartar repetições nos
+inserts em lote (``ignore_conflicts``). Como ``bulk_create`` não dispara signals, o
+contador ``User.unread_notifications`` dos destinatários é recalculado em seguida.
+"""
+from django.conf import settings
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import events
+from .models import Award, Notification, User
+
+
+def award_created_message(award):
+    return f"🏆 Um novo World Tour foi criado: '{award.name}'!"
+
+
+def pirep_status_message(pirep):
+    """Mensagem enviada ao piloto quando o PIREP é aprovado ou rejeitado (None nos outros casos)."""
+    if pirep.status == "Approved":
+        return f"🥳🎉🛬 Seu voo {pirep.flight_icao} {pirep.flight_number} foi aprovado!"
+    if pirep.status == "Rejected":
+        return f"❌ Seu voo {pirep.flight_icao} {pirep.flight_number} foi rejeitado."
+    return None
+
+
+def refresh_unread_counts(user_ids):
+    """Recalcula ``unread_notifications`` dos usuários informados numa única consulta."""
+    unread = (
+        Notification.objects.filter(recipient=OuterRef('pk'), is_read=False)
+        .order_by().values('recipient').annotate(total=Count('id')).values('total')
+    )
+    User.objects.filter(pk__in=list(user_ids)).update(unread_notifications=Coalesce(Subquery(unread), 0))
+
+
+def create_notifications(notifications):
+    """Insere as notificações ignorando eventos já notificados e atualiza os contadores."""
+    if not notifications:
+        return
+    Notification.objects.bulk_create(
+        notifications, batch_size=getattr(settings, 'NOTIFICATION_BULK_SIZE', 1000), ignore_conflicts=True
+    )
+    recipients = {notification.recipient_id for notification in notifications}
+    refresh_unread_counts(recipients)
+    events.publish_on_commit(recipients)
+
+
+def notify_pilots_of_status(pireps):
+    """Notifica de uma vez os pilotos de PIREPs aprovados ou rejeitados."""
+    create_notifications([
+        Notification(recipient_id=pirep.pilot_id, message=message, dedupe_key=f'pirep:{pirep.pk}:{pirep.status}')
+        for pirep in pireps
+        if (message := pirep_status_message(pirep))
+    ])
+
+
+def notify_all_users_of_award(award_id):
+    """
+    Cria a notificação de novo World Tour para todos os usuários, em lotes.
+
+    Usuários que já receberam a notificação deste award são ignorados pelo banco.
+    """
+    award = Award.objects.filter(pk=award_id).first()
+    if award is None:
+        return
+
+    message = award_created_message(award)
+    dedupe_key = f'award:{award.pk}'
+    chunk_size = getattr(settings, 'NOTIFICATION_BULK_SIZE', 1000)
+
+    batch = []
+    for user_id in User.objects.values_list('id', flat=True).iterator(chunk_size=chunk_size):
+        batch.append(Notification(recipient_id=user_id, message=message, dedupe_key=dedupe_key))
+        if len(batch) >= chunk_size:
+            create_notifications(batch)
+            batch = []
+    create_notifications(batch)
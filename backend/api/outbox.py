@@ -0,0 +1,118 @@
+"""
+Fila de emails (``EmailOutbox``) e o seu envio em lotes.
+
+As requisições só gravam a mensagem; o envio acontece no worker
+(``python manage.py send_outbox``) ou, com ``EMAIL_OUTBOX_DELIVER_IN_PROCESS``,
+numa tarefa em segundo plano depois do commit. Cada lote usa uma única conexão
+SMTP; falhas são tentadas de novo com espera exponencial até
+``EMAIL_OUTBOX_MAX_ATTEMPTS``.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import jobs
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject, body, to, html_body='', from_email=None):
+    message = EmailOutbox.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+    )
+    if settings.EMAIL_OUTBOX_DELIVER_IN_PROCESS:
+        jobs.enqueue(deliver_outbox)
+    return message
+
+
+def backoff(attempts):
+    """Espera antes da próxima tentativa: base * 2^(tentativas - 1), com teto."""
+    delay = settings.EMAIL_OUTBOX_RETRY_BASE * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_RETRY_MAX))
+
+
+def claim_batch(batch_size):
+    """
+    Reserva até ``batch_size`` mensagens vencidas, adiando ``next_attempt_at`` para que
+    outro worker não pegue as mesmas enquanto este envia.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = EmailOutbox.objects.filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due[:batch_size])
+        EmailOutbox.objects.filter(pk__in=[message.pk for message in batch]).update(
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+        )
+    return batch
+
+
+def build_message(message, mail_connection):
+    email = EmailMultiAlternatives(
+        subject=message.subject,
+        body=message.body,
+        from_email=message.from_email or None,
+        to=message.to,
+        connection=mail_connection,
+    )
+    if message.html_body:
+        email.attach_alternative(message.html_body, 'text/html')
+    return email
+
+
+def deliver_batch(batch_size=None):
+    """Envia um lote pela mesma conexão. Retorna (enviadas, falhas)."""
+    batch = claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    mail_connection = get_connection()
+    try:
+        for message in batch:
+            try:
+                # Aberta aqui (e não pelo send) a conexão continua aberta para as próximas
+                mail_connection.open()
+                build_message(message, mail_connection).send()
+            except Exception as error:
+                failed += 1
+                message.attempts += 1
+                message.last_error = str(error)[:1000]
+                if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    message.status = 'failed'
+                    logger.error("Email %s descartado após %s tentativas: %s", message.pk, message.attempts, error)
+                else:
+                    message.next_attempt_at = timezone.now() + backoff(message.attempts)
+                # A conexão pode ter caído; a próxima mensagem abre outra
+                mail_connection.close()
+            else:
+                sent += 1
+                message.attempts += 1
+                message.status = 'sent'
+                message.sent_at = timezone.now()
+                message.last_error = ''
+            message.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    finally:
+        mail_connection.close()
+    return sent, failed
+
+
+def deliver_outbox(batch_size=None):
+    """Envia lotes até não haver mais mensagens vencidas. Retorna (enviadas, falhas)."""
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = deliver_batch(batch_size)
+        if not sent and not failed:
+            return total_sent, total_failed
+        total_sent += sent
+        total_failed += failed
@@ -0,0 +1,111 @@
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
+
+
+def pagination_requested(request, *params):
+    return any(param in request.query_params for param in params)
+
+
+class OptionalPageNumberPagination(PageNumberPagination):
+    """
+    Paginação por página, ativada só quando o cliente envia ``page`` ou ``page_size``.
+
+    Clientes antigos continuam recebendo a lista completa.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not pagination_requested(request, self.page_query_param, self.page_size_query_param):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class OptionalCursorPagination(CursorPagination):
+    """
+    Paginação por cursor sobre uma chave estável, ativada com ``cursor`` ou ``page_size``.
+
+    O custo de cada página não depende da sua posição na lista (sem OFFSET). Ao contrário do
+    ``CursorPagination`` do DRF, a posição guarda todos os campos de ``ordering`` e não só o
+    primeiro: com datas empatadas o DRF recorre a um offset que o link ``previous`` perde.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not pagination_requested(request, self.cursor_query_param, self.page_size_query_param):
+            return None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.after(ordering, self.load_position(current_position)))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following_position is not None
+            self.next_position, self.previous_position = current_position, following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position, self.previous_position = following_position, current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    @staticmethod
+    def after(ordering, values):
+        """Linhas depois de ``values`` em ``ordering``: (a, b) > (x, y) vira a >= x AND (a > x OR (a = x AND b > y))."""
+        fields = [(field.lstrip('-'), 'lt' if field.startswith('-') else 'gt') for field in ordering]
+        keyset, equal = Q(), Q()
+        for (field, op), value in zip(fields, values):
+            keyset |= equal & Q(**{f'{field}__{op}': value})
+            equal &= Q(**{field: value})
+        field, op = fields[0]
+        return Q(**{f'{field}__{op}e': values[0]}) & keyset
+
+    def load_position(self, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            values = None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _get_position_from_instance(self, instance, ordering):
+        fields = [field.lstrip('-') for field in ordering]
+        if isinstance(instance, dict):
+            return json.dumps([str(instance[field]) for field in fields])
+        return json.dumps([str(getattr(instance, field)) for field in fields])
+
+
+class FlightCursorPagination(OptionalCursorPagination):
+    ordering = ('-registration_date', '-id')
+
+
+class NotificationCursorPagination(OptionalCursorPagination):
+    ordering = ('-created_at', '-id')
+
+
+class UserCursorPagination(OptionalCursorPagination):
+    ordering = ('date_joined', 'id')
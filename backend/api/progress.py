@@ -0,0 +1,191 @@
+"""
+Motor de progresso dos Awards (World Tours).
+
+Em vez de comparar cada perna com cada voo aprovado do piloto, o progresso é
+guardado por perna em ``UserAwardLeg``. Uma aprovação só toca nas pernas com a
+mesma rota do PIREP; o recálculo completo monta um índice dos voos aprovados do
+piloto uma única vez e consulta cada perna nesse índice.
+"""
+from collections import defaultdict
+
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Award, FlightLeg, PirepsFlight, UserAward, UserAwardLeg
+
+
+def route_key(departure, arrival):
+    return (departure or '').upper(), (arrival or '').upper()
+
+
+def build_flight_index(flights):
+    """
+    Agrupa voos por rota: {(partida, chegada): [(icao, aeronave, pirep_id), ...]}.
+    """
+    index = defaultdict(list)
+    for flight in flights:
+        index[route_key(flight.departure_airport, flight.arrival_airport)].append(
+            ((flight.flight_icao or '').upper(), flight.aircraft, flight.pk)
+        )
+    return index
+
+
+def approved_flight_index(user_id):
+    flights = PirepsFlight.objects.filter(pilot_id=user_id, status='Approved').only(
+        'id', 'departure_airport', 'arrival_airport', 'flight_icao', 'aircraft'
+    )
+    return build_flight_index(flights)
+
+
+class AwardRules:
+    """Restrições de ICAO/aeronave de um Award (listas vazias = sem restrição)."""
+
+    def __init__(self, award):
+        self.icaos = {icao.company_icao.upper() for icao in award.allowed_icao.all()}
+        self.aircrafts = {aircraft.aircraft for aircraft in award.allowed_aircrafts.all()}
+
+    def accepts(self, flight_icao, aircraft):
+        if self.icaos and (flight_icao or '').upper() not in self.icaos:
+            return False
+        if self.aircrafts and aircraft not in self.aircrafts:
+            return False
+        return True
+
+
+def _progress(completed, total):
+    return int(completed / total * 100) if total else 0
+
+
+def _store_progress(user_award, total_legs):
+    completed = user_award.completed_legs.count()
+    user_award.progress = _progress(completed, total_legs)
+    if user_award.progress == 100 and not user_award.end_date:
+        user_award.end_date = timezone.now()
+    user_award.save(update_fields=['progress', 'end_date'])
+
+
+def recompute_user_award(user_award, flight_index=None):
+    """
+    Recalcula do zero as pernas concluídas de um UserAward.
+
+    ``flight_index`` pode ser reaproveitado entre vários awards do mesmo piloto.
+    """
+    if flight_index is None:
+        flight_index = approved_flight_index(user_award.user_id)
+
+    award = user_award.award
+    rules = AwardRules(award)
+    legs = list(award.flight_legs.all())
+
+    completed = []
+    for leg in legs:
+        for icao, aircraft, pirep_id in flight_index.get(route_key(leg.from_airport, leg.to_airport), ()):
+            if rules.accepts(icao, aircraft):
+                completed.append(UserAwardLeg(user_award=user_award, flight_leg=leg, pirep_id=pirep_id))
+                break
+
+    user_award.completed_legs.exclude(flight_leg__in=[entry.flight_leg for entry in completed]).delete()
+    # Pernas que já existiam passam a apontar para o PIREP aprovado atual: o anterior pode
+    # ter sido rejeitado e, ao ser excluído, não pode levar junto uma perna ainda cumprida
+    UserAwardLeg.objects.bulk_create(
+        completed, update_conflicts=True, unique_fields=['user_award', 'flight_leg'], update_fields=['pirep'],
+    )
+    _store_progress(user_award, len(legs))
+
+
+def apply_approved_pirep(pirep):
+    """
+    Aplica um PIREP recém-aprovado ao progresso guardado.
+
+    O custo depende só das pernas com a mesma rota do voo, não do histórico do piloto.
+    """
+    legs = FlightLeg.objects.filter(
+        from_airport=(pirep.departure_airport or '').upper(),
+        to_airport=(pirep.arrival_airport or '').upper(),
+    )
+    legs_by_award = defaultdict(list)
+    for leg in legs:
+        legs_by_award[leg.award_id].append(leg)
+    if not legs_by_award:
+        return
+
+    awards = (
+        Award.objects.filter(pk__in=legs_by_award)
+        .annotate(total_legs=Count('flight_legs'))
+        .prefetch_related('allowed_icao', 'allowed_aircrafts')
+    )
+    for award in awards:
+        user_award, created = UserAward.objects.get_or_create(
+            user_id=pirep.pilot_id,
+            award=award,
+            defaults={'progress': 0, 'start_date': timezone.now()},
+        )
+        if not created and not user_award.start_date:
+            user_award.start_date = timezone.now()
+            user_award.save(update_fields=['start_date'])
+
+        if AwardRules(award).accepts(pirep.flight_icao, pirep.aircraft):
+            UserAwardLeg.objects.bulk_create(
+                [UserAwardLeg(user_award=user_award, flight_leg=leg, pirep=pirep) for leg in legs_by_award[award.pk]],
+                ignore_conflicts=True,
+            )
+        _store_progress(user_award, award.total_legs)
+
+
+def recompute_for_pireps(pireps, create_missing=True):
+    """
+    Recalcula, uma única vez cada, os pares (piloto, award) afetados por vários PIREPs.
+
+    Um award é afetado quando tem alguma perna na rota de um dos PIREPs do piloto. Com
+    ``create_missing`` (aprovações) o UserAward é criado se ainda não existir, como em
+    ``apply_approved_pirep``. Retorna o número de pares recalculados.
+    """
+    routes_by_pilot = defaultdict(set)
+    for pirep in pireps:
+        routes_by_pilot[pirep.pilot_id].add(route_key(pirep.departure_airport, pirep.arrival_airport))
+    if not routes_by_pilot:
+        return 0
+
+    all_routes = set().union(*routes_by_pilot.values())
+    award_routes = defaultdict(set)
+    for award_id, departure, arrival in FlightLeg.objects.filter(
+        from_airport__in={departure for departure, _ in all_routes}
+    ).values_list('award_id', 'from_airport', 'to_airport'):
+        if (departure, arrival) in all_routes:
+            award_routes[award_id].add((departure, arrival))
+    if not award_routes:
+        return 0
+
+    awards = {
+        award.pk: award
+        for award in Award.objects.filter(pk__in=award_routes).prefetch_related(
+            'allowed_icao', 'allowed_aircrafts', 'flight_legs'
+        )
+    }
+    existing = {
+        (user_award.user_id, user_award.award_id): user_award
+        for user_award in UserAward.objects.filter(user_id__in=routes_by_pilot, award_id__in=awards)
+    }
+
+    recomputed = 0
+    for pilot_id, routes in routes_by_pilot.items():
+        flight_index = None
+        for award_id, award in awards.items():
+            if not routes & award_routes[award_id]:
+                continue
+            user_award = existing.get((pilot_id, award_id))
+            if user_award is None:
+                if not create_missing:
+                    continue
+                user_award = UserAward.objects.create(
+                    user_id=pilot_id, award=award, progress=0, start_date=timezone.now()
+                )
+            elif create_missing and not user_award.start_date:
+                user_award.start_date = timezone.now()
+                user_award.save(update_fields=['start_date'])
+            user_award.award = award  # Reaproveita as regras e pernas já carregadas
+            if flight_index is None:
+                flight_index = approved_flight_index(pilot_id)
+            recompute_user_award(user_award, flight_index)
+            recomputed += 1
+    return recomputed
@@ -0,0 +1,59 @@
+"""
+Revisão de PIREPs em lote (endpoint ``pirepsflight/bulk-review/`` e ações do admin).
+
+Os PIREPs são atualizados com um único UPDATE, sem os signals de ``post_save``; o
+que os signals fariam por PIREP é feito aqui uma vez para o lote inteiro:
+estatísticas somadas por piloto/dia, notificações com ``bulk_create`` e o progresso
+de cada par (piloto, award) afetado recalculado uma única vez.
+"""
+from django.db import transaction
+
+from . import cache, stats
+from .models import PirepsFlight
+from .notifications import notify_pilots_of_status
+from .progress import recompute_for_pireps
+
+REVIEW_STATUSES = ('Approved', 'Rejected')
+
+
+def review_pireps(pirep_ids, new_status, observation=None):
+    """
+    Aplica ``new_status`` aos PIREPs de ``pirep_ids`` numa transação.
+
+    PIREPs que já estão nesse status são ignorados. Retorna o número de PIREPs alterados.
+    """
+    if new_status not in REVIEW_STATUSES:
+        raise ValueError(f"Status inválido para revisão: {new_status}")
+
+    with transaction.atomic():
+        pireps = list(
+            PirepsFlight.objects.select_for_update()
+            .filter(pk__in=pirep_ids)
+            .exclude(status=new_status)
+            .only('id', 'pilot_id', 'status', 'flight_icao', 'flight_number', 'aircraft',
+                  'departure_airport', 'arrival_airport', 'flight_duration', 'registration_date')
+        )
+        if not pireps:
+            return 0
+
+        changes = []
+        award_affecting = []
+        for pirep in pireps:
+            old = stats.contribution(pirep.status, pirep.flight_duration, pirep.registration_date)
+            new = stats.contribution(new_status, pirep.flight_duration, pirep.registration_date)
+            changes.append((pirep.pilot_id, old, new))
+            if 'Approved' in (pirep.status, new_status):
+                award_affecting.append(pirep)
+            pirep.status = new_status
+
+        fields = {'status': new_status}
+        if observation is not None:
+            fields['observation'] = observation
+        PirepsFlight.objects.filter(pk__in=[pirep.pk for pirep in pireps]).update(**fields)
+
+        stats.apply_changes(changes)
+        notify_pilots_of_status(pireps)
+        # Aprovações podem iniciar awards; rejeições de voos aprovados só recalculam os existentes
+        recompute_for_pireps(award_affecting, create_missing=new_status == 'Approved')
+        transaction.on_commit(lambda: cache.bump(cache.STATS_NAMESPACE))
+    return len(pireps)
@@ -34,7 +34,7 @@ class LoginSerializer(serializers.Serializer):
         password = data.get('password')
 
         if email and password:
-            user = authenticate(email=email, password=password)
+            user = authenticate(self.context.get('request'), email=email, password=password)
             if user:
                 data['user'] = user
             else:
@@ -45,6 +45,11 @@ class LoginSerializer(serializers.Serializer):
         # Retorne os dados validados
         return data
     
+class BulkReviewSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=5000)
+    status = serializers.ChoiceField(choices=['Approved', 'Rejected'])
+    observation = serializers.CharField(max_length=500, required=False, allow_blank=True)
+
 class PirepsFlightSerializer(serializers.ModelSerializer):
     class Meta:
         model = PirepsFlight
@@ -54,20 +59,29 @@ class PirepsFlightSerializer(serializers.ModelSerializer):
 
 class AwardsSerializer(serializers.ModelSerializer):
     total_legs = serializers.SerializerMethodField()  # Campo calculado para o total de pernas
+    allowed_aircrafts = serializers.SlugRelatedField(many=True, read_only=True, slug_field='aircraft')
+    allowed_icao = serializers.SlugRelatedField(many=True, read_only=True, slug_field='company_icao')
 
     class Meta:
         model = Award
         fields = '__all__'
 
     def get_total_legs(self, obj):
-        # Retorna o número total de pernas associadas ao prêmio
+        # Usa a anotação do AwardViewSet; só conta no banco para instâncias sem ela (ex.: criação)
+        if hasattr(obj, 'total_legs'):
+            return obj.total_legs
         return obj.flight_legs.count()
 
 class FlightLegSerializer(serializers.ModelSerializer):
+    pirep_status = serializers.SerializerMethodField()  # Anotado por FlightLegViewSet na listagem
+
     class Meta:
         model = FlightLeg
         fields = '__all__'
 
+    def get_pirep_status(self, obj):
+        return getattr(obj, 'pirep_status', None)
+
 class AllowedAircraftSerializer(serializers.ModelSerializer):
     class Meta:
         model = AllowedAircraft
@@ -93,6 +107,28 @@ class NotificationSerializer(serializers.ModelSerializer):
         model = Notification
         fields = '__all__'
 
+class AirportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Airport
+        fields = ['icao', 'iata', 'name', 'city', 'state', 'country', 'elevation', 'lat', 'lon', 'tz']
+
+class LeaderboardSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Leaderboard
+        fields = ['board', 'period_start', 'refreshed_at', 'pilot_count']
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    first_name = serializers.CharField(source='pilot.first_name', read_only=True)
+    last_name = serializers.CharField(source='pilot.last_name', read_only=True)
+    duration = serializers.SerializerMethodField()  # Em segundos, como em dashboard/rankings
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = ['pilot', 'first_name', 'last_name', 'flights', 'duration', 'flights_rank', 'duration_rank']
+
+    def get_duration(self, entry):
+        return entry.duration.total_seconds()
+
 class ProfileUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
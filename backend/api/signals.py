@@ -1,76 +1,127 @@
-from django.db.models.signals import post_save
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from django.utils import timezone
-from .models import PirepsFlight, UserAward, FlightLeg, Notification, Award, User
+from django.db import transaction
+from django.db.models import F
+from knox.models import AuthToken
+from . import cache, events, jobs, stats
+from .authentication import revoke_user, token_cache
+from .models import PirepsFlight, Notification, Award, User, UserAwardLeg
+from .notifications import notify_all_users_of_award, notify_pilots_of_status
+from .progress import apply_approved_pirep, recompute_for_pireps
+
+# Campos que decidem quais pernas de award um PIREP aprovado completa
+AWARD_FIELDS = ('departure_airport', 'arrival_airport', 'flight_icao', 'aircraft')
+
+def previous_status(instance, created):
+    return None if created else instance.tracker.previous('status')
 
 @receiver(post_save, sender=PirepsFlight)
-def update_user_award_on_pirep_approval(sender, instance, **kwargs):
+def update_user_award_on_pirep_approval(sender, instance, created, **kwargs):
     """
     Signal para atualizar o progresso do UserAward quando um PirepsFlight é aprovado.
     """
-    # Verifica se o status do PirepsFlight foi alterado para "Approved"
-    if instance.status == 'Approved':
-        # Obtém o usuário associado ao PirepsFlight
-        user = instance.pilot
-
-        # Obtém o aeroporto de partida e chegada do PirepsFlight
-        departure_airport = instance.departure_airport
-        arrival_airport = instance.arrival_airport
-
-        # Verifica se o voo corresponde a uma FlightLeg de algum Award
-        flight_legs = FlightLeg.objects.filter(
-            from_airport=departure_airport,
-            to_airport=arrival_airport
+    was_approved = previous_status(instance, created) == 'Approved'
+    if instance.status == 'Approved' and not was_approved:
+        # Só as pernas com a mesma rota do voo são afetadas pela aprovação
+        apply_approved_pirep(instance)
+    elif was_approved and (
+        instance.status != 'Approved' or any(instance.tracker.has_changed(field) for field in AWARD_FIELDS)
+    ):
+        # Voo aprovado rejeitado ou alterado: recalcula os awards da rota antiga e da atual
+        tracker = instance.tracker
+        before = PirepsFlight(
+            pilot_id=instance.pilot_id,
+            departure_airport=tracker.previous('departure_airport'),
+            arrival_airport=tracker.previous('arrival_airport'),
         )
+        recompute_for_pireps([before, instance], create_missing=instance.status == 'Approved')
 
-        # Para cada FlightLeg encontrada, verifica o Award correspondente
-        for flight_leg in flight_legs:
-            award = flight_leg.award
+@receiver(pre_delete, sender=PirepsFlight)
+def remember_completed_legs(sender, instance, **kwargs):
+    # O delete anula (SET_NULL) o PIREP das pernas que ele completava; depois não dá mais para saber quais
+    instance.completed_award_legs = (
+        instance.status == 'Approved' or UserAwardLeg.objects.filter(pirep_id=instance.pk).exists()
+    )
 
-            # Verifica se já existe um UserAward para o usuário e o Award
-            user_award, created = UserAward.objects.get_or_create(
-                user=user,
-                award=award,
-                defaults={'progress': 0, 'start_date': timezone.now()}  # Define o progresso inicial como 0 e a data de início
-            )
+@receiver(post_delete, sender=PirepsFlight)
+def update_user_award_on_pirep_delete(sender, instance, **kwargs):
+    # As pernas que este PIREP completava ficaram sem PIREP; outro voo aprovado pode cumpri-las
+    if getattr(instance, 'completed_award_legs', instance.status == 'Approved'):
+        recompute_for_pireps([instance], create_missing=False)
 
-            # Se o UserAward já existia e não tinha uma data de início, define a data de início
-            if not created and not user_award.start_date:
-                user_award.start_date = timezone.now()
-                user_award.save()
+@receiver(post_save, sender=PirepsFlight)
+def update_pilot_stats_on_save(sender, instance, created, **kwargs):
+    previous = None
+    if not created:
+        tracker = instance.tracker
+        previous = stats.contribution(
+            tracker.previous('status'), tracker.previous('flight_duration'), tracker.previous('registration_date')
+        )
+    current = stats.contribution(instance.status, instance.flight_duration, instance.registration_date)
+    if previous != current:
+        stats.apply_change(instance.pilot_id, previous, current, instance.registration_date)
+        invalidate_stats_cache()
 
-            # Obtém todos os voos aprovados do usuário
-            user_flights = PirepsFlight.objects.filter(pilot=user, status='Approved')
+@receiver(post_delete, sender=PirepsFlight)
+def update_pilot_stats_on_delete(sender, instance, **kwargs):
+    previous = stats.contribution(instance.status, instance.flight_duration, instance.registration_date)
+    if previous:
+        stats.apply_change(instance.pilot_id, previous, None)
+        invalidate_stats_cache()
 
-            # Atualiza o progresso do UserAward
-            user_award.check_award_completion(user_flights)
+def invalidate_stats_cache():
+    # Só depois do commit, para ninguém recalcular e guardar dados ainda não gravados
+    transaction.on_commit(lambda: cache.bump(cache.STATS_NAMESPACE))
 
 @receiver(post_save, sender=PirepsFlight)
-def notify_pilot_on_status_change(sender, instance, **kwargs):
-    message = None  # Inicializa a variável para evitar erro
+def notify_pilot_on_status_change(sender, instance, created, **kwargs):
+    if previous_status(instance, created) == instance.status:
+        return
+    notify_pilots_of_status([instance])
 
-    if instance.status == "Approved":
-        message = f"🥳🎉🛬 Seu voo {instance.flight_icao} {instance.flight_number} foi aprovado!"
-    elif instance.status == "Rejected":
-        message = f"❌ Seu voo {instance.flight_icao} {instance.flight_number} foi rejeitado."
+@receiver(post_save, sender=Notification)
+def update_unread_count_on_save(sender, instance, created, **kwargs):
+    # Notificações criadas uma a uma (admin, scripts) e marcadas como lidas/não lidas
+    if created:
+        delta = 0 if instance.is_read else 1
+    elif instance.tracker.has_changed('is_read'):
+        delta = -1 if instance.is_read else 1
+    else:
+        return
+    if delta:
+        users = User.objects.filter(pk=instance.recipient_id)
+        if delta < 0:
+            users = users.filter(unread_notifications__gt=0)
+        users.update(unread_notifications=F('unread_notifications') + delta)
+        events.publish_on_commit([instance.recipient_id])
 
-    if message:  # Apenas cria notificação se 'message' foi definido
-        if not Notification.objects.filter(recipient=instance.pilot, message=message).exists():
-            Notification.objects.create(
-                recipient=instance.pilot,
-                message=message
-            )
+@receiver(post_delete, sender=Notification)
+def update_unread_count_on_delete(sender, instance, **kwargs):
+    if not instance.is_read:
+        User.objects.filter(pk=instance.recipient_id, unread_notifications__gt=0).update(
+            unread_notifications=F('unread_notifications') - 1
+        )
+        events.publish_on_commit([instance.recipient_id])
 
 @receiver(post_save, sender=Award)
-def notify_all_users_on_award_creation(sender, instance, **kwargs):
-    users = User.objects.all()  # Pega todos os usuários do sistema
+def notify_all_users_on_award_creation(sender, instance, created, **kwargs):
+    # Apenas na criação; a notificação em massa roda fora da requisição
+    if created:
+        jobs.enqueue(notify_all_users_of_award, instance.pk)
+
+@receiver(post_delete, sender=AuthToken)
+def forget_deleted_token(sender, instance, **kwargs):
+    # Logout, logoutall e tokens expirados removidos pelo knox; os outros workers veem a nova geração
+    token_cache.discard(instance.digest)
+    revoke_user(instance.user_id)
 
-    for user in users:
-        message = f"🏆 Um novo World Tour foi criado: '{instance.name}'!"
+@receiver(user_logged_out)
+def forget_tokens_on_logout(sender, user, **kwargs):
+    if user is not None:
+        revoke_user(user.pk)
 
-        # Evita criar notificações duplicadas do mesmo Award para o mesmo usuário
-        if not Notification.objects.filter(recipient=user, message=message).exists():
-            Notification.objects.create(
-                recipient=user,
-                message=message
-            )
\ No newline at end of file
+@receiver(post_save, sender=User)
+def forget_tokens_on_user_change(sender, instance, **kwargs):
+    # Usuário desativado ou alterado: a próxima requisição volta a validar no banco
+    revoke_user(instance.pk)
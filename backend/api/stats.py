@@ -0,0 +1,149 @@
+"""
+Manutenção das tabelas materializadas de estatísticas dos pilotos.
+
+Cada PIREP aprovado contribui com 1 voo e a sua duração para ``PilotStats`` e
+para o ``PilotDailyStats`` do dia do voo. As mudanças de status aplicam apenas a
+diferença entre a contribuição antiga e a nova.
+
+Só PIREPs aprovados contam: em análise e rejeitados não entram em nenhuma das
+tabelas, e as estatísticas gerais (``flight-stats/``, rankings) são somas delas.
+Uma linha que chega a zero voos é apagada, então os contadores não acumulam
+resíduos e "tem linha" equivale a "tem voo aprovado". ``rebuild`` recria as tabelas
+do zero e produz as mesmas linhas que a manutenção incremental.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import PilotDailyStats, PilotStats, PirepsFlight
+
+
+def contribution(status, duration, registration_date):
+    """(dia, voos, duração) com que um PIREP entra nas estatísticas, ou None."""
+    if status != 'Approved':
+        return None
+    return timezone.localdate(registration_date), 1, duration or timedelta(0)
+
+
+def _apply(pilot_id, day, flights, duration):
+    # Só cria linhas ao somar; ao subtrair (ex.: piloto sendo excluído) atualiza o que existir
+    if flights > 0:
+        PilotStats.objects.get_or_create(pilot_id=pilot_id)
+        PilotDailyStats.objects.get_or_create(pilot_id=pilot_id, day=day)
+    PilotStats.objects.filter(pilot_id=pilot_id).update(
+        total_flights=F('total_flights') + flights,
+        total_duration=F('total_duration') + duration,
+    )
+    PilotDailyStats.objects.filter(pilot_id=pilot_id, day=day).update(
+        flights=F('flights') + flights,
+        duration=F('duration') + duration,
+    )
+    if flights < 0:
+        # Sem voos aprovados a linha deixa de existir, assim os rankings não precisam filtrar zeros
+        PilotStats.objects.filter(pilot_id=pilot_id, total_flights=0).delete()
+        PilotDailyStats.objects.filter(pilot_id=pilot_id, day=day, flights=0).delete()
+
+
+def _refresh_last_approved(pilot_id):
+    last = PirepsFlight.objects.filter(pilot_id=pilot_id, status='Approved').aggregate(
+        last=Max('registration_date')
+    )['last']
+    PilotStats.objects.filter(pilot_id=pilot_id).update(last_approved_at=last)
+
+
+def apply_change(pilot_id, old, new, registration_date=None):
+    """
+    Aplica a troca de contribuição de um PIREP (``old``/``new`` vêm de ``contribution``).
+    """
+    if old == new:
+        return
+    with transaction.atomic():
+        if old:
+            day, flights, duration = old
+            _apply(pilot_id, day, -flights, -duration)
+        if new:
+            day, flights, duration = new
+            _apply(pilot_id, day, flights, duration)
+
+        if old:
+            _refresh_last_approved(pilot_id)
+        else:
+            PilotStats.objects.filter(
+                Q(last_approved_at__isnull=True) | Q(last_approved_at__lt=registration_date),
+                pilot_id=pilot_id,
+            ).update(last_approved_at=registration_date)
+
+
+def apply_changes(changes):
+    """
+    Versão em lote de ``apply_change`` para ``changes = [(pilot_id, old, new), ...]``.
+
+    As diferenças são somadas por (piloto, dia) antes de tocar no banco, e a data do
+    último voo aprovado é recalculada uma vez por piloto.
+    """
+    deltas = defaultdict(lambda: [0, timedelta(0)])
+    pilots = set()
+    for pilot_id, old, new in changes:
+        if old == new:
+            continue
+        pilots.add(pilot_id)
+        for contribution_, sign in ((old, -1), (new, 1)):
+            if contribution_:
+                day, flights, duration = contribution_
+                delta = deltas[(pilot_id, day)]
+                delta[0] += sign * flights
+                delta[1] += sign * duration
+
+    with transaction.atomic():
+        # Somas antes das subtrações: uma linha que só cai a zero no meio do lote não é apagada à toa
+        for (pilot_id, day), (flights, duration) in sorted(deltas.items(), key=lambda item: item[1][0] < 0):
+            if flights or duration:
+                _apply(pilot_id, day, flights, duration)
+        for pilot_id in pilots:
+            _refresh_last_approved(pilot_id)
+
+
+def rebuild(pilot_ids=None):
+    """Recria as estatísticas a partir dos PIREPs aprovados (todos os pilotos ou só ``pilot_ids``)."""
+    approved = PirepsFlight.objects.filter(status='Approved')
+    stats = PilotStats.objects.all()
+    daily = PilotDailyStats.objects.all()
+    if pilot_ids is not None:
+        approved = approved.filter(pilot_id__in=pilot_ids)
+        stats = stats.filter(pilot_id__in=pilot_ids)
+        daily = daily.filter(pilot_id__in=pilot_ids)
+
+    zero = timedelta(0)
+    totals = approved.values('pilot_id').annotate(
+        flights=Count('id'),
+        duration=Coalesce(Sum('flight_duration'), zero),
+        last=Max('registration_date'),
+    ).order_by()
+    per_day = approved.annotate(day=TruncDate('registration_date')).values('pilot_id', 'day').annotate(
+        flights=Count('id'),
+        duration=Coalesce(Sum('flight_duration'), zero),
+    ).order_by()
+
+    with transaction.atomic():
+        stats.delete()
+        daily.delete()
+        PilotStats.objects.bulk_create(
+            [
+                PilotStats(pilot_id=row['pilot_id'], total_flights=row['flights'],
+                           total_duration=row['duration'], last_approved_at=row['last'])
+                for row in totals
+            ],
+            batch_size=1000,
+        )
+        PilotDailyStats.objects.bulk_create(
+            [
+                PilotDailyStats(pilot_id=row['pilot_id'], day=row['day'],
+                                flights=row['flights'], duration=row['duration'])
+                for row in per_day
+            ],
+            batch_size=1000,
+        )
@@ -0,0 +1,65 @@
+"""
+Orçamento de consultas SQL para os testes: pega N+1 antes de chegar em produção.
+
+``max_queries(n)`` falha se o bloco fizer mais de ``n`` consultas. ``query_budget``
+decora um método de ``TestCase`` que cria ``rows`` linhas relacionadas e devolve os
+valores do path; o endpoint é chamado com cada tamanho de ``sizes`` e o teste falha se
+passar do orçamento ou se o número de consultas crescer com os dados::
+
+    @query_budget('/flight-legs/?award={award}', 2)
+    def test_flight_legs(self, rows):
+        award = Award.objects.create(name='Tour')
+        ...  # cria `rows` pernas
+        return {'award': award.pk}
+"""
+import functools
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+from .authentication import token_cache
+
+
+def format_queries(captured):
+    return '\n'.join(f"  {i}. {query['sql']}" for i, query in enumerate(captured.captured_queries, start=1))
+
+
+@contextmanager
+def max_queries(limit, using=DEFAULT_DB_ALIAS):
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+    if len(captured) > limit:
+        raise AssertionError(f"{len(captured)} consultas, orçamento de {limit}:\n{format_queries(captured)}")
+
+
+def query_budget(path, limit, sizes=(1, 100), method='get', data=None, using=DEFAULT_DB_ALIAS):
+    """
+    Decorador de métodos de teste; a requisição usa ``self.client``. Cada tamanho roda num
+    savepoint desfeito ao final e com os caches limpos, então sempre parte do estado do
+    ``setUp``; o orçamento inclui a autenticação por token com o cache frio.
+    """
+    def decorator(create_rows):
+        @functools.wraps(create_rows)
+        def wrapper(self):
+            counts = {}
+            for rows in sizes:
+                cache.clear()
+                token_cache.clear()
+                with transaction.atomic(using=using):
+                    url = path.format(**(create_rows(self, rows) or {}))
+                    with max_queries(limit, using) as captured:
+                        response = getattr(self.client, method)(url, data)
+                    self.assertLess(response.status_code, 400, f"{method.upper()} {url}: {response.status_code}")
+                    counts[rows] = captured
+                    transaction.set_rollback(True, using=using)
+            first, *others = sizes
+            for rows in others:
+                self.assertEqual(
+                    len(counts[first]), len(counts[rows]),
+                    f"{method.upper()} {path}: consultas crescem com os dados "
+                    f"({rows} linhas):\n{format_queries(counts[rows])}",
+                )
+        return wrapper
+    return decorator
@@ -1,3 +1,1999 @@
-from django.test import TestCase
+import asyncio
+import base64
+import contextlib
+import csv
+import functools
+import importlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.apps import apps
+from django.core import mail
+from django.core.management import call_command
+from django.core.cache import cache as django_cache
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Upper
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from knox.models import AuthToken
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+
+from crud import settings as crud_settings
+from crud.metrics import registry
+
+from . import cache, export, jobs, leaderboards, live, outbox, review, stats
+from .pagination import FlightCursorPagination, OptionalPageNumberPagination
+from .testing import max_queries, query_budget
+from .views import (
+    AirportViewSet, AsyncAPIView, CurrentUserView, DashboardRankingsView, FlightStatsView, UserApprovedFlightsView,
+    UserMetricsView,
+)
+from .authentication import CachedTokenAuthentication, revoke_user, token_cache
+from .notifications import award_created_message, notify_all_users_of_award, notify_pilots_of_status
+from .utils import send_welcome_email
+from .models import (
+    AllowedAircraft, AllowedIcao, Airport, Award, EmailOutbox, FlightLeg, Leaderboard, LeaderboardEntry, Notification,
+    PilotDailyStats, PilotStats, PirepsFlight, User, UserAward, UserAwardLeg,
+)
+
+
+class FlightLegListTests(TestCase):
+    def setUp(self):
+        self.pilot = User.objects.create_user(email='pilot@example.com', password='secret')
+        self.other = User.objects.create_user(email='other@example.com', password='secret')
+        self.award = Award.objects.create(name='Tour', description='Tour')
+        self.client = APIClient()
+        self.client.force_authenticate(self.pilot)
+
+    def create_legs(self, count):
+        airports = [f"SB{i:02d}" for i in range(count + 1)]
+        for i in range(count):
+            FlightLeg.objects.create(award=self.award, from_airport=airports[i], to_airport=airports[i + 1])
+            PirepsFlight.objects.create(
+                pilot=self.pilot, flight_number=str(i), status='Approved',
+                departure_airport=airports[i], arrival_airport=airports[i + 1],
+            )
+
+    def test_query_count_does_not_grow_with_legs(self):
+        self.create_legs(3)
+        with self.assertNumQueries(1):
+            small = self.client.get(f'/flight-legs/?award={self.award.id}')
+        self.create_legs(50)
+        with self.assertNumQueries(1):
+            large = self.client.get(f'/flight-legs/?award={self.award.id}')
+        self.assertEqual(len(small.data), 3)
+        self.assertEqual(len(large.data), 53)
+
+    def test_pirep_status_for_requested_user(self):
+        FlightLeg.objects.create(award=self.award, from_airport='SBGR', to_airport='SBRJ')
+        PirepsFlight.objects.create(
+            pilot=self.other, flight_number='1', status='In Review',
+            departure_airport='SBGR', arrival_airport='SBRJ',
+        )
+
+        own = self.client.get(f'/flight-legs/?award={self.award.id}')
+        other = self.client.get(f'/flight-legs/?award={self.award.id}&user={self.other.id}')
+
+        self.assertIsNone(own.data[0]['pirep_status'])
+        self.assertEqual(other.data[0]['pirep_status'], 'In Review')
+
+    def test_invalid_user_parameter(self):
+        response = self.client.get(f'/flight-legs/?award={self.award.id}&user=abc')
+        self.assertEqual(response.status_code, 400)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "Planos verificados com EXPLAIN QUERY PLAN do SQLite")
+class QueryPlanTests(TestCase):
+    """
+    Cada consulta quente precisa ser resolvida por busca em índice (``SEARCH ... USING``).
+    Qualquer linha ``SCAN <tabela>`` falha, mesmo ``USING (COVERING) INDEX``: percorrer
+    um índice inteiro custa o mesmo que percorrer a tabela. A única exceção é explícita:
+    ``top=True`` aceita ``SCAN ... USING INDEX`` de uma consulta com LIMIT ordenada pelo
+    índice, que para depois das N primeiras entradas.
+    """
+    SCAN = re.compile(r'\bSCAN (?!CONSTANT ROW)\w+')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pilot = User.objects.create_user(email='plan@example.com', password=None)
+        cls.award = Award.objects.create(name='Tour', description='Tour')
+
+    def scanned(self, line, top=False):
+        if not self.SCAN.search(line):
+            return False
+        return not (top and re.search(r' USING (COVERING )?INDEX ', line))
+
+    def assertIndexed(self, queryset, ordered=False, top=False):
+        """``ordered=True`` também exige que a ordenação venha do índice (sem TEMP B-TREE)."""
+        if top:
+            self.assertIsNotNone(queryset.query.high_mark, "top=True exige uma consulta com LIMIT")
+            ordered = True
+        plan = queryset.explain()
+        bad = [
+            line for line in plan.splitlines()
+            if self.scanned(line, top) or (ordered and 'TEMP B-TREE' in line)
+        ]
+        self.assertFalse(bad, f"Consulta sem índice:\n{plan}\n\nSQL: {queryset.query}")
+
+    def test_pilot_flights(self):
+        self.assertIndexed(PirepsFlight.objects.filter(pilot=self.pilot))
+
+    def test_airport_search(self):
+        # Cada ramo do OR precisa de SEARCH no seu índice; LIKE percorreria o índice de icao inteiro
+        queryset = AirportViewSet.search('SB')
+        self.assertIndexed(queryset)
+        self.assertIn('SEARCH api_airport USING INDEX airport_name_upper_idx', queryset.explain())
+
+    def test_pilot_approved_flights(self):
+        self.assertIndexed(PirepsFlight.objects.filter(pilot_id=self.pilot.pk, status='Approved'))
+
+    def test_pilot_approved_flights_in_window(self):
+        since = timezone.now() - timedelta(days=30)
+        self.assertIndexed(
+            PirepsFlight.objects.filter(pilot_id=self.pilot.pk, status='Approved', registration_date__gte=since)
+        )
+
+    def test_approved_flights_by_date(self):
+        since = timezone.now() - timedelta(days=7)
+        self.assertIndexed(PirepsFlight.objects.filter(status='Approved', registration_date__gte=since))
+
+    def test_flights_by_route(self):
+        self.assertIndexed(PirepsFlight.objects.filter(departure_airport='SBGR', arrival_airport='SBRJ'))
+
+    def test_flight_legs_with_pirep_status(self):
+        pireps = PirepsFlight.objects.filter(
+            pilot_id=self.pilot.pk,
+            departure_airport=OuterRef('from_airport'),
+            arrival_airport=OuterRef('to_airport'),
+        ).order_by('pk')
+        self.assertIndexed(
+            FlightLeg.objects.filter(award=self.award).annotate(pirep_status=Subquery(pireps.values('status')[:1]))
+        )
+
+    def test_flight_legs_by_route(self):
+        self.assertIndexed(FlightLeg.objects.filter(from_airport='SBGR', to_airport='SBRJ'))
+
+    def test_unread_notifications(self):
+        self.assertIndexed(
+            Notification.objects.filter(recipient=self.pilot, is_read=False).order_by('-created_at'),
+            ordered=True,
+        )
+
+    def test_notification_dedupe(self):
+        self.assertIndexed(Notification.objects.filter(recipient=self.pilot, dedupe_key='award:1'))
+
+    def test_unread_count_refresh(self):
+        self.assertIndexed(Notification.objects.filter(recipient=self.pilot, is_read=False).values('id'))
+
+    def test_user_awards(self):
+        self.assertIndexed(UserAward.objects.filter(user=self.pilot))
+
+    def test_pilot_daily_window(self):
+        self.assertIndexed(PilotDailyStats.objects.filter(pilot=self.pilot, day__gte=timezone.localdate()))
+
+    def test_rankings(self):
+        self.assertIndexed(PilotStats.objects.order_by('-total_duration')[:5], top=True)
+        self.assertIndexed(PilotStats.objects.order_by('-total_flights')[:5], top=True)
+
+    def test_cursor_pages(self):
+        self.assertIndexed(
+            PirepsFlight.objects.filter(pilot=self.pilot).order_by('-registration_date', '-id')[:50], ordered=True
+        )
+        self.assertIndexed(
+            PirepsFlight.objects.filter(pilot=self.pilot, status='Approved').order_by('-registration_date', '-id')[:50],
+            ordered=True,
+        )
+        self.assertIndexed(PirepsFlight.objects.order_by('-registration_date', '-id')[:50], top=True)
+        self.assertIndexed(User.objects.order_by('date_joined', 'id')[:50], top=True)
+        self.assertIndexed(
+            Notification.objects.filter(recipient=self.pilot, is_read=False).order_by('-created_at', '-id')[:50],
+            ordered=True,
+        )
+
+    def test_leaderboard_lookups(self):
+        self.assertIndexed(
+            LeaderboardEntry.objects.filter(leaderboard_id='weekly').order_by('duration_rank', 'pilot_id')[:10],
+            ordered=True,
+        )
+        self.assertIndexed(
+            LeaderboardEntry.objects.filter(leaderboard_id='weekly').order_by('flights_rank', 'pilot_id')[:10],
+            ordered=True,
+        )
+        self.assertIndexed(LeaderboardEntry.objects.filter(leaderboard_id='weekly', pilot=self.pilot))
+
+    def test_logbook_export(self):
+        since = timezone.now() - timedelta(days=30)
+        self.assertIndexed(export.flights(self.pilot.pk, since, None, ['Approved', 'Rejected']), ordered=True)
+        self.assertIndexed(export.flights(None, since, timezone.now()), ordered=True)
+
+    def test_login_email_lookup(self):
+        self.assertIndexed(User.objects.annotate(email_upper=Upper('email')).filter(email_upper='PLAN@EXAMPLE.COM'))
+
+    def test_airport_batch_lookup(self):
+        self.assertIndexed(Airport.objects.filter(icao__in=['SBGR', 'SBRJ']))
+
+
+class FakeInfiniteFlightHandler(BaseHTTPRequestHandler):
+    """Substituto local da API pública do Infinite Flight."""
+    flights = []
+    users = [{'userId': '2a11e620-1cc1-4ac6-90d1-8de7e2b3a5b7', 'discourseUsername': 'Maverick', 'flightTime': 600}]
+    requests = []
+    fail = False
+    delay = 0
+
+    def do_GET(self):
+        type(self).requests.append(self.path)
+        time.sleep(type(self).delay)
+        if type(self).fail:
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = json.dumps({'errorCode': 0, 'result': type(self).flights}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        query = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        type(self).requests.append((self.path, query))
+        names = {name.lower() for name in query.get('discourseNames', [])}
+        result = [
+            user for user in type(self).users
+            if user['userId'] in query.get('userIds', []) or user['discourseUsername'].lower() in names
+        ]
+        body = json.dumps({'errorCode': 0, 'result': result}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LiveTrafficTests(TestCase):
+    SESSION = '9ed5512e-b6eb-401f-bab8-42bdbdcf2bab'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeInfiniteFlightHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings_override = override_settings(
+            INFINITE_FLIGHT_API_URL=f'http://127.0.0.1:{cls.server.server_port}',
+            INFINITE_FLIGHT_API_KEY='test-key',
+            LIVE_BACKGROUND_POLLING=False,
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        django_cache.clear()
+        live.service.snapshots.clear()
+        live.service.last_requested.clear()
+        FakeInfiniteFlightHandler.requests = []
+        FakeInfiniteFlightHandler.fail = False
+        FakeInfiniteFlightHandler.delay = 0
+        FakeInfiniteFlightHandler.flights = [
+            {'flightId': 'a', 'callsign': 'AAA', 'altitude': 1000},
+            {'flightId': 'b', 'callsign': 'BBB', 'altitude': 2000},
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(email='live@example.com', password=None))
+        self.url = f'/live/{self.SESSION}/flights/'
+
+    def test_viewers_share_one_upstream_call(self):
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+
+        self.assertRegex(first.data['version'], r'^[0-9a-f]{8}\.1$')
+        self.assertTrue(first.data['full'])
+        self.assertEqual(len(second.data['items']), 2)
+        self.assertEqual(FakeInfiniteFlightHandler.requests, [f'/sessions/{self.SESSION}/flights?apikey=test-key'])
+
+    def test_delta_since_version(self):
+        first = self.client.get(self.url).data['version']
+        FakeInfiniteFlightHandler.flights = [
+            {'flightId': 'a', 'callsign': 'AAA', 'altitude': 1500},
+            {'flightId': 'c', 'callsign': 'CCC', 'altitude': 3000},
+        ]
+        live.service.refresh('flights', self.SESSION)
+
+        response = self.client.get(self.url, {'since': first})
+
+        self.assertEqual(response.data['version'], first[:-1] + '2')
+        self.assertFalse(response.data['full'])
+        self.assertEqual(sorted(item['flightId'] for item in response.data['items']), ['a', 'c'])
+        self.assertEqual(response.data['removed'], ['b'])
+
+    def test_etag_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_upstream_failure(self):
+        FakeInfiniteFlightHandler.fail = True
+        self.assertEqual(self.client.get(self.url).status_code, 502)
+
+    def test_version_from_other_epoch_gets_full_snapshot(self):
+        # Outro worker, ou o mesmo feed depois de ficar ocioso: a numeração recomeça
+        first = self.client.get(self.url)
+        live.service.snapshots.clear()
+        FakeInfiniteFlightHandler.flights = [{'flightId': 'c', 'callsign': 'CCC', 'altitude': 3000}]
+
+        response = self.client.get(self.url, {'since': first.data['version']}, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['full'])
+        self.assertEqual([item['flightId'] for item in response.data['items']], ['c'])
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertTrue(self.client.get(self.url, {'since': 'lixo'}).data['full'])
+
+    def test_concurrent_cold_requests_share_one_upstream_call(self):
+        FakeInfiniteFlightHandler.delay = 0.2
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(live.service.get_changes('flights', self.SESSION)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(FakeInfiniteFlightHandler.requests), 1)
+        self.assertEqual(len({version for version, *_ in results}), 1)
+        self.assertFalse(live.service.loading)
+
+    def test_poll_does_not_recreate_an_evicted_feed(self):
+        self.client.get(self.url)
+        key = ('flights', self.SESSION)
+        FakeInfiniteFlightHandler.delay = 0.2
+
+        async def poll_while_evicted():
+            async with live.service.make_client() as client:
+                polling = asyncio.create_task(live.service.poll(client, key))
+                await asyncio.sleep(0.05)
+                # O mesmo que o poll_loop faz com um feed ocioso
+                with live.service.lock:
+                    live.service.snapshots.pop(key)
+                    del live.service.last_requested[key]
+                await polling
+
+        asyncio.run(poll_while_evicted())
+
+        self.assertEqual(len(FakeInfiniteFlightHandler.requests), 2)
+        self.assertNotIn(key, live.service.snapshots)
+
+    def test_user_stats_by_discourse_name(self):
+        # Sem login: o cadastro valida o nome no fórum pelo backend
+        response = APIClient().get('/live/users/stats/', {'discourseName': 'maverick'})
+        self.client.get('/live/users/stats/', {'discourseName': 'Maverick'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['flightTime'], 600)
+        self.assertEqual(FakeInfiniteFlightHandler.requests, [('/user/stats?apikey=test-key', {'discourseNames': ['maverick']})])
+
+    def test_user_stats_by_id_and_errors(self):
+        user_id = FakeInfiniteFlightHandler.users[0]['userId']
+        self.assertEqual(self.client.get('/live/users/stats/', {'userId': user_id}).data['discourseUsername'], 'Maverick')
+        self.assertEqual(self.client.get('/live/users/stats/', {'discourseName': 'Goose'}).status_code, 404)
+        self.assertEqual(self.client.get('/live/users/stats/').status_code, 400)
+
+    @override_settings(INFINITE_FLIGHT_API_KEY=None)
+    def test_disabled_without_api_key(self):
+        for url in (self.url, f'{self.url}{self.SESSION}/route/', '/live/users/stats/?userId=x'):
+            self.assertEqual(self.client.get(url).status_code, 503, url)
+        self.assertEqual(FakeInfiniteFlightHandler.requests, [])
+
+
+class AirportTests(TestCase):
+    AIRPORTS = {
+        'SBGR': {'icao': 'SBGR', 'iata': 'GRU', 'name': 'Guarulhos International Airport', 'city': 'Sao Paulo',
+                 'state': 'Sao-Paulo', 'country': 'br', 'elevation': 2459, 'lat': -23.43, 'lon': -46.47,
+                 'tz': 'America/Sao_Paulo'},
+        'SBRJ': {'icao': 'SBRJ', 'iata': 'SDU', 'name': 'Santos Dumont Airport', 'city': 'Rio De Janeiro',
+                 'state': 'Rio-de-Janeiro', 'country': 'BR', 'elevation': 11, 'lat': -22.91, 'lon': -43.16,
+                 'tz': 'America/Sao_Paulo'},
+        'KJFK': {'icao': 'KJFK', 'iata': 'JFK', 'name': 'John F Kennedy International Airport', 'city': 'New York',
+                 'state': 'New-York', 'country': 'US', 'elevation': 13, 'lat': 40.64, 'lon': -73.78,
+                 'tz': 'America/New_York'},
+        'BROKEN': {'icao': 'XXXX', 'name': 'Sem coordenadas'},
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'airports.json')
+        with open(cls.path, 'w', encoding='utf-8') as handle:
+            json.dump(cls.AIRPORTS, handle)
+        call_command('load_airports', cls.path, stdout=io.StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def search(self, term):
+        response = self.client.get('/airports/', {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return [airport['icao'] for airport in response.data]
+
+    def test_load_airports(self):
+        self.assertEqual(Airport.objects.count(), 3)
+        airport = Airport.objects.get(icao='SBGR')
+        self.assertEqual((airport.iata, airport.country, airport.elevation), ('GRU', 'BR', 2459))
+
+    def test_load_airports_from_url_is_idempotent(self):
+        class QuietHandler(SimpleHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=self.directory.name))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        Airport.objects.filter(icao='SBRJ').update(name='Antigo')
+        with override_settings(AIRPORTS_SOURCE_URL=f'http://127.0.0.1:{server.server_port}/airports.json'):
+            call_command('load_airports', stdout=io.StringIO())
+
+        self.assertEqual(Airport.objects.count(), 3)
+        self.assertEqual(Airport.objects.get(icao='SBRJ').name, 'Santos Dumont Airport')
+
+    def test_search_by_icao_iata_and_name(self):
+        self.assertEqual(self.search('sb'), ['SBGR', 'SBRJ'])
+        self.assertEqual(self.search('JFK'), ['KJFK'])
+        self.assertEqual(self.search('santos'), ['SBRJ'])
+        self.assertEqual(self.search('GU'), ['SBGR'])
+        self.assertEqual(self.search('ZZ'), [])
+        self.assertEqual(self.client.get('/airports/', {'search': 'S'}).status_code, 400)
+
+    def test_detail(self):
+        response = self.client.get('/airports/sbgr/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['icao'], response.data['iata']), ('SBGR', 'GRU'))
+        self.assertEqual(self.client.get('/airports/ZZZZ/').status_code, 404)
+
+    def test_batch(self):
+        response = self.client.get('/airports/batch/', {'icao': 'sbgr, KJFK,ZZZZ'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data), ['KJFK', 'SBGR'])
+        self.assertEqual(response.data['SBGR']['name'], 'Guarulhos International Airport')
+        too_many = ','.join(f'A{i:03d}' for i in range(AirportViewSet.BATCH_LIMIT + 1))
+        self.assertEqual(self.client.get('/airports/batch/', {'icao': too_many}).status_code, 400)
+
+
+class StatsCacheTests(TestCase):
+    NAMESPACE = 'test-cache'
+
+    def setUp(self):
+        django_cache.clear()
+        self.calls = 0
+
+    def compute(self, delay=0):
+        self.calls += 1
+        time.sleep(delay)
+        return self.calls
+
+    def get(self, **kwargs):
+        return cache.cached(self.NAMESPACE, 'value', lambda: self.compute(**kwargs))
+
+    def test_fresh_value_is_reused_until_bump(self):
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.get(), 1)
+
+        cache.bump(self.NAMESPACE)
+
+        self.assertEqual(self.get(), 2)
+        self.assertEqual(self.calls, 2)
+
+    def test_stale_value_served_while_another_process_refreshes(self):
+        self.assertEqual(self.get(), 1)
+        cache.bump(self.NAMESPACE)
+        django_cache.add(f'api:{self.NAMESPACE}:value:lock', 1)  # Recálculo em andamento em outro processo
+
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.calls, 1)
+
+        django_cache.delete(f'api:{self.NAMESPACE}:value:lock')
+        self.assertEqual(self.get(), 2)
+
+    def test_concurrent_misses_compute_once(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.get(delay=0.2))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [1] * 5)
+
+
+class PilotStatsMaintenanceTests(TestCase):
+    def setUp(self):
+        self.pilot = User.objects.create_user(email='stats@example.com', password=None)
+        self.other = User.objects.create_user(email='stats-other@example.com', password=None)
+        self.now = timezone.now()
+
+    def pirep(self, pilot=None, status='In Review', hours=1, days_ago=1):
+        return PirepsFlight.objects.create(
+            pilot=pilot or self.pilot, flight_icao='STA', flight_number='1', status=status,
+            departure_airport='SBGR', arrival_airport='SBRJ', flight_duration=timedelta(hours=hours),
+            registration_date=self.now - timedelta(days=days_ago),
+        )
+
+    def set_status(self, pirep, status):
+        pirep.status = status
+        pirep.save()
+
+    def snapshot(self):
+        return (
+            sorted(PilotStats.objects.values_list('pilot_id', 'total_flights', 'total_duration', 'last_approved_at')),
+            sorted(PilotDailyStats.objects.values_list('pilot_id', 'day', 'flights', 'duration')),
+        )
+
+    def day(self, days_ago):
+        return timezone.localdate(self.now - timedelta(days=days_ago))
+
+    def test_approve_and_reject(self):
+        pirep = self.pirep()
+        self.assertEqual(self.snapshot(), ([], []))  # Em análise não conta
+
+        self.set_status(pirep, 'Approved')
+        self.assertEqual(self.snapshot(), (
+            [(self.pilot.pk, 1, timedelta(hours=1), pirep.registration_date)],
+            [(self.pilot.pk, self.day(1), 1, timedelta(hours=1))],
+        ))
+
+        # Zerado, o piloto some das tabelas em vez de ficar com uma linha de 0 voos
+        self.set_status(pirep, 'Rejected')
+        self.assertEqual(self.snapshot(), ([], []))
+
+    def test_delete_keeps_other_flights(self):
+        first = self.pirep(status='Approved', hours=1, days_ago=3)
+        second = self.pirep(status='Approved', hours=2, days_ago=1)
+
+        second.delete()
+
+        self.assertEqual(self.snapshot(), (
+            [(self.pilot.pk, 1, timedelta(hours=1), first.registration_date)],
+            [(self.pilot.pk, self.day(3), 1, timedelta(hours=1))],
+        ))
+        first.delete()
+        self.assertEqual(self.snapshot(), ([], []))
+
+    def test_redate_moves_the_daily_row(self):
+        pirep = self.pirep(status='Approved', hours=2, days_ago=5)
+        pirep.registration_date = self.now - timedelta(days=2)
+        pirep.save()
+
+        self.assertEqual(self.snapshot(), (
+            [(self.pilot.pk, 1, timedelta(hours=2), pirep.registration_date)],
+            [(self.pilot.pk, self.day(2), 1, timedelta(hours=2))],
+        ))
+
+    def test_incremental_matches_rebuild(self):
+        pireps = [self.pirep(hours=hours, days_ago=days) for hours, days in ((1, 1), (2, 1), (3, 4), (4, 9))]
+        others = [self.pirep(self.other, hours=5, days_ago=days) for days in (1, 2)]
+        for pirep in pireps[:3] + others:
+            self.set_status(pirep, 'Approved')
+        review.review_pireps([pireps[3].pk, others[0].pk], 'Approved')
+        review.review_pireps([pireps[1].pk, others[1].pk], 'Rejected')
+        pireps[2].refresh_from_db()
+        pireps[2].registration_date = self.now - timedelta(days=1)
+        pireps[2].flight_duration = timedelta(minutes=30)
+        pireps[2].save()
+        pireps[0].delete()
+        self.pirep(status='Approved', hours=6, days_ago=7)
+
+        incremental = self.snapshot()
+        stats.rebuild()
+
+        self.assertEqual(self.snapshot(), incremental)
+        self.assertEqual(PilotStats.objects.get(pilot=self.pilot).total_flights, 3)
+
+
+class UserMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.pilot = User.objects.create_user(email='metrics@example.com', password=None)
+        other = User.objects.create_user(email='metrics-other@example.com', password=None)
+        for pilot, status, minutes, days_ago in (
+            (cls.pilot, 'Approved', 90, 2),
+            (cls.pilot, 'Approved', 135, 10),
+            (cls.pilot, 'Approved', 180, 100),
+            (cls.pilot, 'Rejected', 300, 1),
+            (cls.pilot, 'In Review', 60, 1),
+            (other, 'Approved', 240, 1),
+        ):
+            PirepsFlight.objects.create(
+                pilot=pilot, flight_icao='MET', flight_number='1', status=status,
+                departure_airport='SBGR', arrival_airport='SBRJ', flight_duration=timedelta(minutes=minutes),
+                registration_date=now - timedelta(days=days_ago),
+            )
+
+    def get(self, pilot, window=None):
+        # Totais e janela numa única agregação
+        with max_queries(1) as captured:
+            response = APIClient().get(f'/user-metrics/{pilot.pk}/', {'window': window} if window else {})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(captured), 1)
+        return response.json()
+
+    def test_default_window(self):
+        # Só os aprovados do piloto: 6h45 no total, 3h45 nos últimos 30 dias
+        self.assertEqual(self.get(self.pilot), {
+            'total_flights': 3,
+            'total_flight_time': '6:45',
+            'total_flights_last_30_days': 2,
+            'total_flight_time_last_30_days': '3:45',
+            'average_flights_per_day': 2 / 30,
+            'average_flight_time_per_day': 3.75 / 30,
+        })
+
+    def test_custom_window(self):
+        self.assertEqual(self.get(self.pilot, 7), {
+            'total_flights': 3,
+            'total_flight_time': '6:45',
+            'total_flights_last_7_days': 1,
+            'total_flight_time_last_7_days': '1:30',
+            'average_flights_per_day': 1 / 7,
+            'average_flight_time_per_day': 1.5 / 7,
+        })
+
+    def test_pilot_without_flights(self):
+        pilot = User.objects.create_user(email='metrics-empty@example.com', password=None)
+        self.assertEqual(self.get(pilot, 90), {
+            'total_flights': 0,
+            'total_flight_time': '0:00',
+            'total_flights_last_90_days': 0,
+            'total_flight_time_last_90_days': '0:00',
+            'average_flights_per_day': 0,
+            'average_flight_time_per_day': 0,
+        })
+
+
+@override_settings(JOBS_RUN_SYNC=False)
+class JobsTests(TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        patcher = mock.patch.object(jobs, '_get_executor', return_value=self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ran = []
+
+    def job(self, value):
+        self.ran.append((value, threading.current_thread().name))
+
+    def test_runs_in_background_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            jobs.enqueue(self.job, 'ok')
+            self.assertEqual(self.ran, [])  # Nada roda antes do commit
+        self.executor.shutdown(wait=True)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual([value for value, _ in self.ran], ['ok'])
+        self.assertNotEqual(self.ran[0][1], threading.current_thread().name)
+
+    def test_rollback_discards_job(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                jobs.enqueue(self.job, 'descartado')
+                raise RuntimeError
+        self.executor.shutdown(wait=True)
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.ran, [])
+
+    def test_failure_is_logged(self):
+        def broken():
+            raise ValueError('quebrou')
+
+        with self.assertLogs('api.jobs', 'ERROR') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                jobs.enqueue(broken)
+            self.executor.shutdown(wait=True)
+
+        self.assertIn('Falha na tarefa em segundo plano broken', logs.output[0])
+        self.assertIn('ValueError: quebrou', logs.output[0])
+
+    @override_settings(JOBS_RUN_SYNC=True)
+    def test_sync_mode_runs_on_commit_in_the_same_thread(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.enqueue(self.job, 'sync')
+            self.assertEqual(self.ran, [])
+
+        self.assertEqual(self.ran, [('sync', threading.current_thread().name)])
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        django_cache.clear()
+        self.user = User.objects.create_user(email='token@example.com', password=None)
+        self.instance, self.token = AuthToken.objects.create(self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def authenticate(self, token=None):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token or self.token}')
+        return self.auth.authenticate(request)
+
+    def test_cached_token_skips_database(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, auth_token = self.authenticate()
+        self.assertEqual(user, self.user)
+        self.assertEqual(auth_token.pk, self.instance.pk)
+
+    def test_logout_invalidates(self):
+        self.authenticate()
+        response = self.client.post('/api/auth/logout/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(response.status_code, 204)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_logoutall_invalidates(self):
+        _, other = AuthToken.objects.create(self.user)
+        self.authenticate()
+        self.authenticate(other)
+        self.client.post('/api/auth/logoutall/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        for token in (self.token, other):
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate(token)
+
+    def test_expired_token(self):
+        self.authenticate()
+        AuthToken.objects.filter(pk=self.instance.pk).update(expiry=timezone.now() - timedelta(seconds=1))
+        token_cache.entries[self.instance.digest][1].expiry = timezone.now() - timedelta(seconds=1)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        self.assertFalse(AuthToken.objects.filter(pk=self.instance.pk).exists())
+
+    def test_deactivated_user(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def in_other_process(self):
+        # O LRU deste processo não é tocado: só a geração no cache do Django avisa da revogação
+        return mock.patch.multiple(token_cache, discard=mock.DEFAULT, discard_user=mock.DEFAULT)
+
+    def test_logout_in_other_process_invalidates(self):
+        self.authenticate()
+        digest = self.instance.digest
+        with self.in_other_process():
+            self.instance.delete()
+        self.assertIn(digest, token_cache.entries)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deactivation_in_other_process_invalidates(self):
+        self.authenticate()
+        with self.in_other_process():
+            User.objects.get(pk=self.user.pk).save()  # Qualquer alteração revoga; desativar também
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_revocation_does_not_affect_other_users(self):
+        other = User.objects.create_user(email='other-token@example.com', password=None)
+        _, other_token = AuthToken.objects.create(other)
+        self.authenticate(other_token)
+        with self.in_other_process():
+            self.instance.delete()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate(other_token)
+        self.assertEqual(user, other)
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='Pilot@Example.com', password='secret')
+
+    def login(self, email, password='secret'):
+        return self.client.post('/login/', {'email': email, 'password': password})
+
+    def test_password_hashed_once(self):
+        with mock.patch.object(User, 'check_password', autospec=True, side_effect=User.check_password) as check:
+            response = self.login('pilot@example.com')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(check.call_count, 1)
+        self.assertIn('token', response.data)
+
+    def test_invalid_credentials(self):
+        self.assertEqual(self.login('pilot@example.com', 'wrong').status_code, 400)
+        self.assertEqual(self.login('nobody@example.com').status_code, 400)
+
+    @override_settings(REST_KNOX={'TOKEN_LIMIT_PER_USER': 3})
+    def test_tokens_per_user_are_capped(self):
+        for _ in range(5):
+            last = self.login('pilot@example.com')
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), 3)
+        response = self.client.get('/users/me/', HTTP_AUTHORIZATION=f"Token {last.data['token']}")
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', EMAIL_OUTBOX_DELIVER_IN_PROCESS=False)
+class EmailOutboxTests(TestCase):
+    def test_request_only_enqueues(self):
+        send_welcome_email('new@example.com')
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(outbox.deliver_outbox(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, ['new@example.com'])
+        self.assertEqual(EmailOutbox.objects.get().status, 'sent')
+
+    def test_password_reset_email(self):
+        User.objects.create_user(email='reset@example.com', password='secret')
+        response = self.client.post('/api/password_reset/', {'email': 'reset@example.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+
+        outbox.deliver_outbox()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('password_reset?token=', mail.outbox[0].alternatives[0][0])
+
+    def test_batch_reuses_one_connection(self):
+        for i in range(3):
+            outbox.enqueue_email('Assunto', 'Corpo', [f'pilot{i}@example.com'])
+        with mock.patch('api.outbox.get_connection', wraps=outbox.get_connection) as get_connection:
+            self.assertEqual(outbox.deliver_outbox(batch_size=10), (3, 0))
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_retry_with_backoff(self):
+        message = outbox.enqueue_email('Assunto', 'Corpo', ['pilot@example.com'])
+        with mock.patch.object(outbox.EmailMultiAlternatives, 'send', side_effect=OSError('SMTP fora do ar')):
+            self.assertEqual(outbox.deliver_outbox(), (0, 1))
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts), ('pending', 1))
+            self.assertGreater(message.next_attempt_at, timezone.now())
+
+            # Ainda não venceu: nada é reenviado
+            self.assertEqual(outbox.deliver_outbox(), (0, 0))
+
+            EmailOutbox.objects.update(next_attempt_at=timezone.now())
+            outbox.deliver_outbox()
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts), ('failed', 2))
+        self.assertEqual(message.last_error, 'SMTP fora do ar')
+
+
+class BulkReviewTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(email='staff@example.com', password=None, is_staff=True)
+        self.pilots = [User.objects.create_user(email=f'bulk{i}@example.com', password=None) for i in range(2)]
+        self.award = Award.objects.create(name='Tour', description='Tour')
+        FlightLeg.objects.create(award=self.award, from_airport='SBGR', to_airport='SBRJ')
+        FlightLeg.objects.create(award=self.award, from_airport='SBRJ', to_airport='SBSP')
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def create_pireps(self, count):
+        routes = [('SBGR', 'SBRJ'), ('SBRJ', 'SBSP'), ('SBSP', 'SBGL')]
+        return [
+            PirepsFlight.objects.create(
+                pilot=self.pilots[i % 2], flight_icao='BLK', flight_number=str(i), status='In Review',
+                departure_airport=routes[i % 3][0], arrival_airport=routes[i % 3][1],
+                flight_duration=timedelta(hours=1),
+            ).pk
+            for i in range(count)
+        ]
+
+    def review(self, ids, new_status='Approved'):
+        return self.client.post('/pirepsflight/bulk-review/', {'ids': ids, 'status': new_status}, format='json')
+
+    def test_bulk_approve(self):
+        ids = self.create_pireps(6)
+        response = self.review(ids + [ids[0]])
+
+        self.assertEqual(response.data, {'updated': 6, 'skipped': 0})
+        self.assertEqual(PirepsFlight.objects.filter(status='Approved').count(), 6)
+        for pilot in self.pilots:
+            self.assertEqual(PilotStats.objects.get(pilot=pilot).total_flights, 3)
+            self.assertEqual(UserAward.objects.get(user=pilot, award=self.award).progress, 100)
+        self.assertEqual(Notification.objects.count(), 6)
+
+    def test_query_count_does_not_grow_with_pireps(self):
+        small = self.create_pireps(6)
+        with CaptureQueriesContext(connection) as few:
+            self.review(small)
+        PirepsFlight.objects.all().delete()
+        UserAward.objects.all().delete()
+        large = self.create_pireps(60)
+        with CaptureQueriesContext(connection) as many:
+            self.review(large)
+        self.assertEqual(len(few), len(many))
+
+    def test_reject_approved_updates_progress(self):
+        ids = self.create_pireps(6)
+        self.review(ids)
+        self.review(ids[:1], 'Rejected')
+
+        user_award = UserAward.objects.get(user=self.pilots[0], award=self.award)
+        self.assertEqual(user_award.progress, 50)
+        self.assertEqual(PilotStats.objects.get(pilot=self.pilots[0]).total_flights, 2)
+
+    def test_requires_staff(self):
+        self.client.force_authenticate(self.pilots[0])
+        self.assertEqual(self.review(self.create_pireps(1)).status_code, 403)
+
+
+class PirepTransitionTests(TestCase):
+    def setUp(self):
+        self.pilot = User.objects.create_user(email='transition@example.com', password=None)
+        self.award = Award.objects.create(name='Tour', description='Tour')
+        FlightLeg.objects.create(award=self.award, from_airport='SBGR', to_airport='SBRJ')
+        FlightLeg.objects.create(award=self.award, from_airport='SBRJ', to_airport='SBSP')
+        self.pireps = [
+            PirepsFlight.objects.create(
+                pilot=self.pilot, flight_icao='TRN', flight_number=str(i), status='In Review',
+                departure_airport=departure, arrival_airport=arrival, flight_duration=timedelta(hours=1),
+            )
+            for i, (departure, arrival) in enumerate([('SBGR', 'SBRJ'), ('SBRJ', 'SBSP')])
+        ]
+        for pirep in self.pireps:
+            pirep.status = 'Approved'
+            pirep.save()
+
+    def progress(self):
+        return UserAward.objects.get(user=self.pilot, award=self.award).progress
+
+    def test_approval(self):
+        self.assertEqual(self.progress(), 100)
+        self.assertEqual(PilotStats.objects.get(pilot=self.pilot).total_flights, 2)
+        self.assertEqual(Notification.objects.filter(recipient=self.pilot).count(), 2)
+
+    def test_edit_without_transition_only_saves(self):
+        pirep = PirepsFlight.objects.get(pk=self.pireps[0].pk)
+        pirep.observation = 'Obs'
+        with self.assertNumQueries(1):
+            pirep.save()
+
+    def test_rejecting_approved_pirep(self):
+        pirep = self.pireps[0]
+        pirep.status = 'Rejected'
+        pirep.save()
+
+        self.assertEqual(self.progress(), 50)
+        self.assertEqual(PilotStats.objects.get(pilot=self.pilot).total_flights, 1)
+        self.assertTrue(Notification.objects.filter(recipient=self.pilot, message__contains='rejeitado').exists())
+
+    def test_deleting_approved_pirep(self):
+        self.pireps[1].delete()
+        self.assertEqual(self.progress(), 50)
+
+    def test_rerouting_approved_pirep(self):
+        pirep = self.pireps[1]
+        pirep.arrival_airport = 'SBGL'
+        pirep.save()
+        self.assertEqual(self.progress(), 50)
+
+    def approve_second_flight_on_first_leg(self):
+        pirep = PirepsFlight.objects.create(
+            pilot=self.pilot, flight_icao='TRN', flight_number='9', status='In Review',
+            departure_airport='SBGR', arrival_airport='SBRJ', flight_duration=timedelta(hours=1),
+        )
+        pirep.status = 'Approved'
+        pirep.save()
+        return pirep
+
+    def test_rejected_then_deleted_pirep_with_leg_covered_by_another(self):
+        covering = self.approve_second_flight_on_first_leg()
+        rejected = self.pireps[0]
+        rejected.status = 'Rejected'
+        rejected.save()
+        rejected.delete()
+
+        self.assertEqual(self.progress(), 100)
+        leg = UserAwardLeg.objects.get(user_award__user=self.pilot, flight_leg__from_airport='SBGR')
+        self.assertEqual(leg.pirep_id, covering.pk)
+
+    def test_bulk_rejected_then_deleted_pirep_with_leg_covered_by_another(self):
+        covering = self.approve_second_flight_on_first_leg()
+        review.review_pireps([self.pireps[0].pk], 'Rejected')
+        PirepsFlight.objects.get(pk=self.pireps[0].pk).delete()
+
+        self.assertEqual(self.progress(), 100)
+        leg = UserAwardLeg.objects.get(user_award__user=self.pilot, flight_leg__from_airport='SBGR')
+        self.assertEqual(leg.pirep_id, covering.pk)
+
+
+class AwardLegPirepTests(TestCase):
+    """O PIREP guardado em cada perna concluída acompanha os voos aprovados."""
+
+    def setUp(self):
+        self.pilot = User.objects.create_user(email='legs@example.com', password=None)
+        self.award = Award.objects.create(name='Tour', description='Tour')
+        self.legs = [
+            FlightLeg.objects.create(award=self.award, from_airport='SBGR', to_airport='SBRJ'),
+            FlightLeg.objects.create(award=self.award, from_airport='SBRJ', to_airport='SBSP'),
+        ]
+
+    def fly(self, departure, arrival):
+        pirep = PirepsFlight.objects.create(
+            pilot=self.pilot, flight_number='1', status='In Review',
+            departure_airport=departure, arrival_airport=arrival,
+        )
+        pirep.status = 'Approved'
+        pirep.save()
+        return pirep
+
+    def user_award(self):
+        return UserAward.objects.get(user=self.pilot, award=self.award)
+
+    def test_rejected_then_deleted_pirep_keeps_leg_covered_by_another(self):
+        first = self.fly('SBGR', 'SBRJ')
+        second = self.fly('SBGR', 'SBRJ')
+        first.status = 'Rejected'
+        first.save()
+        self.assertEqual(self.user_award().completed_legs.get().pirep_id, second.pk)
+        first.delete()
+        self.fly('SBRJ', 'SBSP')
+
+        user_award = self.user_award()
+        self.assertEqual(user_award.progress, 100)
+        self.assertEqual(user_award.completed_legs.count(), 2)
+
+    def test_deleting_pirep_still_referenced_recomputes(self):
+        # Pernas gravadas antes da correção ainda podem apontar para um PIREP rejeitado
+        first = self.fly('SBGR', 'SBRJ')
+        second = self.fly('SBGR', 'SBRJ')
+        PirepsFlight.objects.filter(pk=first.pk).update(status='Rejected')
+        UserAwardLeg.objects.filter(flight_leg=self.legs[0]).update(pirep=first)
+
+        PirepsFlight.objects.get(pk=first.pk).delete()
+        leg = self.user_award().completed_legs.get()
+        self.assertEqual((leg.flight_leg_id, leg.pirep_id), (self.legs[0].pk, second.pk))
+        self.assertEqual(self.user_award().progress, 50)
+
+
+class NotificationCounterTests(TestCase):
+    def setUp(self):
+        self.pilot = User.objects.create_user(email='unread@example.com', password=None)
+        self.client = APIClient()
+        self.client.force_authenticate(self.pilot)
+
+    def unread(self):
+        return self.client.get('/notifications/unread-count/').data['unread']
+
+    def test_counter_follows_create_and_mark_read(self):
+        pirep = PirepsFlight.objects.create(
+            pilot=self.pilot, flight_icao='UNR', flight_number='1', status='In Review',
+            departure_airport='SBGR', arrival_airport='SBRJ',
+        )
+        pirep.status = 'Approved'
+        pirep.save()
+        Notification.objects.create(recipient=self.pilot, message='Manual')
+        self.assertEqual(self.unread(), 2)
+
+        notification = Notification.objects.filter(recipient=self.pilot).first()
+        self.client.post(f'/notifications/{notification.pk}/mark_as_read/')
+        self.client.post(f'/notifications/{notification.pk}/mark_as_read/')
+        self.assertEqual(self.unread(), 1)
+
+    def test_award_fan_out_is_deduplicated(self):
+        other = User.objects.create_user(email='other-unread@example.com', password=None)
+        award = Award.objects.create(name='Tour', description='Tour')
+        notify_all_users_of_award(award.pk)
+        notify_all_users_of_award(award.pk)
+
+        self.assertEqual(Notification.objects.filter(dedupe_key=f'award:{award.pk}').count(), 2)
+        self.assertEqual(self.unread(), 1)
+        other.refresh_from_db()
+        self.assertEqual(other.unread_notifications, 1)
+
+    def test_status_notification_sent_once(self):
+        pirep = PirepsFlight.objects.create(
+            pilot=self.pilot, flight_icao='UNR', flight_number='1', status='Approved',
+            departure_airport='SBGR', arrival_airport='SBRJ',
+        )
+        notify_pilots_of_status([pirep])
+        self.assertEqual(Notification.objects.filter(recipient=self.pilot).count(), 1)
+        self.assertEqual(self.unread(), 1)
+
+
+    def test_backfill_skips_award_names_shared_by_two_awards(self):
+        migration = importlib.import_module('api.migrations.0021_notification_dedupe_and_unread_count')
+        unique = Award.objects.create(name='Único', description='Tour')
+        twins = [Award.objects.create(name='Repetido', description='Tour') for _ in range(2)]
+        first, repeated = [
+            Notification.objects.create(recipient=self.pilot, message=award_created_message(award))
+            for award in (unique, unique, twins[0])
+        ][0::2]
+
+        migration.backfill_dedupe_keys_and_counts(apps, None)
+
+        self.assertEqual(
+            dict(Notification.objects.filter(dedupe_key__isnull=False).values_list('pk', 'dedupe_key')),
+            {first.pk: f'award:{unique.pk}'},
+        )
+        self.assertIsNone(Notification.objects.get(pk=repeated.pk).dedupe_key)
+        self.pilot.refresh_from_db()
+        self.assertEqual(self.pilot.unread_notifications, 3)
+
+@override_settings(NOTIFICATION_STREAM_POLL_INTERVAL=30)
+class NotificationStreamTests(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.pilot = User.objects.create_user(email='stream@example.com', password=None)
+        _, self.token = AuthToken.objects.create(self.pilot)
+        Notification.objects.create(recipient=self.pilot, message='Antiga')
+
+    async def next_event(self, stream):
+        # Sem publicação o próximo evento só viria na consulta de segurança (30 s)
+        return await asyncio.wait_for(anext(stream), timeout=5)
+
+    async def ticket(self):
+        response = await AsyncClient().post(
+            '/notifications/stream/ticket/', headers={'Authorization': f'Token {self.token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['ticket']
+
+    async def status(self, ticket):
+        return (await AsyncClient().get('/notifications/stream/', {'ticket': ticket})).status_code
+
+    @contextlib.asynccontextmanager
+    async def open_stream(self, ticket, **params):
+        response = await AsyncClient().get('/notifications/stream/', {'ticket': ticket, **params})
+        self.assertEqual(response.status_code, 200)
+        stream = aiter(response.streaming_content)
+        try:
+            yield response, stream
+        finally:
+            await stream.aclose()
+
+    async def test_ticket_requires_login(self):
+        self.assertEqual((await AsyncClient().post('/notifications/stream/ticket/')).status_code, 401)
+
+    async def test_rejected_tickets(self):
+        self.assertEqual(await self.status('invalid'), 401)
+        # O token knox não é mais aceito na URL
+        response = await AsyncClient().get('/notifications/stream/', {'token': self.token})
+        self.assertEqual(response.status_code, 401)
+
+        ticket = await self.ticket()
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 31):
+            self.assertEqual(await self.status(ticket), 401)
+
+        ticket = await self.ticket()
+        await sync_to_async(revoke_user)(self.pilot.pk)  # Logout depois de emitir o ticket
+        self.assertEqual(await self.status(ticket), 401)
+
+    async def test_ticket_is_single_use(self):
+        ticket = await self.ticket()
+        async with self.open_stream(ticket):
+            self.assertEqual(await self.status(ticket), 401)
+
+    async def test_reconnect_resumes_from_last_id(self):
+        newer = await Notification.objects.acreate(recipient=self.pilot, message='Perdida')
+        async with self.open_stream(await self.ticket(), last_id=newer.pk - 1) as (_, stream):
+            self.assertTrue((await self.next_event(stream)).startswith(b'retry:'))
+            self.assertIn(f'id: {newer.pk}'.encode(), await self.next_event(stream))
+
+    async def test_pushes_new_notifications(self):
+        async with self.open_stream(await self.ticket()) as (response, stream):
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            self.assertTrue((await self.next_event(stream)).startswith(b'retry:'))
+            last = await sync_to_async(Notification.objects.latest)('id')
+            self.assertEqual(await self.next_event(stream), f'event: unread\nid: {last.pk}\ndata: {{"unread": 1}}\n\n'.encode())
+
+            def notify():
+                with self.captureOnCommitCallbacks(execute=True):
+                    return Notification.objects.create(recipient=self.pilot, message='Nova')
+
+            notification = await sync_to_async(notify)()
+            event = await self.next_event(stream)
+            self.assertIn(f'id: {notification.pk}'.encode(), event)
+            self.assertIn(b'"message": "Nova"', event)
+            self.assertEqual(
+                await self.next_event(stream), f'event: unread\nid: {notification.pk}\ndata: {{"unread": 2}}\n\n'.encode()
+            )
+
+
+class AsyncDashboardViewTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        django_cache.clear()
+        self.pilot = User.objects.create_user(email='async@example.com', password=None, first_name='A', last_name='B')
+        _, self.token = AuthToken.objects.create(self.pilot)
+        for minutes in (60, 90):
+            PirepsFlight.objects.create(
+                pilot=self.pilot, flight_icao='ASY', flight_number='1', status='Approved',
+                departure_airport='SBGR', arrival_airport='SBRJ', flight_duration=timedelta(minutes=minutes),
+            )
+        self.client = AsyncClient()
+
+    def get(self, path, data=None, token=None):
+        # Cabeçalhos passados no construtor do AsyncClient não chegam ao scope ASGI
+        return self.client.get(path, data, headers={'Authorization': f'Token {token or self.token}'})
+
+    async def test_authentication(self):
+        response = await AsyncClient().get('/users/me/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+        response = await self.get('/flight-stats/', token='invalid')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual((await AsyncClient().get('/flight-stats/')).status_code, 200)
+        self.assertEqual((await self.client.post('/flight-stats/')).status_code, 405)
+
+        response = await self.get('/users/me/')
+        self.assertEqual(response.json()['email'], 'async@example.com')
+
+    async def test_unexpected_error_is_logged_not_returned(self):
+        client = AsyncClient(raise_request_exception=False)
+        with mock.patch('api.views.decimal_to_hh_mm', side_effect=RuntimeError('detalhe interno')), \
+                self.assertLogs('django.request', 'ERROR') as logs:
+            response = await client.get(f'/user-metrics/{self.pilot.pk}/', headers={'Authorization': f'Token {self.token}'})
+
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn(b'detalhe interno', response.content)
+        self.assertIn('detalhe interno', logs.output[0])
+
+    async def test_drf_async_views(self):
+        for view in (CurrentUserView, DashboardRankingsView, FlightStatsView, UserApprovedFlightsView, UserMetricsView):
+            self.assertTrue(issubclass(view, AsyncAPIView) and view.view_is_async, view)
+        response = await self.client.options('/flight-stats/')
+        self.assertEqual(response.json()['name'], 'Flight Stats')
+        response = await self.get('/flight-stats/', {'format': 'api'})
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+
+    async def test_dashboard_endpoints(self):
+        response = await self.get('/flight-stats/')
+        self.assertEqual(response.json(), {'total_flights': 2, 'total_hours': 2.5})
+
+        response = await self.get('/dashboard/rankings/')
+        self.assertEqual(response.json()['top_duration'][0]['total_duration'], '9000.0')
+
+        response = await self.get(f'/user-metrics/{self.pilot.pk}/', {'window': 7})
+        self.assertEqual(response.json()['total_flight_time_last_7_days'], '2:30')
+        response = await self.get(f'/user-metrics/{self.pilot.pk}/', {'window': 5})
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.get(f'/user-approved-flights/{self.pilot.pk}/')
+        self.assertEqual(sorted(flight['duration'] for flight in response.json()), ['3600.0', '5400.0'])
+        response = await self.get(f'/user-approved-flights/{self.pilot.pk}/', {'page_size': 1})
+        page = response.json()
+        self.assertEqual(page['results'][0]['duration'], '5400.0')
+        self.assertIsNotNone(page['next'])
+
+
+@override_settings(JOBS_RUN_SYNC=True)
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.pilots = [
+            User.objects.create_user(email=f'board{i}@example.com', password=None, first_name='Mesmo', last_name='Nome')
+            for i in range(3)
+        ]
+        today = timezone.now()
+        # Piloto 0: 1 voo longo hoje; piloto 1: 2 voos curtos hoje; piloto 2: 3 voos há dois anos
+        self.fly(self.pilots[0], today, hours=5)
+        self.fly(self.pilots[1], today, hours=1)
+        self.fly(self.pilots[1], today, hours=1)
+        for _ in range(3):
+            self.fly(self.pilots[2], today - timedelta(days=800), hours=2)
+        _, self.token = AuthToken.objects.create(self.pilots[1])
+
+    def fly(self, pilot, when, hours):
+        pirep = PirepsFlight.objects.create(
+            pilot=pilot, flight_icao='LDB', flight_number='1', departure_airport='SBGR', arrival_airport='SBRJ',
+            flight_duration=timedelta(hours=hours), status='Approved',
+        )
+        PirepsFlight.objects.filter(pk=pirep.pk).update(registration_date=when)
+
+    def test_period_start(self):
+        today = timezone.localdate().replace(year=2026, month=10, day=15)  # Quinta-feira
+        self.assertEqual(leaderboards.period_start('weekly', today).isoformat(), '2026-10-12')
+        self.assertEqual(leaderboards.period_start('monthly', today).isoformat(), '2026-10-01')
+        self.assertEqual(leaderboards.period_start('yearly', today).isoformat(), '2026-01-01')
+        self.assertIsNone(leaderboards.period_start('all-time', today))
+
+    def test_rank_ties(self):
+        rows = [(1, 3), (2, 5), (3, 3), (4, 1)]
+        self.assertEqual(leaderboards.rank(rows, lambda row: row[1]), {2: 1, 1: 2, 3: 2, 4: 4})
+
+    def test_boards_group_by_pilot_and_period(self):
+        stats.rebuild()  # As datas foram alteradas com update(), sem passar pelos signals
+        leaderboards.refresh_all()
+
+        response = self.client.get('/leaderboards/weekly/', {'metric': 'flights'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        # Pilotos com o mesmo nome continuam separados
+        self.assertEqual([entry['pilot'] for entry in results], [self.pilots[1].pk, self.pilots[0].pk])
+        self.assertEqual(results[0]['duration'], 7200.0)
+        self.assertEqual(results[1]['duration_rank'], 1)
+
+        response = self.client.get('/leaderboards/all-time/', {'metric': 'flights', 'limit': 1})
+        self.assertEqual([entry['pilot'] for entry in response.json()['results']], [self.pilots[2].pk])
+        self.assertEqual(self.client.get('/leaderboards/all-time/', {'limit': 0}).status_code, 400)
+        self.assertEqual(self.client.get('/leaderboards/daily/').status_code, 404)
+
+        response = self.client.get('/leaderboards/weekly/me/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(response.json()['entry']['flights_rank'], 1)
+        self.assertEqual(response.json()['entry']['duration_rank'], 2)
+        self.assertEqual(self.client.get('/leaderboards/weekly/me/').status_code, 401)
+
+    def test_rank_lookup_is_indexed_read(self):
+        leaderboards.refresh_all()
+        leaderboard = Leaderboard.objects.get(board='all-time')
+        with self.assertNumQueries(1):
+            entry = leaderboards.entry_for(leaderboard, self.pilots[2].pk)
+        self.assertEqual(entry.flights_rank, 1)
+
+    def test_stale_snapshot_is_refreshed(self):
+        leaderboards.refresh('all-time')
+        Leaderboard.objects.filter(board='all-time').update(refreshed_at=timezone.now() - timedelta(hours=1))
+        PirepsFlight.objects.filter(pilot=self.pilots[0]).update(status='Rejected')
+        PilotStats.objects.filter(pilot=self.pilots[0]).delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stale = leaderboards.get_leaderboard('all-time')
+        self.assertEqual(stale.pilot_count, 3)  # Serve o snapshot antigo e recalcula depois do commit
+        self.assertEqual(Leaderboard.objects.get(board='all-time').pilot_count, 2)
+
+
+class LoadBenchmarkTests(TestCase):
+    def test_seed_load(self):
+        call_command('seed_load', pilots=5, pireps=200, awards=2, legs=4, notifications=3, stdout=io.StringIO())
+        pilots = User.objects.filter(email__endswith='@seed.invalid')
+        self.assertEqual(pilots.count(), 5)
+        self.assertEqual(PirepsFlight.objects.filter(pilot__in=pilots).count(), 200)
+        self.assertEqual(FlightLeg.objects.filter(award__name__startswith='[seed] ').count(), 8)
+        approved = PirepsFlight.objects.filter(pilot__in=pilots, status='Approved').count()
+        self.assertEqual(sum(PilotStats.objects.values_list('total_flights', flat=True)), approved)
+        for pilot in pilots:
+            unread = Notification.objects.filter(recipient=pilot, is_read=False).count()
+            self.assertEqual(pilot.unread_notifications, unread)
+
+        call_command('seed_load', clear=True, stdout=io.StringIO())
+        self.assertFalse(User.objects.filter(email__endswith='@seed.invalid').exists())
+        self.assertFalse(PilotStats.objects.exists())
+
+    def test_bench_routes_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            out = io.StringIO()
+            call_command('bench_routes', seed=True, pilots=3, pireps=30, awards=1, iterations=1, warmup=0,
+                         route=['leaderboards', 'flight-legs'], output=output, stdout=out)
+            with open(output) as file:
+                result = json.load(file)
+        self.assertNotIn('Rotas sem medição', out.getvalue())
+        self.assertEqual(result['dataset']['pireps'], 30)
+        route = result['routes']['/flight-legs/?award={award}']
+        self.assertEqual(route['status'], 200)
+        self.assertEqual(set(route), {'url', 'route', 'status', 'p50_ms', 'p95_ms', 'queries', 'bytes'})
+        # Os dados gerados são descartados
+        self.assertFalse(User.objects.filter(email__endswith='@seed.invalid').exists())
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        django_cache.clear()
+        self.pilot = User.objects.create_user(email='metrics@example.com', password=None)
+        self.staff = User.objects.create_user(email='staff@example.com', password=None, is_staff=True)
+        _, self.staff_token = AuthToken.objects.create(self.staff)
+        Award.objects.create(name='Tour', description='Tour')
+
+    def counters(self, metric, route):
+        return {key[2:]: value for key, value in registry.snapshot().items() if key[:2] == (metric, route)}
+
+    def test_counts_requests_and_queries(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get('/awards/').status_code, 200)
+        self.assertEqual(self.counters('requests', 'award-list'), {('GET', '200'): 2})
+        self.assertEqual(sum(self.counters('duration_bucket', 'award-list').values()), 2)
+        self.assertGreater(self.counters('queries', 'award-list')[('GET',)], 0)
+        self.client.get('/nao-existe/')
+        self.assertEqual(self.counters('requests', 'unmatched'), {('GET', '404'): 1})
+
+    async def test_async_view_queries(self):
+        response = await AsyncClient().get(f'/user-metrics/{self.pilot.pk}/')
+        self.assertEqual(response.status_code, 200)
+        # A agregação roda via sync_to_async e ainda passa pelo execute_wrapper
+        self.assertEqual(self.counters('queries', 'user-metrics-detail'), {('GET',): 1})
+
+    def test_prometheus_endpoint_is_staff_only(self):
+        self.client.get('/awards/')
+        self.assertEqual(self.client.get('/metrics/').status_code, 401)
+        _, token = AuthToken.objects.create(self.pilot)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION=f'Token {token}').status_code, 403)
+
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION=f'Token {self.staff_token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('crewcenter_http_requests_total{route="award-list",method="GET",status="200"} 1', body)
+        self.assertIn('crewcenter_http_request_duration_seconds_bucket{route="award-list",method="GET",le="+Inf"} 1', body)
+        self.assertIn('crewcenter_db_queries_total{route="award-list",method="GET"}', body)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_request_log_has_sql(self):
+        with self.assertLogs('crud.slow_requests', level='WARNING') as logs:
+            self.client.get('/awards/')
+        self.assertIn('GET /awards/ (award-list)', logs.output[0])
+        self.assertIn('FROM "api_award"', logs.output[0])
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=None)
+    def test_slow_request_log_off(self):
+        with self.assertNoLogs('crud.slow_requests'):
+            self.client.get('/awards/')
+        self.assertEqual(self.counters('requests', 'award-list'), {('GET', '200'): 1})
+
+    def test_slow_request_threshold_from_environment(self):
+        self.addCleanup(importlib.reload, crud_settings)
+        for value, threshold in (('250', 250), ('', None), ('off', None), ('OFF', None)):
+            with self.subTest(value=value), mock.patch.dict(os.environ, {'METRICS_SLOW_REQUEST_MS': value}):
+                self.assertEqual(importlib.reload(crud_settings).METRICS_SLOW_REQUEST_MS, threshold)
+
+    @override_settings(METRICS_SHARED=True, METRICS_FLUSH_INTERVAL=0)
+    def test_shared_counters(self):
+        self.client.get('/awards/')
+        registry.reset()  # Outro worker: o total continua no cache
+        self.client.get('/awards/')
+        self.assertEqual(self.counters('requests', 'award-list'), {('GET', '200'): 2})
+
+
+class ListPaginationTests(TestCase):
+    """Paginação opcional por cursor das listas; as chaves de ordenação empatam de propósito."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.moment = timezone.now() - timedelta(days=1)
+        cls.pilot = User.objects.create_user(email='pages@example.com', password=None)
+        for i in range(5):
+            User.objects.create_user(email=f'pages{i}@example.com', password=None)
+            PirepsFlight.objects.create(
+                pilot=cls.pilot, flight_icao='PAG', flight_number=str(i), departure_airport='SBGR',
+                arrival_airport='SBRJ', flight_duration=timedelta(hours=1), registration_date=cls.moment,
+            )
+            Notification.objects.create(recipient=cls.pilot, message=f'Aviso {i}')
+        User.objects.update(date_joined=cls.moment)
+        Notification.objects.update(created_at=cls.moment)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.pilot)
+
+    def expected(self, url):
+        # Com a data empatada quem decide é o id (decrescente, exceto em users/)
+        ids = {
+            '/users/': User.objects.order_by('id'),
+            '/myflights/': PirepsFlight.objects.filter(pilot=self.pilot).order_by('-id'),
+            '/pirepsflight/': PirepsFlight.objects.order_by('-id'),
+            '/notifications/': Notification.objects.filter(recipient=self.pilot).order_by('-id'),
+        }[url]
+        return list(ids.values_list('id', flat=True))
+
+    def walk(self, url, page_size):
+        """Segue os links ``next`` e confere ``previous``; devolve os ids na ordem das páginas."""
+        ids, pages = [], []
+        response = self.client.get(url, {'page_size': page_size})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(set(response.data), {'next', 'previous', 'results'})
+            self.assertLessEqual(len(response.data['results']), page_size)
+            if pages:
+                self.assertIsNotNone(response.data['previous'])
+            else:
+                self.assertIsNone(response.data['previous'])
+            pages.append([item['id'] for item in response.data['results']])
+            ids += pages[-1]
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+
+        if len(pages) > 1:
+            back = self.client.get(self.client.get(response.data['previous']).data['next'])
+            self.assertEqual([item['id'] for item in back.data['results']], pages[-1])
+        return ids
+
+    def test_cursor_pages_cover_the_list_once_in_stable_order(self):
+        for url in ('/users/', '/myflights/', '/pirepsflight/', '/notifications/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.walk(url, 2), self.expected(url))
+
+    def test_previous_link_returns_the_same_page(self):
+        first = self.client.get('/pirepsflight/', {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        again = self.client.get(second.data['previous'])
+        self.assertEqual(again.data['results'], first.data['results'])
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(FlightCursorPagination, 'max_page_size', 3):
+            response = self.client.get('/myflights/', {'page_size': 100})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_default_page_size_with_cursor_only(self):
+        with mock.patch.object(FlightCursorPagination, 'page_size', 4):
+            first = self.client.get('/myflights/', {'page_size': 4})
+            cursor = parse_qs(urlsplit(first.data['next']).query)['cursor'][0]
+            response = self.client.get('/myflights/', {'cursor': cursor})
+        self.assertEqual(len(first.data['results']), 4)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_cursor_with_a_single_field_position_is_invalid(self):
+        cursor = base64.b64encode(b'p=2024-01-01+00%3A00%3A00%2B00%3A00').decode()
+        response = self.client.get('/notifications/', {'cursor': cursor})
+        self.assertEqual(response.status_code, 404)
+
+    def test_unpaginated_without_params(self):
+        for url in ('/users/', '/myflights/', '/pirepsflight/', '/notifications/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIsInstance(response.data, list)
+                self.assertEqual(sorted(item['id'] for item in response.data), sorted(self.expected(url)))
+
+
+class AwardListTests(TestCase):
+    """Filtros de janela e ``active`` do AwardViewSet e a anotação ``total_legs``."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def award(self, name, start=None, end=None, legs=0):
+        award = Award.objects.create(name=name, description=name, start_date=start, end_date=end)
+        FlightLeg.objects.bulk_create(
+            FlightLeg(award=award, leg_number=i + 1, from_airport='SBGR', to_airport='SBRJ') for i in range(legs)
+        )
+        return award
+
+    def names(self, params=None):
+        response = self.client.get('/awards/', params or {})
+        self.assertEqual(response.status_code, 200)
+        return {item['name'] for item in response.data}
+
+    def test_window_keeps_awards_that_overlap_it(self):
+        day = lambda month, d: timezone.make_aware(datetime(2024, month, d))
+        self.award('antes', day(1, 1), day(2, 1))
+        self.award('entra na janela', day(2, 15), day(3, 10))
+        self.award('sai da janela', day(3, 20), day(4, 20))
+        self.award('cobre a janela', day(1, 1), day(12, 31))
+        self.award('depois', day(4, 5), day(5, 1))
+        self.award('sem início', None, day(3, 5))
+        self.award('sem início, antes', None, day(2, 1))
+        self.award('sem fim', day(3, 25), None)
+        self.award('sem fim, depois', day(4, 10), None)
+        self.award('sem datas')
+
+        window = {'start_date': '2024-03-01', 'end_date': '2024-03-31'}
+        self.assertEqual(self.names(window), {
+            'entra na janela', 'sai da janela', 'cobre a janela', 'sem início', 'sem fim', 'sem datas',
+        })
+        self.assertEqual(self.names({'start_date': '2024-04-21'}), {
+            'cobre a janela', 'depois', 'sem fim', 'sem fim, depois', 'sem datas',
+        })
+        self.assertEqual(self.names({'end_date': '2024-01-31'}), {
+            'antes', 'cobre a janela', 'sem início', 'sem início, antes', 'sem datas',
+        })
+
+    def test_end_date_covers_the_whole_day(self):
+        self.award('último dia', timezone.make_aware(datetime(2024, 3, 31, 23, 0)))
+        self.assertEqual(self.names({'end_date': '2024-03-31'}), {'último dia'})
+        self.assertEqual(self.names({'end_date': '2024-03-30'}), set())
+
+    def test_active(self):
+        now = timezone.now()
+        self.award('aberto', now - timedelta(days=1), now + timedelta(days=1))
+        self.award('encerrado', now - timedelta(days=10), now - timedelta(days=1))
+        self.award('futuro', now + timedelta(days=1), now + timedelta(days=10))
+        self.award('sem início', None, now + timedelta(days=1))
+        self.award('sem fim', now - timedelta(days=1), None)
+        self.award('sem datas')
+
+        self.assertEqual(self.names({'active': 'true'}), {'aberto', 'sem início', 'sem fim', 'sem datas'})
+        everything = {'aberto', 'encerrado', 'futuro', 'sem início', 'sem fim', 'sem datas'}
+        self.assertEqual(self.names({'active': 'false'}), everything)
+        self.assertEqual(self.names(), everything)
+
+    def test_invalid_date(self):
+        response = self.client.get('/awards/', {'start_date': '31/03/2024'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('start_date', response.data)
+
+    def test_total_legs(self):
+        self.award('três pernas', legs=3)
+        self.award('sem pernas')
+        award = self.award('uma perna', legs=1)
+        AllowedAircraft.objects.create(award=award, aircraft='A320')
+        AllowedAircraft.objects.create(award=award, aircraft='B738')
+
+        response = self.client.get('/awards/')
+        self.assertEqual(
+            {item['name']: item['total_legs'] for item in response.data},
+            {'três pernas': 3, 'sem pernas': 0, 'uma perna': 1},
+        )
+        # O JOIN das pernas não pode multiplicar a contagem pelas aeronaves
+        detail = self.client.get(f'/awards/{award.pk}/')
+        self.assertEqual(detail.data['total_legs'], 1)
+        self.assertEqual(sorted(detail.data['allowed_aircrafts']), ['A320', 'B738'])
+
+    def test_pages(self):
+        for i in range(5):
+            self.award(f'Tour {i}', legs=i)
+        with mock.patch.object(OptionalPageNumberPagination, 'page_size', 2):
+            first = self.client.get('/awards/', {'page': 1})
+            last = self.client.get('/awards/', {'page': 3})
+        self.assertEqual(first.data['count'], 5)
+        self.assertEqual([item['total_legs'] for item in first.data['results']], [0, 1])
+        self.assertEqual([item['total_legs'] for item in last.data['results']], [4])
+        self.assertIsNone(last.data['next'])
+
+
+class QueryBudgetTests(TestCase):
+    """Cada endpoint com 1 e com 100 linhas relacionadas: o número de consultas não pode crescer."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.pilot = User.objects.create_user(email='budget@example.com', password=None)
+        _, token = AuthToken.objects.create(self.pilot)
+        self.client = APIClient(HTTP_AUTHORIZATION=f'Token {token}')
+        self.award = Award.objects.create(name='Tour', description='Tour')
+
+    def create_pilots(self, count):
+        return User.objects.bulk_create(
+            User(email=f'budget{i}@example.com', first_name=f'P{i}', last_name='Budget') for i in range(count)
+        )
+
+    def create_pireps(self, count, pilots=None, status='Approved'):
+        pilots = pilots or [self.pilot]
+        return PirepsFlight.objects.bulk_create(
+            PirepsFlight(
+                pilot=pilots[i % len(pilots)], flight_icao='BGT', flight_number=str(i), status=status,
+                departure_airport='SBGR', arrival_airport=f'SB{i % 100:02d}', flight_duration=timedelta(hours=1),
+            )
+            for i in range(count)
+        )
+
+    def create_legs(self, award, count):
+        FlightLeg.objects.bulk_create(
+            FlightLeg(award=award, leg_number=i + 1, from_airport=f'SB{i:02d}', to_airport=f'SB{i + 1:02d}')
+            for i in range(count)
+        )
+
+    @query_budget('/awards/', 6)
+    def test_awards(self, rows):
+        awards = Award.objects.bulk_create(Award(name=f'Tour {i}', description='Tour') for i in range(rows))
+        for award in awards:
+            self.create_legs(award, 2)
+        AllowedAircraft.objects.bulk_create(AllowedAircraft(award=award, aircraft='A320') for award in awards)
+        AllowedIcao.objects.bulk_create(AllowedIcao(award=award, company_icao='TAM') for award in awards)
+
+    @query_budget('/awards/?start_date=2024-03-01&end_date=2024-03-31&page_size=20', 7)
+    def test_awards_window_page(self, rows):
+        start = timezone.make_aware(datetime(2024, 3, 10))
+        awards = Award.objects.bulk_create(
+            Award(name=f'Tour {i}', description='Tour', start_date=start, end_date=start + timedelta(days=i))
+            for i in range(rows)
+        )
+        for award in awards[:20]:
+            self.create_legs(award, 2)
+        AllowedAircraft.objects.bulk_create(AllowedAircraft(award=award, aircraft='A320') for award in awards)
+        AllowedIcao.objects.bulk_create(AllowedIcao(award=award, company_icao='TAM') for award in awards)
+
+    @query_budget('/awards/?active=true', 6)
+    def test_active_awards(self, rows):
+        now = timezone.now()
+        awards = Award.objects.bulk_create(
+            Award(name=f'Tour {i}', description='Tour', end_date=now + timedelta(days=1)) for i in range(rows)
+        )
+        for award in awards:
+            self.create_legs(award, 2)
+        AllowedAircraft.objects.bulk_create(AllowedAircraft(award=award, aircraft='A320') for award in awards)
+
+    @query_budget('/awards/{award}/', 6)
+    def test_award_detail(self, rows):
+        self.create_legs(self.award, rows)
+        return {'award': self.award.pk}
+
+    @query_budget('/flight-legs/?award={award}', 4)
+    def test_flight_legs(self, rows):
+        self.create_legs(self.award, rows)
+        self.create_pireps(rows)
+        return {'award': self.award.pk}
+
+    @query_budget('/user-awards/', 4)
+    def test_user_awards(self, rows):
+        awards = Award.objects.bulk_create(Award(name=f'Tour {i}', description='Tour') for i in range(rows))
+        UserAward.objects.bulk_create(UserAward(user=self.pilot, award=award) for award in awards)
+
+    @query_budget('/notifications/', 4)
+    def test_notifications(self, rows):
+        Notification.objects.bulk_create(
+            Notification(recipient=self.pilot, message=f'Mensagem {i}', dedupe_key=f'budget:{i}') for i in range(rows)
+        )
+
+    @query_budget('/users/', 4)
+    def test_users(self, rows):
+        self.create_pilots(rows)
+
+    @query_budget('/pirepsflight/', 4)
+    def test_pireps(self, rows):
+        self.create_pireps(rows, self.create_pilots(rows))
+
+    @query_budget('/myflights/', 4)
+    def test_my_flights(self, rows):
+        self.create_pireps(rows)
+
+    @query_budget('/myflights/{pirep}/', 4)
+    def test_my_flight_detail(self, rows):
+        return {'pirep': self.create_pireps(rows)[-1].pk}
+
+    @query_budget('/dashboard/', 4)
+    def test_dashboard(self, rows):
+        self.create_pireps(rows)
+
+    @query_budget('/user-approved-flights/{pilot}/', 4)
+    def test_user_approved_flights(self, rows):
+        self.create_pireps(rows)
+        return {'pilot': self.pilot.pk}
+
+    @query_budget('/dashboard/rankings/', 5)
+    def test_dashboard_rankings(self, rows):
+        self.create_pireps(rows, self.create_pilots(rows))
+
+    @query_budget('/leaderboards/all-time/?limit=100', 5)
+    def test_leaderboard(self, rows):
+        pilots = self.create_pilots(rows)
+        self.create_pireps(rows, pilots)
+        stats.rebuild([pilot.pk for pilot in pilots])
+        leaderboards.refresh('all-time')
+
+    def test_max_queries_lists_sql(self):
+        with self.assertRaisesMessage(AssertionError, '2 consultas, orçamento de 1:\n  1. SELECT'):
+            with max_queries(1):
+                list(User.objects.all())
+                list(Award.objects.all())
+
+
+class AdminQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password=None, is_staff=True, is_superuser=True)
+        self.client.force_login(self.admin)
+
+    def create_pilots(self, count):
+        return User.objects.bulk_create(User(email=f'admin{i}@example.com') for i in range(count))
+
+    @query_budget('/admin/api/useraward/', 7)
+    def test_user_awards(self, rows):
+        awards = Award.objects.bulk_create(Award(name=f'Tour {i}', description='Tour') for i in range(rows))
+        UserAward.objects.bulk_create(
+            UserAward(user=pilot, award=award) for pilot, award in zip(self.create_pilots(rows), awards)
+        )
+
+    @query_budget('/admin/api/notification/', 5)
+    def test_notifications(self, rows):
+        Notification.objects.bulk_create(
+            Notification(recipient=pilot, message='Mensagem', dedupe_key=f'admin:{pilot.pk}')
+            for pilot in self.create_pilots(rows)
+        )
+
+    @query_budget('/admin/api/pirepsflight/', 5)
+    def test_pireps(self, rows):
+        PirepsFlight.objects.bulk_create(
+            PirepsFlight(pilot=pilot, flight_number='1', departure_airport='SBGR', arrival_airport='SBRJ')
+            for pilot in self.create_pilots(rows)
+        )
+
+
+class LogbookExportTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.pilot = User.objects.create_user(email='logbook@example.com', password=None)
+        self.other = User.objects.create_user(email='other@example.com', password=None)
+        self.staff = User.objects.create_user(email='staff@example.com', password=None, is_staff=True)
+        now = timezone.now()
+        for days, status, pilot in [(3, 'Approved', self.pilot), (2, 'Rejected', self.pilot),
+                                    (1, 'Approved', self.pilot), (2, 'Approved', self.other)]:
+            PirepsFlight.objects.create(
+                pilot=pilot, flight_icao='LOG', flight_number=str(days), status=status,
+                departure_airport='SBGR', arrival_airport='SBRJ', flight_duration=timedelta(minutes=95),
+                registration_date=now - timedelta(days=days),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.pilot)
+
+    def export(self, fmt='ndjson', **params):
+        response = self.client.get(f'/logbook/export/{fmt}/', params)
+        if not response.streaming:
+            return response, None
+        body = b''.join(response.streaming_content).decode()
+        if fmt == 'csv':
+            return response, list(csv.DictReader(io.StringIO(body)))
+        return response, [json.loads(line) for line in body.splitlines()]
+
+    def test_csv(self):
+        response, rows = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn(f'filename="logbook-{self.pilot.pk}-', response['Content-Disposition'])
+        self.assertEqual([row['flight_number'] for row in rows], ['3', '2', '1'])
+        self.assertEqual(rows[0]['flight_duration'], '01:35:00')
+        self.assertEqual(rows[0]['pilot_email'], 'logbook@example.com')
+        self.assertEqual(rows[0]['observation'], '')
+
+    def test_filters(self):
+        _, rows = self.export(status='Approved')
+        self.assertEqual([row['flight_number'] for row in rows], ['3', '1'])
+        start = (timezone.now() - timedelta(days=2, hours=12)).isoformat()
+        _, rows = self.export(status='Approved,Rejected', start_date=start)
+        self.assertEqual([row['status'] for row in rows], ['Rejected', 'Approved'])
+        _, rows = self.export(end_date=(timezone.localdate() - timedelta(days=4)).isoformat())
+        self.assertEqual(rows, [])
+
+        self.assertEqual(self.export(status='Approved,Pending')[0].status_code, 400)
+        self.assertEqual(self.export(start_date='ontem')[0].status_code, 400)
+        self.assertEqual(self.export('xml')[0].status_code, 404)
+
+    def test_pilot_and_staff_scope(self):
+        self.assertEqual(self.export(pilot=self.other.pk)[0].status_code, 403)
+        self.assertEqual(len(self.export(pilot=self.pilot.pk)[1]), 3)
+
+        self.client.force_authenticate(self.staff)
+        response, rows = self.export()
+        self.assertIn('filename="logbook-all-', response['Content-Disposition'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row['pilot_id'] for row in self.export(pilot=self.other.pk)[1]}, {self.other.pk})
+        self.assertEqual(self.client.get('/logbook/export/csv/', {'pilot': 'x'}).status_code, 400)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_streams_in_chunks_from_one_query(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/logbook/export/ndjson/')
+        with self.assertNumQueries(1):
+            chunks = list(response.streaming_content)
+        self.assertEqual([chunk.count(b'\n') for chunk in chunks], [2, 2])
+
+    async def test_asgi_streams_async_iterator(self):
+        _, token = await sync_to_async(AuthToken.objects.create)(self.pilot)
+        response = await AsyncClient().get('/logbook/export/csv/', headers={'Authorization': f'Token {token}'})
+        self.assertTrue(response.is_async)  # Sem o aviso de iterador síncrono consumido inteiro
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(len(body.splitlines()), 4)
+
+
+class LogbookImportTests(TestCase):
+    HEADER = 'flight_icao,flight_number,departure_airport,arrival_airport,aircraft,flight_duration,registration_date,status\n'
+
+    def setUp(self):
+        self.pilot = User.objects.create_user(email='import@example.com', password=None)
+        self.staff = User.objects.create_user(email='staff@example.com', password=None, is_staff=True)
+        self.award = Award.objects.create(name='Tour', description='Tour')
+        FlightLeg.objects.create(award=self.award, from_airport='SBGR', to_airport='SBRJ')
+        FlightLeg.objects.create(award=self.award, from_airport='SBRJ', to_airport='SBSP')
+        self.client = APIClient()
+        self.client.force_authenticate(self.pilot)
+
+    def upload(self, lines, name='logbook.csv', **params):
+        file = io.BytesIO((self.HEADER + ''.join(lines)).encode())
+        file.name = name
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.post(f'/logbook/import/?{query}', {'file': file}, format='multipart')
+
+    def lines(self, count, status='Approved'):
+        routes = [('SBGR', 'SBRJ'), ('SBRJ', 'SBSP')]
+        return [
+            f'tam,{i},{routes[i % 2][0].lower()},{routes[i % 2][1]},A320,01:30,2024-01-{i % 28 + 1:02d}T{i % 24:02d}:00:00,{status}\n'
+            for i in range(count)
+        ]
+
+    def test_pilot_import_goes_to_review(self):
+        response = self.upload(self.lines(3))
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data, {'imported': 3, 'approved': 0})
+        pirep = PirepsFlight.objects.get(pilot=self.pilot, flight_number='0')
+        self.assertEqual(
+            (pirep.status, pirep.flight_icao, pirep.departure_airport, pirep.flight_duration),
+            ('In Review', 'TAM', 'SBGR', timedelta(minutes=90)),
+        )
+        self.assertFalse(PilotStats.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_row_errors_save_nothing(self):
+        PirepsFlight.objects.create(
+            pilot=self.pilot, flight_number='9', departure_airport='SBGR', arrival_airport='SBRJ',
+            registration_date=timezone.make_aware(datetime(2024, 2, 1, 10)),
+        )
+        response = self.upload([
+            'TAM,,SBGR,SBRJ,A320,01:00,2024-01-01,\n',
+            'TAM,2,SBGR,SBRJ,XXXX,1h,ontem,\n',
+            'TAM,3,SBGR,SBRJ,A320,,2999-01-01,\n',
+            'TAM,9,SBGR,SBRJ,A320,,2024-02-01T10:00:00,\n',
+            'TAM,5,SBGR,SBRJ,,,2024-01-05,\n',
+            'TAM,5,SBGR,SBRJ,,,2024-01-05,\n',
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['imported'], 0)
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(set(errors), {1, 2, 3, 4, 6})
+        self.assertEqual(errors[1], {'flight_number': ['Campo obrigatório.']})
+        self.assertEqual(set(errors[2]), {'aircraft', 'flight_duration', 'registration_date'})
+        self.assertEqual(errors[3], {'registration_date': ['Data no futuro.']})
+        self.assertEqual(errors[4], {'non_field_errors': ['Voo já registrado no diário de bordo.']})
+        self.assertEqual(errors[6], {'non_field_errors': ['Voo repetido no arquivo (linha 5).']})
+        self.assertEqual(PirepsFlight.objects.count(), 1)
+
+    def test_exported_file_imports_into_another_pilot(self):
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.upload(self.lines(4), pilot=self.pilot.pk).status_code, 201)
+        body = b''.join(self.client.get('/logbook/export/csv/', {'pilot': self.pilot.pk}).streaming_content)
+        file = io.BytesIO(body)
+        file.name = 'export.csv'
+
+        # O mesmo arquivo no mesmo piloto só tem duplicados
+        response = self.client.post(f'/logbook/import/?pilot={self.pilot.pk}', {'file': file}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['errors']), 4)
+
+        file.seek(0)
+        other = User.objects.create_user(email='other@example.com', password=None)
+        response = self.client.post(f'/logbook/import/?pilot={other.pk}', {'file': file}, format='multipart')
+        self.assertEqual(response.data, {'imported': 4, 'approved': 4})
+
+    def test_staff_import_recomputes_once(self):
+        self.client.force_authenticate(self.staff)
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.upload(self.lines(4), pilot=self.pilot.pk).status_code, 201)
+        self.assertEqual(UserAward.objects.get(user=self.pilot, award=self.award).progress, 100)
+        self.assertEqual(PilotStats.objects.get(pilot=self.pilot).total_flights, 4)
+
+        other = User.objects.create_user(email='other@example.com', password=None)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(self.upload(self.lines(400), pilot=other.pk).status_code, 201)
+        pilot_stats = PilotStats.objects.get(pilot=other)
+        self.assertEqual((pilot_stats.total_flights, pilot_stats.total_duration), (400, timedelta(hours=600)))
+        # Fora os INSERTs dos PIREPs (em lotes limitados pelo banco), as consultas não crescem com as linhas
+        def without_inserts(captured):
+            return [query for query in captured.captured_queries if 'INSERT INTO "api_pirepsflight"' not in query['sql']]
+        self.assertEqual(len(without_inserts(few)), len(without_inserts(many)))
+
+    @override_settings(LOGBOOK_IMPORT_MAX_ROWS=2)
+    def test_json_and_file_errors(self):
+        flights = [{'flight_number': '1', 'departure_airport': 'SBGR', 'arrival_airport': 'SBRJ',
+                    'registration_date': '2024-01-01', 'flight_duration': '02:00:00'}]
+        response = self.client.post('/logbook/import/', flights, format='json')
+        self.assertEqual(response.data, {'imported': 1, 'approved': 0})
+
+        self.assertEqual(self.client.post('/logbook/import/', [], format='json').status_code, 400)
+        self.assertEqual(self.client.post('/logbook/import/', flights * 3, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/logbook/import/', {'flight': 1}, format='json').status_code, 400)
+        self.assertEqual(self.upload(self.lines(1), pilot=self.staff.pk).status_code, 403)
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.upload(self.lines(1), pilot=999).status_code, 400)
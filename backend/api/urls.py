@@ -16,16 +16,26 @@ router.register(r'allowed-icaos', AllowedIcaoViewSet)
 router.register(r'user-awards', UserAwardViewSet)
 router.register(r'notifications', NotificationViewSet, basename='notification')
 router.register(r'users', UserDetailViewSet, basename='user-detail')  # Registra a ViewSet
-router.register(r'user-metrics', UserMetricsViewSet, basename='user-metrics')
-router.register(r'user-approved-flights', UserApprovedFlightsViewSet, basename='user-approved-flights')
+router.register(r'airports', AirportViewSet, basename='airports')
+router.register(r'leaderboards', LeaderboardViewSet, basename='leaderboards')
 
 
 # Adicione a rota manualmente para o endpoint users/me/
 urlpatterns = [
     path('users/me/', CurrentUserView.as_view(), name='current-user'),
+    path('notifications/stream/', notification_stream, name='notification-stream'),
+    path('notifications/stream/ticket/', NotificationStreamTicketView.as_view(), name='notification-stream-ticket'),
     path('profile/update/', ProfileUpdateView.as_view(), name='profile-update'),
     path("flight-stats/", FlightStatsView.as_view(), name="flight-stats"),
+    path('dashboard/rankings/', DashboardRankingsView.as_view(), name='dashboard-rankings'),
+    path('user-metrics/<int:pk>/', UserMetricsView.as_view(), name='user-metrics-detail'),
+    path('user-approved-flights/<int:pk>/', UserApprovedFlightsView.as_view(), name='user-approved-flights-detail'),
+    path('logbook/import/', LogbookImportView.as_view(), name='logbook-import'),
+    path('logbook/export/<str:fmt>/', LogbookExportView.as_view(), name='logbook-export'),
     path('api/validate-token/', ValidateTokenView.as_view(), name='validate-token'),
+    path('live/<uuid:session_id>/flights/<uuid:flight_id>/<str:detail>/', LiveFlightDetailView.as_view(), name='live-flight-detail'),
+    path('live/users/stats/', LiveUserStatsView.as_view(), name='live-user-stats'),
+    path('live/<uuid:session_id>/<str:feed>/', LiveTrafficView.as_view(), name='live-traffic'),
 ]
 
 # Inclua as rotas do router
@@ -1,4 +1,4 @@
-from django.core.mail import send_mail
+from .outbox import enqueue_email
 
 def send_welcome_email(user_email):
     subject = "Welcome to Our Platform!"
@@ -6,4 +6,4 @@ def send_welcome_email(user_email):
     from_email = "sysinfiniteworldtour@gmail.com"
     recipient_list = [user_email]
 
-    send_mail(subject, message, from_email, recipient_list)
+    enqueue_email(subject, message, recipient_list, from_email=from_email)
@@ -4,14 +4,31 @@ from rest_framework.views import APIView
 from rest_framework import viewsets, status, permissions
 from rest_framework.response import Response
 from .serializers import *
-from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth import get_user_model
 from knox.models import AuthToken
-from django.db.models import Sum, Count
+import knox.settings
+from django.db.models import Max, Sum, Count, OuterRef, Q, Subquery
 from rest_framework.decorators import action
-from rest_framework.viewsets import ViewSet
-from datetime import timedelta
-from django.http import HttpResponse
+from datetime import datetime, timedelta
+from django.utils.dateparse import parse_date, parse_datetime
+from django.db.models.functions import Upper
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.throttling import AnonRateThrottle
+from .authentication import issue_stream_ticket, redeem_stream_ticket
+import asyncio
+import json
 from .utils import send_welcome_email
+from . import cache, events, export, imports, leaderboards, live, review
+import httpx
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from .pagination import (
+    FlightCursorPagination, NotificationCursorPagination, OptionalPageNumberPagination, UserCursorPagination,
+    pagination_requested,
+)
 from rest_framework.decorators import api_view
 from django.db.models import Sum, Count
 
@@ -33,27 +50,33 @@ class LoginViewset(viewsets.ViewSet):
     serializer_class = LoginSerializer
 
     def create(self, request):
-        serializer = self.serializer_class(data=request.data)
+        serializer = self.serializer_class(data=request.data, context={'request': request})
         if serializer.is_valid():
-            email = serializer.validated_data['email']
-            password = serializer.validated_data['password']
-
-            user = authenticate(request, email=email, password=password)
+            # validate() já autenticou: a senha é verificada uma única vez por tentativa
+            user = serializer.validated_data['user']
+            self.prune_tokens(user)
+            _, token = AuthToken.objects.create(user)
 
-            if user:
-                _, token = AuthToken.objects.create(user)
-
-                return Response(
-                    {
-                        'user': self.serializer_class(user).data,
-                        'token': token
-                    }
-                )
-            else:
-                return Response({'error': 'Invalid credentia'}, status=401)
+            return Response(
+                {
+                    'user': self.serializer_class(user).data,
+                    'token': token
+                }
+            )
         
         else:
             return Response(serializer.errors, status=400)
+
+    @staticmethod
+    def prune_tokens(user):
+        """Remove os tokens expirados e os mais antigos além de REST_KNOX['TOKEN_LIMIT_PER_USER']."""
+        tokens = user.auth_token_set.all()
+        tokens.filter(expiry__lt=timezone.now()).delete()
+        limit = knox.settings.knox_settings.TOKEN_LIMIT_PER_USER
+        if limit is not None:
+            stale = tokens.order_by('-created').values_list('pk', flat=True)[limit - 1:]
+            if stale:
+                tokens.filter(pk__in=list(stale)).delete()
         
 class UserViewset(viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]  # Permite acesso sem autenticação
@@ -62,6 +85,10 @@ class UserViewset(viewsets.ViewSet):
 
     def list(self, request):
         queryset = User.objects.all()
+        paginator = UserCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(self.serializer_class(page, many=True).data)
         serializer = self.serializer_class(queryset, many=True)  # Serializa os dados dos usuários
         return Response(serializer.data)
     
@@ -69,6 +96,7 @@ class PirepsFlightViewset(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = PirepsFlightSerializer
     queryset = PirepsFlight.objects.all()
+    pagination_class = FlightCursorPagination
 
     def perform_create(self, serializer):
         serializer.save(pilot=self.request.user, status="In Review")
@@ -94,13 +122,31 @@ class PirepsFlightViewset(viewsets.ModelViewSet):
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['post'], url_path='bulk-review', permission_classes=[permissions.IsAdminUser])
+    def bulk_review(self, request):
+        """
+        Aprova ou rejeita vários PIREPs de uma vez: {"ids": [...], "status": "Approved"|"Rejected"}.
+        """
+        serializer = BulkReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        updated = review.review_pireps(data['ids'], data['status'], data.get('observation'))
+        return Response({"updated": updated, "skipped": len(set(data['ids'])) - updated})
+
 class MyFlightsViewSet(viewsets.ReadOnlyModelViewSet):  
     """ViewSet para listar os voos do usuário logado."""
     serializer_class = PirepsFlightSerializer
-    permission_classes = [permissions.AllowAny]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return PirepsFlight.objects.filter(pilot=self.request.user)
 
     def list(self, request):
-        queryset = PirepsFlight.objects.filter(pilot=request.user)
+        queryset = self.get_queryset()
+        paginator = FlightCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(self.serializer_class(page, many=True).data)
         serializer = self.serializer_class(queryset, many=True)
 
         return Response(serializer.data)
@@ -113,37 +159,132 @@ class DashboardViewSet(viewsets.ViewSet):
     def list(self, request):
         # Dados do usuário logado
         user_flights = PirepsFlight.objects.filter(pilot=request.user)
+        paginator = FlightCursorPagination()
+        page = paginator.paginate_queryset(user_flights, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(self.serializer_class(page, many=True).data)
         serializer = self.serializer_class(user_flights, many=True)
         return Response(serializer.data)
+    
+def parse_date_param(params, name):
+    """?start_date / ?end_date em AAAA-MM-DD (dia inteiro) ou ISO 8601."""
+    value = params.get(name)
+    if not value:
+        return None
+    # A data pura vem antes: parse_datetime aceita AAAA-MM-DD como meia-noite
+    day = parse_date(value)
+    if day is not None:
+        parsed = datetime.combine(day, datetime.max.time() if name == 'end_date' else datetime.min.time())
+    else:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise serializers.ValidationError({name: 'Data inválida, use AAAA-MM-DD ou ISO 8601.'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+def pilot_param(request, value):
+    """?pilot=<id> do diário de bordo: staff escolhe qualquer piloto, os demais só a si mesmos."""
+    if value in (None, ''):
+        return None
+    if not str(value).isdigit():
+        raise serializers.ValidationError({'pilot': 'ID de usuário inválido.'})
+    if not request.user.is_staff and int(value) != request.user.pk:
+        raise PermissionDenied("Só staff acessa o diário de bordo de outros pilotos.")
+    return int(value)
+
+class LogbookExportView(APIView):
+    """
+    Diário de bordo em stream: ``logbook/export/csv/`` ou ``logbook/export/ndjson/``.
 
-    @action(detail=False, methods=["get"])
-    def rankings(self, request):
-        
-        # Top 5 Duração de Voo
-        top_duration = (
-            PirepsFlight.objects.filter(status="Approved")
-            .values("pilot__first_name", "pilot__last_name")  # Use o campo correto para o nome do piloto
-            .annotate(total_duration=Sum("flight_duration"))
-            .order_by("-total_duration")[:5]
-        )
+    Filtros: ?start_date, ?end_date e ?status (separados por vírgula). O piloto exporta
+    os próprios voos; staff exporta todos os pilotos, ou um só com ?pilot=<id>.
+    """
+    permission_classes = [IsAuthenticated]
 
-        # Top 5 Total de Voos
-        top_flights = (
-            PirepsFlight.objects.filter(status="Approved")
-            .values("pilot__first_name", "pilot__last_name")  # Use o campo correto para o nome do piloto
-            .annotate(total_flights=Count("id"))
-            .order_by("-total_flights")[:5]
+    def get(self, request, fmt):
+        if fmt not in export.FORMATS:
+            raise NotFound(f"Formato desconhecido, use {' ou '.join(export.FORMATS)}.")
+        params = request.query_params
+        pilot_id = pilot_param(request, params.get('pilot'))
+        if not request.user.is_staff:
+            pilot_id = request.user.pk
+
+        statuses = [value for value in params.get('status', '').split(',') if value]
+        invalid = set(statuses) - export.STATUSES
+        if invalid:
+            raise serializers.ValidationError({'status': f"Status inválido: {', '.join(sorted(invalid))}."})
+
+        queryset = export.flights(
+            pilot_id, parse_date_param(params, 'start_date'), parse_date_param(params, 'end_date'), statuses,
         )
+        chunks, content_type = export.FORMATS[fmt]
+        content = chunks(queryset)
+        if isinstance(request._request, ASGIRequest):
+            content = export.async_chunks(content)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f"logbook-{pilot_id or 'all'}-{timezone.localdate():%Y%m%d}.{fmt}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Accel-Buffering'] = 'no'  # Sem buffer no nginx
+        return response
+
+class LogbookImportView(APIView):
+    """
+    Importa voos em lote (``logbook/import/``): arquivo CSV/JSON em ``file`` ou uma
+    lista JSON no corpo, com as colunas da exportação.
+
+    Tudo ou nada: com algum erro nada é gravado e a resposta traz os erros de cada
+    linha. Os voos do piloto entram em análise; staff pode importar para outro piloto
+    (?pilot=<id>) mantendo a coluna ``status``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        pilot_id = pilot_param(request, request.query_params.get('pilot')) or request.user.pk
+        if pilot_id != request.user.pk and not User.objects.filter(pk=pilot_id).exists():
+            raise serializers.ValidationError({'pilot': 'Usuário não encontrado.'})
+        try:
+            rows = imports.read_rows(request.FILES.get('file'), request.data)
+        except imports.ImportFileError as error:
+            raise serializers.ValidationError({'file': str(error)})
+
+        pireps, errors = imports.validate(rows, pilot_id, keep_status=request.user.is_staff)
+        if errors:
+            return Response({"imported": 0, "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        created = imports.import_pireps(pireps)
+        approved = sum(pirep.status == 'Approved' for pirep in created)
+        return Response({"imported": len(created), "approved": approved}, status=status.HTTP_201_CREATED)
 
-        return Response({
-            "top_duration": list(top_duration),
-            "top_flights": list(top_flights),
-        })
-    
 class AwardViewSet(viewsets.ModelViewSet):
     queryset = Award.objects.all()
     serializer_class = AwardsSerializer
     permission_classes = [permissions.AllowAny]  # Ou outra permissão, se necessário
+    pagination_class = OptionalPageNumberPagination
+
+    def get_queryset(self):
+        # Total de pernas anotado e listas de aeronaves/ICAOs pré-carregadas: consultas fixas por página
+        queryset = (
+            Award.objects.annotate(total_legs=Count('flight_legs'))
+            .prefetch_related('allowed_aircrafts', 'allowed_icao')
+            .order_by('id')
+        )
+
+        # ?active=true: tours abertos agora; ?start_date/?end_date: tours ativos em algum momento da janela
+        params = self.request.query_params
+        if params.get('active') in ('1', 'true', 'True'):
+            now = timezone.now()
+            window_start, window_end = now, now
+        else:
+            window_start = self.parse_date_param('start_date')
+            window_end = self.parse_date_param('end_date')
+        if window_end:
+            queryset = queryset.filter(Q(start_date__isnull=True) | Q(start_date__lte=window_end))
+        if window_start:
+            queryset = queryset.filter(Q(end_date__isnull=True) | Q(end_date__gte=window_start))
+        return queryset
+
+    def parse_date_param(self, name):
+        return parse_date_param(self.request.query_params, name)
 
 class FlightLegViewSet(viewsets.ModelViewSet):
     serializer_class = FlightLegSerializer
@@ -156,20 +297,19 @@ class FlightLegViewSet(viewsets.ModelViewSet):
         award_id = self.request.query_params.get('award', None)
         if award_id:
             queryset = queryset.filter(award_id=award_id)
-        return queryset
 
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        for leg_data in response.data:
-            # Busca o PIREP associado à leg para o usuário logado
-            pirep = PirepsFlight.objects.filter(
-                departure_airport=leg_data['from_airport'],
-                arrival_airport=leg_data['to_airport'],
-                pilot=request.user  # Filtra PIREPs do usuário logado (usando o campo correto)
-            ).first()
-            # Adiciona o status do PIREP à resposta
-            leg_data['pirep_status'] = pirep.status if pirep else None
-        return response
+        if self.action == 'list':
+            # Status do PIREP do piloto em cada perna, resolvido na mesma consulta
+            pilot_id = self.request.query_params.get('user') or self.request.user.pk
+            if not str(pilot_id).isdigit():
+                raise serializers.ValidationError({'user': 'ID de usuário inválido.'})
+            pireps = PirepsFlight.objects.filter(
+                pilot_id=pilot_id,
+                departure_airport=OuterRef('from_airport'),
+                arrival_airport=OuterRef('to_airport'),
+            ).order_by('pk')
+            queryset = queryset.annotate(pirep_status=Subquery(pireps.values('status')[:1]))
+        return queryset
 
 class AllowedAircraftViewSet(viewsets.ModelViewSet):
     queryset = AllowedAircraft.objects.all()
@@ -197,17 +337,10 @@ class UserAwardViewSet(viewsets.ModelViewSet):
 
         return self.queryset.none()  # Se não houver usuário autenticado, retorna vazio
 
-class CurrentUserView(APIView):
-    permission_classes = [IsAuthenticated]  # Apenas usuários autenticados podem acessar
-
-    def get(self, request):
-        user = request.user  # Obtém o usuário logado
-        serializer = UserSerializer(user)  # Serializa os dados do usuário
-        return Response(serializer.data)  # Retorna os dados serializados
-    
 class NotificationViewSet(viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = NotificationCursorPagination
 
     def get_queryset(self):
         return Notification.objects.filter(recipient=self.request.user, is_read=False).order_by('-created_at')
@@ -216,9 +349,102 @@ class NotificationViewSet(viewsets.ModelViewSet):
     def mark_as_read(self, request, pk=None):
         notification = self.get_object()
         notification.is_read = True
-        notification.save()
+        notification.save(update_fields=['is_read'])  # O signal atualiza o contador de não lidas
         return Response({"status": "Notificação marcada como lida"}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['GET'], url_path='unread-count')
+    def unread_count(self, request):
+        # Lido do banco: o request.user pode vir do cache de autenticação
+        unread = User.objects.filter(pk=request.user.pk).values_list('unread_notifications', flat=True).first()
+        return Response({"unread": unread or 0})
     
+def sse_event(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+def load_notification_changes(user_id, last_id):
+    """Notificações não lidas com id > last_id e o contador atual do usuário."""
+    if last_id is None:
+        # Conexão nova: só interessam as notificações criadas daqui em diante
+        last_id = Notification.objects.filter(recipient_id=user_id).aggregate(last=Max('id'))['last'] or 0
+    notifications = list(
+        Notification.objects.filter(recipient_id=user_id, is_read=False, id__gt=last_id).order_by('id')[:50]
+    )
+    unread = User.objects.filter(pk=user_id).values_list('unread_notifications', flat=True).first() or 0
+    return NotificationSerializer(notifications, many=True).data, unread, last_id
+
+async def notification_events(user_id, last_id, once):
+    """
+    Gera os eventos SSE de um usuário: "notification" para cada notificação nova e
+    "unread" quando o contador muda, acordando por ``events.publish`` ou a cada
+    NOTIFICATION_STREAM_POLL_INTERVAL segundos.
+    """
+    poll_interval = settings.NOTIFICATION_STREAM_POLL_INTERVAL
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.NOTIFICATION_STREAM_MAX_DURATION
+    subscription = None if once else events.subscribe(user_id)
+    unread = None
+    try:
+        yield f"retry: {poll_interval * 1000 if once else 3000}\n\n"
+        while True:
+            if subscription:
+                subscription[1].clear()
+            notifications, count, last_id = await sync_to_async(load_notification_changes)(user_id, last_id)
+            for notification in notifications:
+                last_id = notification['id']
+                yield sse_event("notification", notification, event_id=last_id)
+            if count != unread:
+                unread = count
+                # Com id: uma reconexão retoma daqui mesmo sem ter recebido notificações
+                yield sse_event("unread", {"unread": unread}, event_id=last_id)
+            if once or loop.time() >= deadline:
+                return
+            try:
+                await asyncio.wait_for(subscription[1].wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"  # Mantém a conexão viva em proxies
+    finally:
+        if subscription:
+            events.unsubscribe(user_id, subscription)
+
+class NotificationStreamTicketView(APIView):
+    """Ticket de uso único para abrir o stream SSE sem expor o token na URL."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            "ticket": issue_stream_ticket(request.user.pk),
+            "expires_in": settings.NOTIFICATION_STREAM_TICKET_TTL,
+        })
+
+async def notification_stream(request):
+    """
+    Stream SSE das notificações do usuário (``notifications/stream/?ticket=<ticket>``).
+
+    O EventSource do navegador não envia cabeçalhos; em vez do token knox, a URL leva
+    um ticket de uso único obtido em ``notifications/stream/ticket/``. Cada reconexão
+    pede um ticket novo e retoma de ``?last_id=`` (ou do cabeçalho Last-Event-ID). Fora
+    do ASGI a resposta envia o estado atual e termina, como um polling.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    user_id = await sync_to_async(redeem_stream_ticket)(request.GET.get("ticket", ""))
+    if user_id is None or not await User.objects.filter(pk=user_id, is_active=True).aexists():
+        return JsonResponse({"detail": "Ticket inválido ou expirado."}, status=status.HTTP_401_UNAUTHORIZED)
+
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("last_id")
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+    once = not isinstance(request, ASGIRequest)
+    response = StreamingHttpResponse(
+        notification_events(user_id, last_id, once), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Sem buffer no nginx
+    return response
+
 class UserDetailViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]  # Apenas usuários autenticados podem acessar
 
@@ -230,87 +456,169 @@ class UserDetailViewSet(viewsets.ViewSet):
         except CustomUser.DoesNotExist:
             return Response({"error": "Usuário não encontrado."}, status=status.HTTP_404_NOT_FOUND)
         
-class UserMetricsViewSet(ViewSet):
-    def retrieve(self, request, pk=None):
+# --- Views assíncronas dos endpoints de leitura do dashboard ---
+# Sob ASGI (uvicorn) a espera pelo banco não prende um worker; sob WSGI o Django
+# executa cada uma num event loop próprio e elas continuam funcionando.
+
+class AsyncAPIView(APIView):
+    """
+    APIView com handlers ``async def`` (no estilo do adrf). Autenticação, permissões,
+    throttles, negociação de conteúdo e tratamento de exceções são os do DRF; só o
+    ``initial`` (que pode consultar o banco) roda em ``sync_to_async``.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
         try:
-            # Filtra os PIREPs do usuário com status "Approved"
-            approved_pireps = PirepsFlight.objects.filter(pilot_id=pk, status="Approved")
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
 
-            # Filtra os PIREPs aprovados nos últimos 30 dias
-            thirty_days_ago = timezone.now() - timedelta(days=30)
-            approved_pireps_last_30_days = approved_pireps.filter(registration_date__gte=thirty_days_ago)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
 
-            # Calcula as métricas
-            total_flights = approved_pireps.count()
+class CurrentUserView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]  # Apenas usuários autenticados podem acessar
 
-            # Soma os tempos de voo em segundos
-            total_flight_time_seconds = sum(
-                pirep.flight_duration.total_seconds() for pirep in approved_pireps if pirep.flight_duration
-            )
-            total_flight_time_hours = total_flight_time_seconds / 3600  # Converte para horas
+    async def get(self, request):
+        serializer = UserSerializer(request.user)  # Serializa os dados do usuário
+        return Response(serializer.data)  # Retorna os dados serializados
+
+class DashboardRankingsView(AsyncAPIView):
+    async def get(self, request):
+        return Response(await sync_to_async(cache.cached)(cache.STATS_NAMESPACE, "rankings", self.compute_rankings))
 
-            # Converte horas decimais para HH:MM
-            def decimal_to_hh_mm(decimal_hours):
-                hours = int(decimal_hours)
-                minutes = int((decimal_hours - hours) * 60)
-                return f"{hours}:{minutes:02d}"
+    @staticmethod
+    def compute_rankings():
+        # Top 5 Duração de Voo e Total de Voos, lidos da tabela materializada PilotStats
+        ranked = PilotStats.objects.all()  # Só pilotos com voos aprovados têm linha
 
-            total_flight_time_hh_mm = decimal_to_hh_mm(total_flight_time_hours)
+        top_duration = (
+            ranked.order_by("-total_duration")
+            .values("pilot__first_name", "pilot__last_name", "total_duration")[:5]
+        )
+
+        top_flights = (
+            ranked.order_by("-total_flights")
+            .values("pilot__first_name", "pilot__last_name", "total_flights")[:5]
+        )
+
+        return {
+            "top_duration": list(top_duration),
+            "top_flights": list(top_flights),
+        }
+
+class FlightStatsView(AsyncAPIView):
+    """
+    Retorna estatísticas gerais de voos aprovados, como total de voos e total de horas voadas.
+    """
+    async def get(self, request):
+        return Response(await sync_to_async(cache.cached)(cache.STATS_NAMESPACE, "flight-stats", self.compute_stats))
+
+    @staticmethod
+    def compute_stats():
+        # Soma as linhas de PilotStats (uma por piloto) em vez de varrer todos os PIREPs
+        totals = PilotStats.objects.aggregate(total_flights=Sum("total_flights"), total_duration=Sum("total_duration"))
+        total_flights = totals["total_flights"] or 0
+        total_duration = totals["total_duration"]
+
+        # Converte timedelta para horas decimais (exemplo: 2h 30min = 2.5)
+        total_hours = total_duration.total_seconds() / 3600 if total_duration else 0
+
+        return {
+            "total_flights": total_flights,
+            "total_hours": round(total_hours, 2)  # Agora round() funciona corretamente
+        }
+
+# Converte horas decimais para HH:MM
+def decimal_to_hh_mm(decimal_hours):
+    hours = int(decimal_hours)
+    minutes = int((decimal_hours - hours) * 60)
+    return f"{hours}:{minutes:02d}"
 
-            total_flights_last_30_days = approved_pireps_last_30_days.count()
+class UserMetricsView(AsyncAPIView):
+    WINDOW_CHOICES = (7, 30, 90, 365)  # Janelas aceitas em ?window=<dias>
 
-            # Soma os tempos de voo dos últimos 30 dias em segundos
-            total_flight_time_last_30_days_seconds = sum(
-                pirep.flight_duration.total_seconds() for pirep in approved_pireps_last_30_days if pirep.flight_duration
+    async def get(self, request, pk):
+        window = request.query_params.get("window", "30")
+        if not window.isdigit() or int(window) not in self.WINDOW_CHOICES:
+            return Response(
+                {"error": f"window deve ser um de {', '.join(map(str, self.WINDOW_CHOICES))}."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            total_flight_time_last_30_days_hours = total_flight_time_last_30_days_seconds / 3600  # Converte para horas
+        window = int(window)
+
+        # Totais e janela móvel dos PIREPs aprovados numa única consulta (agregação condicional)
+        window_start = timezone.now() - timedelta(days=window)
+        in_window = Q(registration_date__gte=window_start)
+        totals = await PirepsFlight.objects.filter(pilot_id=pk, status="Approved").aaggregate(
+            total_flights=Count("id"),
+            total_duration=Sum("flight_duration"),
+            window_flights=Count("id", filter=in_window),
+            window_duration=Sum("flight_duration", filter=in_window),
+        )
+
+        def to_hours(duration):
+            return duration.total_seconds() / 3600 if duration else 0
 
-            # Converte horas decimais para HH:MM
-            total_flight_time_last_30_days_hh_mm = decimal_to_hh_mm(total_flight_time_last_30_days_hours)
+        total_flights = totals["total_flights"]
+        total_flight_time_hours = to_hours(totals["total_duration"])
+        window_flights = totals["window_flights"]
+        window_flight_time_hours = to_hours(totals["window_duration"])
 
-            # Calcula as médias
-            average_flights_per_day = total_flights_last_30_days / 30 if total_flights_last_30_days > 0 else 0
-            average_flight_time_per_day = total_flight_time_last_30_days_hours / 30 if total_flight_time_last_30_days_hours > 0 else 0
+        # Calcula as médias
+        average_flights_per_day = window_flights / window if window_flights > 0 else 0
+        average_flight_time_per_day = window_flight_time_hours / window if window_flight_time_hours > 0 else 0
 
-            # Retorna as métricas
-            metrics = {
-                "total_flights": total_flights,
-                "total_flight_time": total_flight_time_hh_mm,  # Em formato HH:MM
-                "total_flights_last_30_days": total_flights_last_30_days,
-                "total_flight_time_last_30_days": total_flight_time_last_30_days_hh_mm,  # Em formato HH:MM
-                "average_flights_per_day": average_flights_per_day,
-                "average_flight_time_per_day": average_flight_time_per_day,
-            }
+        # Retorna as métricas (com window=30 as chaves são as mesmas de sempre)
+        return Response({
+            "total_flights": total_flights,
+            "total_flight_time": decimal_to_hh_mm(total_flight_time_hours),  # Em formato HH:MM
+            f"total_flights_last_{window}_days": window_flights,
+            f"total_flight_time_last_{window}_days": decimal_to_hh_mm(window_flight_time_hours),  # Em formato HH:MM
+            "average_flights_per_day": average_flights_per_day,
+            "average_flight_time_per_day": average_flight_time_per_day,
+        })
 
-            return Response(metrics, status=status.HTTP_200_OK)
+class UserApprovedFlightsView(AsyncAPIView):
+    pagination_class = FlightCursorPagination
+
+    @staticmethod
+    def flight_data(flight):
+        return {
+            "id": flight.id,
+            "flight": flight.flight_number,
+            "dep": flight.departure_airport,
+            "arr": flight.arrival_airport,
+            "date": flight.registration_date,
+            "network": flight.network,
+            "duration": flight.flight_duration,
+            "aircraft": flight.aircraft,
+            "status": flight.status,
+        }
+
+    async def get(self, request, pk):
+        # Filtra os voos aprovados do usuário
+        approved_flights = PirepsFlight.objects.filter(pilot_id=pk, status="Approved")
+        paginator = self.pagination_class()
+        if pagination_requested(request, paginator.cursor_query_param, paginator.page_size_query_param):
+            # A paginação do DRF avalia a página de forma síncrona
+            page = await sync_to_async(paginator.paginate_queryset)(approved_flights, request, view=self)
+            return paginator.get_paginated_response([self.flight_data(flight) for flight in page])
+        return Response([self.flight_data(flight) async for flight in approved_flights])
 
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-class UserApprovedFlightsViewSet(ViewSet):
-    def retrieve(self, request, pk=None):
-        try:
-            # Filtra os voos aprovados do usuário
-            approved_flights = PirepsFlight.objects.filter(pilot_id=pk, status="Approved")
-            flights_data = []
-
-            for flight in approved_flights:
-                flights_data.append({
-                    "id": flight.id,
-                    "flight": flight.flight_number,
-                    "dep": flight.departure_airport,
-                    "arr": flight.arrival_airport,
-                    "date": flight.registration_date,
-                    "network": flight.network,
-                    "duration": flight.flight_duration,
-                    "aircraft": flight.aircraft,
-                    "status": flight.status,
-                })
-
-            return Response(flights_data, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
 class ProfileUpdateView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -327,24 +635,193 @@ class ProfileUpdateView(APIView):
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class FlightStatsView(APIView):
+class LeaderboardViewSet(viewsets.ViewSet):
     """
-    Retorna estatísticas gerais de voos, como total de voos e total de horas voadas.
+    Rankings por período: ``leaderboards/`` lista os quadros, ``leaderboards/<quadro>/``
+    traz o top N (``?metric=duration|flights&limit=N``) e ``leaderboards/<quadro>/me/``
+    a posição do usuário logado.
     """
-    def get(self, request):
-        total_flights = PirepsFlight.objects.count()
+    permission_classes = [permissions.AllowAny]
 
-        # Obtém o total de tempo de voo (timedelta)
-        total_duration = PirepsFlight.objects.aggregate(total_duration=Sum("flight_duration"))["total_duration"]
+    def list(self, request):
+        boards = [leaderboards.get_leaderboard(board) for board in leaderboards.BOARDS]
+        return Response(LeaderboardSerializer(boards, many=True).data)
 
-        # Converte timedelta para horas decimais (exemplo: 2h 30min = 2.5)
-        total_hours = total_duration.total_seconds() / 3600 if total_duration else 0
+    def get_leaderboard(self, board):
+        if board not in leaderboards.BOARDS:
+            raise NotFound(f"Ranking inexistente. Use um de: {', '.join(leaderboards.BOARDS)}.")
+        return leaderboards.get_leaderboard(board)
 
+    def retrieve(self, request, pk=None):
+        leaderboard = self.get_leaderboard(pk)
+        metric = request.query_params.get("metric", "duration")
+        if metric not in leaderboards.METRICS:
+            return Response(
+                {"error": f"metric deve ser um de {', '.join(leaderboards.METRICS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = request.query_params.get("limit", str(settings.LEADERBOARD_DEFAULT_LIMIT))
+        if not limit.isdigit() or not 1 <= int(limit) <= settings.LEADERBOARD_MAX_LIMIT:
+            return Response(
+                {"error": f"limit deve estar entre 1 e {settings.LEADERBOARD_MAX_LIMIT}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        entries = leaderboards.top(leaderboard, metric, int(limit))
         return Response({
-            "total_flights": total_flights,
-            "total_hours": round(total_hours, 2)  # Agora round() funciona corretamente
+            **LeaderboardSerializer(leaderboard).data,
+            "metric": metric,
+            "results": LeaderboardEntrySerializer(entries, many=True).data,
+        })
+
+    @action(detail=True, methods=["get"], permission_classes=[IsAuthenticated])
+    def me(self, request, pk=None):
+        leaderboard = self.get_leaderboard(pk)
+        entry = leaderboards.entry_for(leaderboard, request.user.pk)
+        return Response({
+            **LeaderboardSerializer(leaderboard).data,
+            # Sem voos aprovados no período o piloto não aparece no ranking
+            "entry": LeaderboardEntrySerializer(entry).data if entry else None,
         })
 
+class AirportViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Consulta de aeroportos: /airports/<ICAO>/, busca por prefixo (?search=) e lote (/airports/batch/?icao=A,B).
+    """
+    serializer_class = AirportSerializer
+    permission_classes = [permissions.AllowAny]
+    queryset = Airport.objects.all()
+    lookup_field = 'icao'
+    SEARCH_LIMIT = 20
+    BATCH_LIMIT = 200
+
+    def get_object(self):
+        self.kwargs['icao'] = self.kwargs['icao'].upper()
+        return super().get_object()
+
+    @classmethod
+    def search(cls, term):
+        # Prefixo como intervalo [term, term + '\uffff'): startswith vira LIKE, que não usa
+        # os índices de icao, iata e UPPER(name) e varre a tabela inteira
+        end = term + '\uffff'
+        return (
+            Airport.objects.annotate(name_upper=Upper('name'))
+            .filter(
+                Q(icao__gte=term, icao__lt=end)
+                | Q(iata__gte=term, iata__lt=end)
+                | Q(name_upper__gte=term, name_upper__lt=end)
+            )
+            .order_by('icao')[:cls.SEARCH_LIMIT]
+        )
+
+    def list(self, request):
+        # Busca por prefixo do ICAO/IATA ou do nome
+        term = request.query_params.get('search', '').strip().upper()
+        if len(term) < 2:
+            return Response({"error": "Informe ao menos 2 caracteres em ?search=."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(self.search(term), many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        # Retorna {ICAO: aeroporto}, no mesmo formato do airports.json usado pelo frontend
+        codes = {code.strip().upper() for code in request.query_params.get('icao', '').split(',') if code.strip()}
+        if len(codes) > self.BATCH_LIMIT:
+            return Response({"error": f"Máximo de {self.BATCH_LIMIT} ICAOs por consulta."}, status=status.HTTP_400_BAD_REQUEST)
+
+        airports = Airport.objects.filter(icao__in=codes)
+        return Response({airport.icao: self.get_serializer(airport).data for airport in airports})
+
+def live_disabled():
+    return Response(
+        {"error": "Tráfego ao vivo desativado: INFINITE_FLIGHT_API_KEY não configurada."},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+class LiveTrafficView(APIView):
+    """
+    Snapshot do tráfego ao vivo (voos, ATC, status do mundo) de uma sessão do Infinite Flight.
+
+    Com ?since=<versão> retorna apenas o que mudou desde essa versão (uma versão de outra
+    época, de outro worker ou inválida recebe o snapshot completo); com If-None-Match
+    igual ao ETag atual retorna 304.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, session_id, feed):
+        if not live.enabled():
+            return live_disabled()
+        if feed not in live.FEEDS:
+            return Response({"error": "Feed inválido."}, status=status.HTTP_404_NOT_FOUND)
+
+        changes = live.service.get_changes(feed, session_id, request.query_params.get("since"))
+        if changes is None:
+            return Response({"error": "Infinite Flight indisponível."}, status=status.HTTP_502_BAD_GATEWAY)
+
+        version, full, items, removed = changes
+        etag = f'"{feed}-{session_id}-{version}"'
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        return Response(
+            {"version": version, "full": full, "items": items, "removed": removed},
+            headers={"ETag": etag},
+        )
+
+class LiveFlightDetailView(APIView):
+    """Rota ou plano de voo de um voo ao vivo, com cache curto compartilhado entre os clientes."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, session_id, flight_id, detail):
+        if not live.enabled():
+            return live_disabled()
+        if detail not in live.FLIGHT_DETAILS:
+            return Response({"error": "Detalhe inválido."}, status=status.HTTP_404_NOT_FOUND)
+
+        key = f"api:live:{session_id}:{flight_id}:{detail}"
+        data = django_cache.get(key)
+        if data is None:
+            try:
+                data = live.fetch_flight_detail(session_id, flight_id, detail)
+            except httpx.HTTPError:
+                return Response({"error": "Infinite Flight indisponível."}, status=status.HTTP_502_BAD_GATEWAY)
+            django_cache.set(key, data, settings.LIVE_DETAIL_CACHE_TTL)
+        return Response(data)
+
+
+class LiveUserStatsThrottle(AnonRateThrottle):
+    rate = settings.LIVE_USER_STATS_ANON_RATE
+
+
+class LiveUserStatsView(APIView):
+    """
+    Estatísticas de um usuário do Infinite Flight (user/stats) por ?userId= ou
+    ?discourseName=, sem expor a chave da API. Aberta para o cadastro validar o nome
+    no fórum, com limite de requisições para anônimos.
+    """
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [LiveUserStatsThrottle]
+
+    def get(self, request):
+        if not live.enabled():
+            return live_disabled()
+        lookups = [(name, request.query_params[name]) for name in live.USER_LOOKUPS if request.query_params.get(name)]
+        if len(lookups) != 1:
+            return Response({"error": "Informe userId ou discourseName."}, status=status.HTTP_400_BAD_REQUEST)
+
+        lookup, value = lookups[0]
+        key = f"api:live:user-stats:{lookup}:{value.lower()}"
+        data = django_cache.get(key)
+        if data is None:
+            try:
+                data = live.fetch_user_stats(lookup, value)
+            except httpx.HTTPError:
+                return Response({"error": "Infinite Flight indisponível."}, status=status.HTTP_502_BAD_GATEWAY)
+            if data is None:
+                return Response({"error": "Usuário não encontrado."}, status=status.HTTP_404_NOT_FOUND)
+            django_cache.set(key, data, settings.LIVE_DETAIL_CACHE_TTL)
+        return Response(data)
+
+
 class ValidateTokenView(APIView):
     permission_classes = [IsAuthenticated]  # Apenas usuários autenticados podem acessar
 
@@ -14,6 +14,7 @@ SECRET_KEY = os.environ.get('SECRET_KEY')
 
 
 MIDDLEWARE = [
+    'crud.middleware.RequestMetricsMiddleware',  # Primeiro: mede a pilha inteira
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -0,0 +1,158 @@
+"""
+Métricas por rota: requisições, histograma de latência, consultas SQL e tempo no banco.
+
+Coletadas por ``crud.middleware.RequestMetricsMiddleware`` e expostas no formato texto
+do Prometheus em ``/metrics/`` (só staff). Cada processo acumula os contadores em
+memória; com ``METRICS_SHARED = True`` os incrementos são somados a cada
+``METRICS_FLUSH_INTERVAL`` segundos no cache do Django e o endpoint mostra o total de
+todos os workers (use um cache compartilhado: ``CACHE_BACKEND=db`` ou ``file``).
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+from api.authentication import CachedTokenAuthentication
+
+PREFIX = 'crewcenter'
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # Segundos
+MICRO = 1_000_000  # Tempos guardados em microssegundos: o cache só incrementa inteiros
+CACHE_PREFIX = 'crud:metrics'
+
+
+def bucket_index(seconds):
+    for index, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            return index
+    return len(BUCKETS)  # +Inf
+
+
+class Registry:
+    """
+    Contadores inteiros indexados por tupla, ex.: ``('requests', rota, método, status)``.
+
+    ``pending`` guarda o que ainda não foi somado no cache compartilhado.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.pending = defaultdict(int)
+        self.last_flush = time.monotonic()
+
+    def observe(self, route, method, status, duration, queries, db_time):
+        increments = {
+            ('requests', route, method, str(status)): 1,
+            ('duration_bucket', route, method, bucket_index(duration)): 1,
+            ('duration_sum', route, method): round(duration * MICRO),
+            ('queries', route, method): queries,
+            ('db_time', route, method): round(db_time * MICRO),
+        }
+        with self.lock:
+            for key, value in increments.items():
+                self.counters[key] += value
+                self.pending[key] += value
+        if settings.METRICS_SHARED and time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Soma os incrementos pendentes no cache compartilhado."""
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(int)
+            self.last_flush = time.monotonic()
+        if not pending:
+            return
+        for key, value in pending.items():
+            cache_key = self.cache_key(key)
+            cache.add(cache_key, 0, timeout=None)
+            cache.incr(cache_key, value)
+        # Índice das séries conhecidas (o cache não lista chaves); perdas numa corrida
+        # são corrigidas no próximo flush de quem conhece a série
+        index = cache.get(f'{CACHE_PREFIX}:index') or []
+        missing = set(pending) - set(index)
+        if missing:
+            cache.set(f'{CACHE_PREFIX}:index', index + sorted(missing, key=repr), timeout=None)
+
+    @staticmethod
+    def cache_key(key):
+        return f'{CACHE_PREFIX}:{hashlib.sha1(repr(key).encode()).hexdigest()}'
+
+    def snapshot(self):
+        if not settings.METRICS_SHARED:
+            with self.lock:
+                return dict(self.counters)
+        self.flush()
+        index = [tuple(key) for key in cache.get(f'{CACHE_PREFIX}:index') or []]
+        values = cache.get_many([self.cache_key(key) for key in index])
+        return {key: values.get(self.cache_key(key), 0) for key in index}
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.pending.clear()
+
+
+registry = Registry()
+
+
+def label_text(**labels):
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render(counters):
+    """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+    by_metric = defaultdict(dict)
+    for key, value in counters.items():
+        by_metric[key[0]][key[1:]] = value
+
+    lines = []
+
+    def header(name, kind, help_text):
+        lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+
+    header('http_requests_total', 'counter', 'Requisições por rota, método e status.')
+    for (route, method, status), value in sorted(by_metric['requests'].items()):
+        lines.append(f'{PREFIX}_http_requests_total{label_text(route=route, method=method, status=status)} {value}')
+
+    header('http_request_duration_seconds', 'histogram', 'Latência das requisições por rota.')
+    routes = sorted(by_metric['duration_sum'])
+    for route, method in routes:
+        cumulative = 0
+        for index, bound in enumerate(BUCKETS + ('+Inf',)):
+            cumulative += by_metric['duration_bucket'].get((route, method, index), 0)
+            labels = label_text(route=route, method=method, le=bound)
+            lines.append(f'{PREFIX}_http_request_duration_seconds_bucket{labels} {cumulative}')
+        labels = label_text(route=route, method=method)
+        lines.append(f'{PREFIX}_http_request_duration_seconds_sum{labels} {by_metric["duration_sum"][(route, method)] / MICRO}')
+        lines.append(f'{PREFIX}_http_request_duration_seconds_count{labels} {cumulative}')
+
+    header('db_queries_total', 'counter', 'Consultas SQL executadas pelas requisições de cada rota.')
+    for (route, method), value in sorted(by_metric['queries'].items()):
+        lines.append(f'{PREFIX}_db_queries_total{label_text(route=route, method=method)} {value}')
+
+    header('db_query_duration_seconds_total', 'counter', 'Tempo gasto no banco pelas requisições de cada rota.')
+    for (route, method), value in sorted(by_metric['db_time'].items()):
+        lines.append(f'{PREFIX}_db_query_duration_seconds_total{label_text(route=route, method=method)} {value / MICRO}')
+
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsView(APIView):
+    """Métricas no formato do Prometheus; aceita token knox (scraper) ou sessão do admin."""
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(render(registry.snapshot()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,101 @@
+import heapq
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .metrics import registry
+
+slow_logger = logging.getLogger('crud.slow_requests')
+
+
+class QueryRecorder:
+    """``execute_wrapper`` que conta as consultas e guarda as mais lentas de uma requisição."""
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.db_time = 0.0
+        self.slowest = []  # heap de (duração, ordem, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.db_time += elapsed
+            if self.keep:
+                entry = (elapsed, self.count, sql)
+                if len(self.slowest) < self.keep:
+                    heapq.heappush(self.slowest, entry)
+                elif elapsed > self.slowest[0][0]:
+                    heapq.heapreplace(self.slowest, entry)
+
+    def install(self, stack, databases):
+        for connection in databases:
+            stack.enter_context(connection.execute_wrapper(self))
+
+
+class RequestMetricsMiddleware:
+    """
+    Mede cada requisição (latência, consultas SQL e tempo no banco) e soma em
+    ``crud.metrics.registry``, rotulando pela rota (nome da view na URL).
+
+    Requisições acima de ``METRICS_SLOW_REQUEST_MS`` vão para o log ``crud.slow_requests``
+    com o SQL das ``METRICS_SLOW_REQUEST_SQL`` consultas mais lentas (sem os parâmetros).
+    Em respostas em stream mede-se até a view devolver a resposta, não o stream inteiro.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder = QueryRecorder(settings.METRICS_SLOW_REQUEST_SQL)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            recorder.install(stack, connections.all())
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder(settings.METRICS_SLOW_REQUEST_SQL)
+        start = time.perf_counter()
+        # As conexões são por thread: as consultas da requisição rodam na thread de
+        # sync_to_async (thread_sensitive), então o wrapper vai nas conexões de lá
+        databases = await sync_to_async(connections.all)()
+        with ExitStack() as stack:
+            recorder.install(stack, databases)
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    @staticmethod
+    def route(request):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else 'unmatched'  # 404 sem rota: um rótulo só, sem o caminho
+
+    def record(self, request, response, duration, recorder):
+        route = self.route(request)
+        registry.observe(route, request.method, response.status_code, duration, recorder.count, recorder.db_time)
+
+        threshold = settings.METRICS_SLOW_REQUEST_MS
+        if threshold is not None and duration * 1000 >= threshold:
+            slowest = sorted(recorder.slowest, reverse=True)
+            slow_logger.warning(
+                "Requisição lenta %s %s (%s): %.0f ms, %d consultas, %.0f ms no banco%s",
+                request.method, request.path, route, duration * 1000, recorder.count, recorder.db_time * 1000,
+                ''.join(f"\n  {elapsed * 1000:8.1f} ms  {sql}" for elapsed, _, sql in slowest),
+            )
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'crud.middleware.RequestMetricsMiddleware',  # Primeiro: mede a pilha inteira
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -58,11 +59,13 @@ CORS_ALLOWED_ORIGINS = [
     'https://render-deploy-world-tour.onrender.com'
 ]
 
+# O frontend lê o ETag das respostas do tráfego ao vivo
+CORS_EXPOSE_HEADERS = ['ETag']
+
 AUTH_USER_MODEL = 'api.CustomUser'
 
 AUTHENTICATION_BACKENDS = [
-    'api.auth_backend.EmailAuthBackend',
-    'django.contrib.auth.backends.ModelBackend',  # esta linha resolveu meu problema de nao conseguir logar no panel administrativo
+    'api.auth_backend.EmailAuthBackend',  # Também atende o login do admin (herda do ModelBackend)
 ]
 
 ROOT_URLCONF = 'crud.urls'
@@ -87,8 +90,80 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'crud.wsgi.application'
 
+# Tarefas em segundo plano (api.jobs). JOBS_RUN_SYNC=True executa na hora, sem threads.
+JOBS_RUN_SYNC = os.environ.get('JOBS_RUN_SYNC', 'False') == 'True'
+JOBS_MAX_WORKERS = 2
+NOTIFICATION_BULK_SIZE = 1000
+# Stream SSE de notificações (api.events): consulta ao banco de segurança para eventos de outros workers
+NOTIFICATION_STREAM_POLL_INTERVAL = 15
+NOTIFICATION_STREAM_MAX_DURATION = 600  # O frontend reconecta (com um ticket novo) depois disso
+NOTIFICATION_STREAM_TICKET_TTL = 30  # Segundos para usar o ticket de uso único do stream
+
+# Cache (api.cache): CACHE_BACKEND=locmem (padrão, por processo), file ou db (compartilhados entre workers).
+# Com locmem cada worker recalcula rankings/estatísticas por conta própria e não vê os bumps dos outros.
+# Para "db", rode "python manage.py createcachetable".
+CACHE_BACKENDS = {
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'crew-center'},
+    'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+             'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache')},
+    'db': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'api_cache'},
+}
+CACHES = {'default': CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'locmem')]}
+STATS_CACHE_TTL = 60  # Segundos em que rankings/estatísticas gerais ficam frescos
+STATS_CACHE_STALE_TTL = 600  # Por quanto tempo um valor vencido ainda pode ser servido durante o recálculo
+STATS_CACHE_LOCK_TIMEOUT = 10
+
+# Rankings por período (api.leaderboards); rode "python manage.py refresh_leaderboards" no cron
+LEADERBOARD_REFRESH_INTERVAL = 300  # Segundos até uma leitura agendar o recálculo do snapshot
+LEADERBOARD_DEFAULT_LIMIT = 10
+LEADERBOARD_MAX_LIMIT = 100
+
+# Origem padrão de "python manage.py load_airports" (rodado no build.sh)
+AIRPORTS_SOURCE_URL = os.environ.get(
+    'AIRPORTS_SOURCE_URL', 'https://raw.githubusercontent.com/mwgg/Airports/master/airports.json'
+)
+
+# Proxy do tráfego ao vivo do Infinite Flight (api.live)
+INFINITE_FLIGHT_API_URL = os.environ.get('INFINITE_FLIGHT_API_URL', 'https://api.infiniteflight.com/public/v2')
+# Sem a chave o proxy fica desligado e as rotas /live/ respondem 503
+INFINITE_FLIGHT_API_KEY = os.environ.get('INFINITE_FLIGHT_API_KEY')
+LIVE_POLL_INTERVAL = 10  # Segundos entre consultas de cada feed ativo
+LIVE_IDLE_TIMEOUT = 120  # Feeds sem clientes por esse tempo deixam de ser consultados
+LIVE_HISTORY_SIZE = 30  # Versões guardadas para responder com deltas
+LIVE_HTTP_TIMEOUT = 10
+LIVE_BACKGROUND_POLLING = True
+LIVE_DETAIL_CACHE_TTL = 30  # Rotas, planos de voo e estatísticas de usuários
+LIVE_USER_STATS_ANON_RATE = '30/min'  # Consultas de user/stats sem login (cadastro)
+
+# Paginação opcional das listas (api.pagination): ?page_size=N e ?cursor=/?page=
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = 500
+
+# Exportação do diário de bordo em stream (api.export)
+EXPORT_CHUNK_SIZE = 2000  # Linhas lidas do cursor e enviadas por bloco
+
+# Importação do diário de bordo (api.imports)
+LOGBOOK_IMPORT_MAX_ROWS = 10000
+LOGBOOK_IMPORT_CHUNK_SIZE = 1000  # Linhas por INSERT do bulk_create
+
+# Métricas por rota (crud.metrics), expostas em /metrics/ para staff
+METRICS_SHARED = os.environ.get('METRICS_SHARED', 'False') == 'True'  # Soma os workers no cache do Django
+METRICS_FLUSH_INTERVAL = 10  # Segundos entre as somas no cache compartilhado
+# Limite em ms para o log de requisições lentas; '' ou 'off' desligam o log (None)
+METRICS_SLOW_REQUEST_MS = os.environ.get('METRICS_SLOW_REQUEST_MS', '1000').strip()
+METRICS_SLOW_REQUEST_MS = None if METRICS_SLOW_REQUEST_MS.lower() in ('', 'off') else int(METRICS_SLOW_REQUEST_MS)
+METRICS_SLOW_REQUEST_SQL = 5  # Consultas mais lentas registradas por requisição lenta
+
+# Cache dos tokens já validados (api.authentication), por processo
+AUTH_CACHE_TTL = 60  # Segundos; revogações chegam aos outros workers pelo cache do Django (compartilhado: db ou file)
+AUTH_CACHE_SIZE = 1024
+
+REST_KNOX = {
+    'TOKEN_LIMIT_PER_USER': 10,  # No login, os tokens mais antigos além desse limite são removidos
+}
+
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('knox.auth.TokenAuthentication',),
+    'DEFAULT_AUTHENTICATION_CLASSES': ('api.authentication.CachedTokenAuthentication',),
     
 }
 
@@ -143,6 +218,15 @@ EMAIL_HOST_USER = "sysinfiniteworldtour@gmail.com"
 EMAIL_HOST_PASSWORD = "niue xgss ojke gwrk"
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Fila de emails (api.outbox). O worker é "python manage.py send_outbox --loop"; sem ele,
+# EMAIL_OUTBOX_DELIVER_IN_PROCESS envia numa thread do próprio processo após o commit.
+EMAIL_OUTBOX_DELIVER_IN_PROCESS = os.environ.get('EMAIL_OUTBOX_DELIVER_IN_PROCESS', 'True') == 'True'
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+EMAIL_OUTBOX_RETRY_BASE = 30  # Segundos antes da 2ª tentativa, dobrando a cada falha
+EMAIL_OUTBOX_RETRY_MAX = 3600
+EMAIL_OUTBOX_CLAIM_TIMEOUT = 300  # Reserva de um lote em envio
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
@@ -2,8 +2,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('', include('api.urls')),
     path('api/auth/', include('knox.urls')),
     path('api/password_reset/', include('django_rest_passwordreset.urls')),
@@ -6,6 +6,10 @@ cd backend
 pip install -r requirements.txt
 python manage.py collectstatic --no-input
 python manage.py migrate
+python manage.py createcachetable
+python manage.py load_airports
+python manage.py rebuild_pilot_stats
+python manage.py refresh_leaderboards
 
 
 if [[ $CREATE_SUPERUSER ]]; then
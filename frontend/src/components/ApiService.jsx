@@ -1,24 +1,41 @@
 // ApiService.js
 import axios from 'axios';
+import AxiosInstance from './AxiosInstance';
 
-const API_KEY = 'nvo8c790hfa9q3duho2jhgd2jf8tgwqw';
-const BASE_URL = 'https://api.infiniteflight.com/public/v2';
+// Tudo que usa a API do Infinite Flight passa pelo backend (/live/), que guarda a chave
 
-const ApiService = {
-  getSessionData: async (sessionId) => {
-    try {
-      const response = await axios.get(`${BASE_URL}/sessions/${sessionId}?apikey=${API_KEY}`);
-      return response.data.result;
-    } catch (error) {
-      console.error("Error fetching session data:", error);
-      throw error;
-    }
-  },
+// Campo que identifica cada item dos feeds ao vivo (o mesmo usado pelo backend)
+const LIVE_ID_FIELDS = { flights: 'flightId', atc: 'frequencyId', world: 'airportIcao' };
+
+// Snapshot local de cada feed do tráfego ao vivo, atualizado com os deltas do backend
+const liveFeeds = {};
+
+const getLiveFeed = async (sessionId, feed) => {
+  const key = `${sessionId}:${feed}`;
+  const current = liveFeeds[key];
+  const response = await AxiosInstance.get(`live/${sessionId}/${feed}/`, {
+    params: current ? { since: current.version } : {},
+    headers: current ? { 'If-None-Match': current.etag } : {},
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  });
+  if (response.status === 304) {
+    return current.items;
+  }
 
+  const { version, full, items, removed } = response.data;
+  const idField = LIVE_ID_FIELDS[feed];
+  const merged = full || !current ? new Map() : new Map(current.items.map((item) => [item[idField], item]));
+  removed.forEach((id) => merged.delete(id));
+  items.forEach((item) => merged.set(item[idField], item));
+
+  liveFeeds[key] = { version, etag: response.headers.etag, items: Array.from(merged.values()) };
+  return liveFeeds[key].items;
+};
+
+const ApiService = {
   getFlightData: async (sessionId) => {
     try {
-      const response = await axios.get(`${BASE_URL}/sessions/${sessionId}/flights?apikey=${API_KEY}`);
-      return response.data.result;
+      return await getLiveFeed(sessionId, 'flights');
     } catch (error) {
       console.error("Error fetching flight data:", error);
       throw error;
@@ -27,8 +44,7 @@ const ApiService = {
 
   getAirportData: async (sessionId) => {
     try {
-      const response = await axios.get(`${BASE_URL}/world/status/${sessionId}?apikey=${API_KEY}`);
-      return response.data.result;
+      return await getLiveFeed(sessionId, 'world');
     } catch (error) {
       console.error("Error fetching airport data:", error);
       throw error;
@@ -37,8 +53,8 @@ const ApiService = {
 
   getAtcData: async (sessionId) => {
     try {
-      const response = await axios.get(`${BASE_URL}/sessions/${sessionId}/atc?apikey=${API_KEY}`);
-      return response.data.result.filter(atc => atc.airportName && atc.type !== null);
+      const atc = await getLiveFeed(sessionId, 'atc');
+      return atc.filter(atc => atc.airportName && atc.type !== null);
     } catch (error) {
       console.error("Error fetching ATC data:", error);
       throw error;
@@ -47,7 +63,7 @@ const ApiService = {
 
   getFlightPlan: async (sessionId, flightId) => {
     try {
-      const response = await axios.get(`${BASE_URL}/sessions/${sessionId}/flights/${flightId}/flightplan?apikey=${API_KEY}`);
+      const response = await AxiosInstance.get(`live/${sessionId}/flights/${flightId}/flightplan/`);
       return response.data;
     } catch (error) {
       console.error("Error fetching flight plan data:", error);
@@ -57,12 +73,8 @@ const ApiService = {
 
   userStatus: async (userId) => {
     try {
-      const parameters = { userIds: [userId] };
-      const headers = { "Content-type": "application/json", Accept: "text/plain" };
-      const url = `${BASE_URL}/user/stats?apikey=${API_KEY}`;
-
-      const response = await axios.post(url, parameters, { headers });
-      return response.data.result[0]; // A API retorna um array, então pegamos o primeiro item
+      const response = await AxiosInstance.get('live/users/stats/', { params: { userId } });
+      return response.data;
     } catch (error) {
       console.error("Error fetching user status:", error);
       return null;
@@ -71,8 +83,7 @@ const ApiService = {
 
   getRoute: async (sessionId, flightId) => {
     try {
-      const url = `${BASE_URL}/sessions/${sessionId}/flights/${flightId}/route?apikey=${API_KEY}`;
-      const response = await axios.get(url);
+      const response = await AxiosInstance.get(`live/${sessionId}/flights/${flightId}/route/`);
       return response.data.result;
     } catch (error) {
       console.error('Error fetching route data:', error);
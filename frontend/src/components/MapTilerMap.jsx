@@ -1,6 +1,7 @@
 import React, { useEffect, useRef } from 'react';
 import { Map } from '@maptiler/sdk';
 import '@maptiler/sdk/dist/maptiler-sdk.css';
+import AxiosInstance from './AxiosInstance';
 
 
 const MapTilerMap = ({ departureAirport, arrivalAirport, alternateAirport, onDistanceCalculated }) => {
@@ -77,9 +78,11 @@ const MapTilerMap = ({ departureAirport, arrivalAirport, alternateAirport, onDis
     };
   }, [departureAirport, arrivalAirport, alternateAirport, onDistanceCalculated]);
 
+  // Busca no backend só os aeroportos do voo, no formato { ICAO: aeroporto }
   const fetchAirports = async () => {
-    const response = await fetch('https://raw.githubusercontent.com/mwgg/Airports/master/airports.json');
-    return await response.json();
+    const icaos = [departureAirport, arrivalAirport, alternateAirport].filter(Boolean).join(',');
+    const response = await AxiosInstance.get('airports/batch/', { params: { icao: icaos } });
+    return response.data;
   };
 
   const calculateDistance = (lat1, lon1, lat2, lon2) => {
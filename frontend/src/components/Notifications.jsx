@@ -18,14 +18,92 @@ import {
 } from '@mui/icons-material';
 import AxiosInstance from '../components/AxiosInstance';
 
+// Espera antes de reabrir o stream (o mesmo intervalo do polling do servidor fora do ASGI)
+const STREAM_RECONNECT_DELAY = 15000;
+
 const useNotifications = () => {
   const [notifications, setNotifications] = useState([]);
+  const [unreadCount, setUnreadCount] = useState(0);
   const [error, setError] = useState(null);
 
+  // Um único stream (SSE) por aba: contador do badge e notificações novas em tempo real
+  const subscribe = () => {
+    const token = localStorage.getItem('token');
+    if (!token) {
+      return () => {};
+    }
+    if (typeof EventSource === 'undefined') {
+      // Navegadores sem SSE: só o contador, uma vez
+      AxiosInstance.get("notifications/unread-count/")
+        .then((res) => setUnreadCount(res.data.unread))
+        .catch((error) => console.error("Erro ao buscar contador de notificações:", error));
+      return () => {};
+    }
+    // O ticket do stream vale uma vez: cada conexão (e reconexão) pede um novo e retoma
+    // da última notificação recebida, em vez de deixar o navegador reconectar sozinho
+    let source = null;
+    let timer = null;
+    let closed = false;
+    let lastId = null;
+
+    const reconnect = () => {
+      if (!closed) {
+        timer = setTimeout(connect, STREAM_RECONNECT_DELAY);
+      }
+    };
+
+    const connect = async () => {
+      let ticket;
+      try {
+        ticket = (await AxiosInstance.post('notifications/stream/ticket/')).data.ticket;
+      } catch (error) {
+        console.error("Erro ao abrir o stream de notificações:", error);
+        reconnect();
+        return;
+      }
+      if (closed) {
+        return;
+      }
+      const url = new URL('notifications/stream/', AxiosInstance.defaults.baseURL || window.location.origin);
+      url.searchParams.set('ticket', ticket);
+      if (lastId) {
+        url.searchParams.set('last_id', lastId);
+      }
+      source = new EventSource(url);
+
+      // Os dois eventos trazem o id da última notificação vista, de onde a reconexão retoma
+      source.addEventListener('unread', (event) => {
+        lastId = event.lastEventId || lastId;
+        setUnreadCount(JSON.parse(event.data).unread);
+      });
+      source.addEventListener('notification', (event) => {
+        const notification = JSON.parse(event.data);
+        lastId = event.lastEventId || lastId;
+        setNotifications((prev) =>
+          prev.some((notif) => notif.id === notification.id) ? prev : [notification, ...prev]
+        );
+      });
+      source.onerror = () => {
+        source.close();
+        reconnect();
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(timer);
+      if (source) {
+        source.close();
+      }
+    };
+  };
+
   const fetchNotifications = () => {
     AxiosInstance.get("notifications/")
       .then((res) => {
         setNotifications(res.data);
+        setUnreadCount(res.data.length);
         setError(null);
       })
       .catch((error) => {
@@ -38,29 +116,35 @@ const useNotifications = () => {
     AxiosInstance.post(`notifications/${id}/mark_as_read/`)
       .then(() => {
         setNotifications((prev) => prev.filter((notif) => notif.id !== id));
+        setUnreadCount((count) => Math.max(count - 1, 0));
       })
       .catch((error) => {
         console.error("Erro ao marcar notificação como lida:", error);
       });
   };
 
-  return { notifications, error, fetchNotifications, handleDismissNotification };
+  return { notifications, unreadCount, error, subscribe, fetchNotifications, handleDismissNotification };
 };
 
 const Notifications = () => {
-  const { notifications, error, fetchNotifications, handleDismissNotification } = useNotifications();
+  const {
+    notifications, unreadCount, error, subscribe, fetchNotifications, handleDismissNotification,
+  } = useNotifications();
   const [anchorNotif, setAnchorNotif] = useState(null);
   const notifOpen = Boolean(anchorNotif);
 
-  useEffect(() => {
+  useEffect(() => subscribe(), []);
+
+  const handleOpen = (event) => {
+    setAnchorNotif(event.currentTarget);
     fetchNotifications();
-  }, []);
+  };
 
   return (
     <>
       <Tooltip title="Notificações">
-        <IconButton color="inherit" onClick={(e) => setAnchorNotif(e.currentTarget)}>
-          <Badge badgeContent={notifications.length} color="error">
+        <IconButton color="inherit" onClick={handleOpen}>
+          <Badge badgeContent={unreadCount} color="error">
             <NotificationsIcon />
           </Badge>
         </IconButton>
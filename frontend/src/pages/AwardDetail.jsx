@@ -48,19 +48,19 @@ const AwardDetail = () => {
       const response = await AxiosInstance.get(`/flight-legs/?award=${award.id}&user=${userId}`);
       setFlightLegs(response.data);
       calculateMetrics(response.data);
+      fetchAirports(response.data);
     } catch (error) {
       console.error('Erro ao buscar pernas do voo:', error);
     }
   };
 
-  // Função para buscar os dados dos aeroportos
-  const fetchAirports = async () => {
+  // Função para buscar no backend só os aeroportos das pernas ({ ICAO: aeroporto })
+  const fetchAirports = async (legs) => {
+    const icaos = [...new Set(legs.flatMap((leg) => [leg.from_airport, leg.to_airport]))];
+    if (icaos.length === 0) return;
     try {
-      const response = await fetch(
-        'https://raw.githubusercontent.com/Dalmocabral/Airport/refs/heads/master/airports.json'
-      );
-      const data = await response.json();
-      setAirportsData(data);
+      const response = await AxiosInstance.get('/airports/batch/', { params: { icao: icaos.join(',') } });
+      setAirportsData(response.data);
     } catch (error) {
       console.error('Erro ao buscar dados dos aeroportos:', error);
     }
@@ -86,11 +86,6 @@ const AwardDetail = () => {
     }
   }, [activeTab, award, userId]);
 
-  // Efeito para buscar os dados dos aeroportos
-  useEffect(() => {
-    fetchAirports();
-  }, []);
-
   // Função para mudar a aba ativa
   const handleTabChange = (event, newValue) => {
     setActiveTab(newValue);
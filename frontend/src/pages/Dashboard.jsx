@@ -23,6 +23,8 @@ import {
   Card,
   CardContent,
   Grid,
+  ToggleButton,
+  ToggleButtonGroup,
 } from "@mui/material";
 import AccessTimeIcon from "@mui/icons-material/AccessTime";
 import FlightIcon from "@mui/icons-material/Flight";
@@ -64,6 +66,8 @@ const Dashboard = () => {
   const [flights, setFlights] = useState([]); // State for flights data
   const [topDuration, setTopDuration] = useState([]); // State for top duration rankings
   const [topFlights, setTopFlights] = useState([]); // State for top flights rankings
+  const [board, setBoard] = useState("all-time"); // Ranking period: weekly, monthly, yearly, all-time
+  const [myRank, setMyRank] = useState(null); // Logged user's entry on the selected board
   const [openDialog, setOpenDialog] = useState(false); // State for delete confirmation dialog
   const [selectedFlightId, setSelectedFlightId] = useState(null); // State for selected flight ID
   const [sortConfig, setSortConfig] = useState({ key: null, direction: "asc" }); // State for table sorting
@@ -72,9 +76,12 @@ const Dashboard = () => {
   // Fetch flights and rankings on component mount
   useEffect(() => {
     fetchFlights();
-    fetchRankings();
   }, []);
 
+  useEffect(() => {
+    fetchRankings(board);
+  }, [board]);
+
   // Fetch flights data from the API
   const fetchFlights = async () => {
     try {
@@ -88,17 +95,30 @@ const Dashboard = () => {
     }
   };
 
-  // Fetch rankings data from the API
-  const fetchRankings = async () => {
+  // Fetch the selected leaderboard (top 5 by duration and by flights) and the user's position
+  const fetchRankings = async (selectedBoard) => {
     try {
-      const response = await AxiosInstance.get("/dashboard/rankings/");
-      setTopDuration(response.data.top_duration);
-      setTopFlights(response.data.top_flights);
+      const [byDuration, byFlights, me] = await Promise.all([
+        AxiosInstance.get(`/leaderboards/${selectedBoard}/`, { params: { metric: "duration", limit: 5 } }),
+        AxiosInstance.get(`/leaderboards/${selectedBoard}/`, { params: { metric: "flights", limit: 5 } }),
+        AxiosInstance.get(`/leaderboards/${selectedBoard}/me/`),
+      ]);
+      setTopDuration(byDuration.data.results);
+      setTopFlights(byFlights.data.results);
+      setMyRank(me.data.entry);
     } catch (error) {
       console.error("Error fetching rankings:", error);
     }
   };
 
+  // Trophy for the first three positions (ties share the position)
+  const rankBadge = (rank) => {
+    if (rank === 1) return <EmojiEventsIcon sx={{ color: "gold" }} />;
+    if (rank === 2) return <EmojiEventsIcon sx={{ color: "silver" }} />;
+    if (rank === 3) return <EmojiEventsIcon sx={{ color: "brown" }} />;
+    return <Typography>{rank}</Typography>;
+  };
+
   // Handle table column sorting
   const handleSort = (key) => {
     const direction =
@@ -387,7 +407,29 @@ const Dashboard = () => {
       </Grid>
 
       {/* Rankings Cards */}
-      <Grid container spacing={2} sx={{ mt: 3 }}>
+      <Grid container spacing={2} sx={{ mt: 3 }} alignItems="center">
+        <Grid item xs={12} md={6}>
+          <ToggleButtonGroup
+            value={board}
+            exclusive
+            size="small"
+            onChange={(event, value) => value && setBoard(value)}
+          >
+            <ToggleButton value="weekly">Semana</ToggleButton>
+            <ToggleButton value="monthly">Mês</ToggleButton>
+            <ToggleButton value="yearly">Ano</ToggleButton>
+            <ToggleButton value="all-time">Geral</ToggleButton>
+          </ToggleButtonGroup>
+        </Grid>
+        <Grid item xs={12} md={6}>
+          <Typography variant="body1" align="right">
+            {myRank
+              ? `Sua posição: #${myRank.duration_rank} em tempo de voo, #${myRank.flights_rank} em voos`
+              : "Sem voos aprovados neste período"}
+          </Typography>
+        </Grid>
+      </Grid>
+      <Grid container spacing={2} sx={{ mt: 1 }}>
         {/* Top 5 Flight Duration */}
         <Grid item xs={12} md={6}>
           <Card sx={{ p: 2 }}>
@@ -405,16 +447,11 @@ const Dashboard = () => {
                     </TableRow>
                   </TableHead>
                   <TableBody>
-                    {topDuration.map((user, index) => (
-                      <TableRow key={user.pilot__first_name}>
-                        <TableCell>
-                          {index === 0 && <EmojiEventsIcon sx={{ color: "gold" }} />}
-                          {index === 1 && <EmojiEventsIcon sx={{ color: "silver" }} />}
-                          {index === 2 && <EmojiEventsIcon sx={{ color: "brown" }} />}
-                          {index > 2 && <Typography>{index + 1}</Typography>}
-                        </TableCell>
-                        <TableCell>{`${user.pilot__first_name} ${user.pilot__last_name}`}</TableCell>
-                        <TableCell>{formatDuration(user.total_duration)}</TableCell>
+                    {topDuration.map((entry) => (
+                      <TableRow key={entry.pilot}>
+                        <TableCell>{rankBadge(entry.duration_rank)}</TableCell>
+                        <TableCell>{`${entry.first_name} ${entry.last_name}`}</TableCell>
+                        <TableCell>{formatDuration(entry.duration)}</TableCell>
                       </TableRow>
                     ))}
                   </TableBody>
@@ -441,16 +478,11 @@ const Dashboard = () => {
                     </TableRow>
                   </TableHead>
                   <TableBody>
-                    {topFlights.map((user, index) => (
-                      <TableRow key={user.pilot__first_name}>
-                        <TableCell>
-                          {index === 0 && <EmojiEventsIcon sx={{ color: "gold" }} />}
-                          {index === 1 && <EmojiEventsIcon sx={{ color: "silver" }} />}
-                          {index === 2 && <EmojiEventsIcon sx={{ color: "brown" }} />}
-                          {index > 2 && <Typography>{index + 1}</Typography>}
-                        </TableCell>
-                        <TableCell>{`${user.pilot__first_name} ${user.pilot__last_name}`}</TableCell>
-                        <TableCell>{user.total_flights}</TableCell>
+                    {topFlights.map((entry) => (
+                      <TableRow key={entry.pilot}>
+                        <TableCell>{rankBadge(entry.flights_rank)}</TableCell>
+                        <TableCell>{`${entry.first_name} ${entry.last_name}`}</TableCell>
+                        <TableCell>{entry.flights}</TableCell>
                       </TableRow>
                     ))}
                   </TableBody>
@@ -4,7 +4,6 @@ import "leaflet/dist/leaflet.css";
 import "leaflet-rotatedmarker"; // Certifique-se de instalar esta biblioteca
 import ApiService from "../components/ApiService"; // Ajuste o caminho conforme necessário
 import airplaneUserIcon from "../assets/image/airplane_user.png"; // Caminho da imagem do avião
-import axios from "axios"; // Importe o axios
 
 const sessions = {
   training: { id: "9ed5512e-b6eb-401f-bab8-42bdbdcf2bab", name: "Training Server" },
@@ -149,10 +148,8 @@ const MapWithFlights = ({ darkMode }) => {
   // Função para buscar o plano de voo
   const fetchFlightPlan = async (flightId) => {
     try {
-      const response = await axios.get(
-        `https://api.infiniteflight.com/public/v2/sessions/${selectedSession}/flights/${flightId}/flightplan?apikey=nvo8c790hfa9q3duho2jhgd2jf8tgwqw`
-      );
-      const flightPlanData = response.data.result.flightPlanItems;
+      const data = await ApiService.getFlightPlan(selectedSession, flightId);
+      const flightPlanData = data.result.flightPlanItems;
 
       // Filtra itens com coordenadas válidas
       const validItems = flightPlanData.filter(
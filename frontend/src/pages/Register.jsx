@@ -41,33 +41,13 @@ const Register = () => {
   // Função para verificar o nome de usuário IFC
   const checkUsernameIFC = async (username) => {
     try {
-      // Prepare request parameters
-      const params = { discourseNames: [username] };
-      const headers = { 'Content-type': 'application/json', 'Accept': 'text/plain' };
-      const url = 'https://api.infiniteflight.com/public/v2/user/stats?apikey=nvo8c790hfa9q3duho2jhgd2jf8tgwqw';
-
-      // Make the request
-      const response = await fetch(url, {
-        method: 'POST',
-        body: JSON.stringify(params),
-        headers,
-      });
-
-      // Check if the response is OK (status code 200)
-      if (!response.ok) {
-        return response.status; // Retorna o código de erro (401, 404, etc.)
-      }
-
-      // Convert the response to JSON
-      const data = await response.json();
-
-      // Verifica se o array result não está vazio e se o primeiro elemento possui userId
-      if (data.result && data.result.length > 0 && data.result[0].userId) {
-        return 200; // Nome de usuário válido
-      } else {
-        return 404; // Nome de usuário não encontrado
-      }
+      // Consulta via backend, que guarda a chave da API do Infinite Flight
+      await AxiosInstance.get('live/users/stats/', { params: { discourseName: username } });
+      return 200; // Nome de usuário válido
     } catch (error) {
+      if (error.response) {
+        return error.response.status; // 404 se o nome não existe, 429/502/503 etc.
+      }
       console.error("Error checking username IFC:", error);
       return 500; // Erro interno do servidor
     }
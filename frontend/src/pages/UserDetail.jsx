@@ -104,21 +104,11 @@ const UserDetail = () => {
     }
 
     try {
-      const params = { discourseNames: [username] };
-      const headers = { 'Content-type': 'application/json', Accept: 'text/plain' };
-      const url = 'https://api.infiniteflight.com/public/v2/user/stats?apikey=nvo8c790hfa9q3duho2jhgd2jf8tgwqw';
-
-      const response = await fetch(url, {
-        method: 'POST',
-        body: JSON.stringify(params),
-        headers,
-      });
-
-      const data = await response.json();
-      if (data.errorCode === 0 && data.result.length > 0) {
-        setIfcData(data.result[0]); // Armazena os dados do Infinite Flight
-      }
+      // Consulta via backend, que guarda a chave da API do Infinite Flight
+      const response = await AxiosInstance.get('live/users/stats/', { params: { discourseName: username } });
+      setIfcData(response.data); // Armazena os dados do Infinite Flight
     } catch (error) {
+      if (error.response?.status === 404) return; // Usuário sem conta no Infinite Flight
       console.error('Erro ao buscar dados do Infinite Flight:', error);
       setError('Erro ao carregar dados do Infinite Flight.');
     } finally {
@@ -36,10 +36,13 @@ const Briefing = () => {
         attribution: '© <a href="https://www.maptiler.com/">MapTiler</a> © <a href="https://www.openstreetmap.org/">OpenStreetMap</a> contributors',
       }).addTo(map.current);
 
-      // Fetch airport data
+      // Fetch only this flight's airports from the backend ({ ICAO: airport })
       const fetchAirports = async () => {
-        const response = await fetch('https://raw.githubusercontent.com/mwgg/Airports/master/airports.json');
-        return await response.json();
+        const icaos = [flightData.departure_airport, flightData.arrival_airport, flightData.alternate_airport]
+          .filter(Boolean)
+          .join(',');
+        const response = await AxiosInstance.get('airports/batch/', { params: { icao: icaos } });
+        return response.data;
       };
 
       // Add markers and polylines after the map loads